@@ -0,0 +1,91 @@
+"""
+Show how compose_embedded_media scales with the number of records in a course
+
+Usage: python -m benchmarks.embedded_media_benchmark [largest_number_of_embeds]
+"""
+
+from functools import partial
+import sys
+import timeit
+
+from ocw_data_parser.ocw_data_parser import compose_embedded_media
+
+
+CHILDREN_PER_EMBED = 5
+
+
+def make_jsons(num_embeds):
+    """
+    Make synthetic course JSON with num_embeds embed parents, each with a few children
+
+    Args:
+        num_embeds (int): How many embed parents to create
+
+    Returns:
+        list of dict: The course JSON
+    """
+    jsons = []
+    for num in range(num_embeds):
+        parent_uid = f"{num:032x}"
+        jsons.append(
+            {
+                "_uid": parent_uid,
+                "parent_uid": "course",
+                "id": f"lecture-{num}",
+                "title": f"Lecture {num}",
+                "template_type": "Embed",
+                "technical_location": f"https://ocw.mit.edu/courses/course/lecture-{num}",
+                "inline_embed_id": f"lecture{num}",
+                "about_this_resource_text": "",
+                "related_resources_text": "",
+                "text": "",
+                "transcript": "",
+                "start_time": "",
+                "end_time": "",
+                "media_index": [],
+            }
+        )
+        for child in range(CHILDREN_PER_EMBED):
+            jsons.append(
+                {
+                    "_uid": f"{num:016x}{child:016x}",
+                    "parent_uid": parent_uid,
+                    "id": f"video-{num}-{child}",
+                    "title": f"Video {child}",
+                    "media_location": f"video{num}{child}",
+                }
+            )
+    return jsons
+
+
+def _linear_scan(jsons):
+    """Find children by scanning every record for each embed, as an unindexed lookup would"""
+    return {
+        json_file["_uid"]: [
+            child for child in jsons if child["parent_uid"] == json_file["_uid"]
+        ]
+        for json_file in jsons
+        if json_file.get("inline_embed_id")
+    }
+
+
+def main():
+    """Run the benchmark and print the timings"""
+    largest = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    sizes = [largest // 8, largest // 4, largest // 2, largest]
+    print(
+        f"{'embeds':>8} {'records':>8} {'indexed':>10} {'per record':>12} {'scan':>10}"
+    )
+    for num_embeds in sizes:
+        jsons = make_jsons(num_embeds)
+        indexed = min(timeit.repeat(partial(compose_embedded_media, jsons), number=1))
+        scan = min(timeit.repeat(partial(_linear_scan, jsons), number=1, repeat=1))
+        per_record = indexed / len(jsons) * 1e6
+        print(
+            f"{num_embeds:>8} {len(jsons):>8} {indexed:>9.4f}s {per_record:>10.2f}us"
+            f" {scan:>9.4f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
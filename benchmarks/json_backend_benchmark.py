@@ -0,0 +1,82 @@
+"""
+Compare the JSON backends on a synthetic course
+
+Usage: python -m benchmarks.json_backend_benchmark [number_of_files]
+"""
+
+import json
+import os
+from pathlib import Path
+import sys
+from tempfile import TemporaryDirectory
+import timeit
+
+from ocw_data_parser import json_backend
+from ocw_data_parser.ocw_data_parser import load_raw_jsons
+
+
+def make_course(course_dir, num_files):
+    """
+    Write a synthetic course with num_files raw JSON files
+
+    Args:
+        course_dir (Path): The course directory to create
+        num_files (int): How many N.json files to write
+    """
+    jsons_dir = course_dir / "0"
+    os.makedirs(jsons_dir)
+    for num in range(1, num_files + 1):
+        record = {
+            "_uid": f"{num:032x}",
+            "parent_uid": f"{num // 10:032x}",
+            "id": f"page-{num}",
+            "title": f"Page {num} – lecture notes",
+            "_content_type": "text/html",
+            "_type": "CourseSection",
+            "technical_location": f"https://ocw.mit.edu/courses/course/page-{num}",
+            "text": "<p>Lorem ipsum <a href='/ans7870/x.mp4'>dolor</a></p>" * 50,
+            "subject": ["linear algebra", "matrix theory"] * 5,
+            "feature_requirements": [
+                {"ocw_feature": "Lecture notes", "ocw_subfeature": ""}
+            ]
+            * 5,
+        }
+        with open(jsons_dir / f"{num}.json", "w") as file:
+            json.dump(record, file)
+
+
+def main():
+    """Run the benchmark and print the timings"""
+    num_files = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    with TemporaryDirectory() as temp_dir:
+        course_dir = Path(temp_dir) / "course"
+        make_course(course_dir, num_files)
+
+        original = json_backend.get_backend()
+        for backend in json_backend.available_backends():
+            json_backend.set_backend(backend)
+            seconds = min(timeit.repeat(lambda: load_raw_jsons(course_dir), number=1))
+            print(f"load_raw_jsons ({backend}, {num_files} files): {seconds:.3f}s")
+        json_backend.set_backend(original)
+
+        loaded = load_raw_jsons(course_dir)
+        export_path = Path(temp_dir) / "export.json"
+
+        def _stdlib_dump():
+            with open(export_path, "w") as file:
+                json.dump(loaded, file)
+
+        def _backend_dump():
+            with open(export_path, "w") as file:
+                json_backend.dump(loaded, file)
+
+        for name, func in [
+            ("json.dump", _stdlib_dump),
+            ("json_backend", _backend_dump),
+        ]:
+            seconds = min(timeit.repeat(func, number=1, repeat=5))
+            print(f"export ({name}): {seconds:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Compare converting SRT captions to WebVTT in memory with converting them through temporary files
+
+Usage: python -m benchmarks.vtt_benchmark [number_of_caption_files] [captions_per_file]
+"""
+
+from functools import partial
+from pathlib import Path
+import sys
+import tempfile
+import timeit
+
+import webvtt
+
+from ocw_data_parser.utils import srt_to_vtt
+
+
+def make_srt(num_captions):
+    """
+    Make synthetic SRT captions
+
+    Args:
+        num_captions (int): How many captions to create
+
+    Returns:
+        bytes: The SRT captions
+    """
+    lines = []
+    for num in range(num_captions):
+        start = num * 3
+        lines.extend(
+            [
+                str(num + 1),
+                f"00:{start // 60:02d}:{start % 60:02d},000 --> "
+                f"00:{(start + 2) // 60:02d}:{(start + 2) % 60:02d},500",
+                f"This is caption number {num + 1}",
+                "which has a second line",
+                "",
+            ]
+        )
+    return "\n".join(lines).encode()
+
+
+def _convert_with_files(srt_data):
+    """Convert captions by writing them to a temporary directory, as convert_to_vtt used to"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with open(Path(temp_dir) / "data", "wb") as file:
+            file.write(srt_data)
+            file.flush()
+            webvtt.from_srt(Path(temp_dir) / "data").save()
+        with open(Path(temp_dir) / "data.vtt", "rb") as file:
+            return file.read()
+
+
+def _convert_all(convert, srt_files):
+    """Convert each caption file"""
+    for srt_data in srt_files:
+        convert(srt_data)
+
+
+def main():
+    """Run the benchmark and print the timings"""
+    num_files = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    captions_per_file = [
+        int(sys.argv[2]) if len(sys.argv) > 2 else size for size in (10, 100, 1000)
+    ]
+    print(f"{'files':>8} {'captions':>9} {'in memory':>10} {'temp files':>11}")
+    for num_captions in sorted(set(captions_per_file)):
+        srt_files = [make_srt(num_captions)] * num_files
+        assert srt_to_vtt(srt_files[0]) == _convert_with_files(srt_files[0])
+        in_memory = min(
+            timeit.repeat(partial(_convert_all, srt_to_vtt, srt_files), number=1)
+        )
+        with_files = min(
+            timeit.repeat(
+                partial(_convert_all, _convert_with_files, srt_files), number=1
+            )
+        )
+        print(
+            f"{num_files:>8} {num_captions:>9} {in_memory:>9.4f}s {with_files:>10.4f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
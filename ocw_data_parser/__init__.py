@@ -2,8 +2,10 @@
 
 from ocw_data_parser.ocw_data_parser import CustomHTMLParser, OCWParser
 from ocw_data_parser.course_downloader import OCWDownloader
+from ocw_data_parser.course_bundle import bundle_courses, write_course_bundle
 from ocw_data_parser.utils import (
     update_file_location,
+    update_file_locations,
     get_binary_data,
     print_error,
     print_success,
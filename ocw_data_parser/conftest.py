@@ -8,6 +8,7 @@ from moto import mock_s3
 import pytest
 import responses
 
+from ocw_data_parser import http_client
 import ocw_data_parser.test_constants as constants
 from ocw_data_parser.ocw_data_parser import OCWParser
 from ocw_data_parser.course_downloader import OCWDownloader
@@ -16,6 +17,13 @@ from ocw_data_parser.course_downloader import OCWDownloader
 # pylint: disable=redefined-outer-name, unused-argument
 
 
+@pytest.fixture(autouse=True)
+def http_session():
+    """A shared HTTP session which retries without waiting, so failed requests fail quickly"""
+    yield http_client.configure_session(backoff_factor=0)
+    http_client.configure_session()
+
+
 @pytest.fixture(autouse=True, scope="session")
 def s3_bucket():
     """Fake S3 bucket for testing"""
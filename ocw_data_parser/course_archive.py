@@ -0,0 +1,239 @@
+"""Read raw course JSON directly from .tar, .tar.gz and .zip archives"""
+
+from functools import partial
+from pathlib import PurePosixPath, Path
+import tarfile
+import zipfile
+
+from ocw_data_parser.utils import decode_raw_json, map_with_workers
+
+
+ARCHIVE_SUFFIXES = [".tar.gz", ".tgz", ".tar", ".zip"]
+
+
+def archive_course_name(path):
+    """
+    Get the course directory name for an archive, which is its file name without the suffix
+
+    Args:
+        path (str or Path): Path to a course archive
+
+    Returns:
+        str or None: The course directory name, or None if the path isn't named like an archive
+    """
+    name = Path(path).name
+    for suffix in ARCHIVE_SUFFIXES:
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return None
+
+
+def is_course_archive(path):
+    """
+    Check whether a path points to a course archive
+
+    Args:
+        path (str or Path): A path
+
+    Returns:
+        bool: True if the path is a file with one of the archive suffixes
+    """
+    return Path(path).is_file() and archive_course_name(path) is not None
+
+
+def _json_index(member_name):
+    """
+    Get the integer in the file name of a raw JSON archive member
+
+    Args:
+        member_name (str): The name of an archive member
+
+    Returns:
+        int or None: The integer, or None if the member isn't a raw JSON file in a subdirectory
+    """
+    member_path = PurePosixPath(member_name)
+    if member_path.suffix != ".json" or len(member_path.parts) < 2:
+        return None
+    # Turn file name to int to enforce sequential json loading later
+    return int(member_path.stem)
+
+
+def read_archive_member(archive_path, member_name):
+    """
+    Read the bytes of one archive member
+
+    Args:
+        archive_path (str or Path): Path to the course archive
+        member_name (str): The name of the member
+
+    Returns:
+        bytes: The contents of the member
+    """
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            return archive.read(member_name)
+    with tarfile.open(archive_path, "r|*") as archive:
+        for member in archive:
+            if member.name == member_name:
+                return archive.extractfile(member).read()
+    raise KeyError(f"{member_name} is not in {archive_path}")
+
+
+def read_tar_member(archive_path, offset, size):
+    """
+    Read the bytes of a member of an uncompressed tar archive without reading its headers
+
+    Args:
+        archive_path (str or Path): Path to the tar archive
+        offset (int): Offset of the member's data in the archive
+        size (int): Size of the member in bytes
+
+    Returns:
+        bytes: The contents of the member
+    """
+    with open(archive_path, "rb") as file:
+        file.seek(offset)
+        return file.read(size)
+
+
+def _is_compressed_tar(archive_path):
+    """
+    Check whether a tar archive is compressed
+
+    Args:
+        archive_path (str or Path): Path to the tar archive
+
+    Returns:
+        bool: True if the archive can't be read as an uncompressed tar archive
+    """
+    try:
+        with tarfile.open(archive_path, "r:"):
+            return False
+    except tarfile.ReadError:
+        return True
+
+
+def iter_archive_members(archive_path):
+    """
+    Stream the raw JSON members of an archive without extracting them to disk
+
+    Args:
+        archive_path (str or Path): Path to the course archive
+
+    Yields:
+        tuple(str, int, bytes, callable):
+            The member name, the integer in its file name, its contents and a function which
+            returns its contents again
+    """
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    json_index = _json_index(info.filename)
+                    if json_index is not None:
+                        yield (
+                            info.filename,
+                            json_index,
+                            archive.read(info),
+                            partial(read_archive_member, archive_path, info.filename),
+                        )
+        return
+
+    compressed = _is_compressed_tar(archive_path)
+    # "r|*" reads the archive as a stream, in a single pass, with any compression
+    with tarfile.open(archive_path, "r|*") as archive:
+        for member in archive:
+            if member.isfile():
+                json_index = _json_index(member.name)
+                if json_index is not None:
+                    data = archive.extractfile(member).read()
+                    if compressed:
+                        # Reading the member again would decompress the archive up to it, so
+                        # keep the bytes from this pass instead
+                        read_record = partial(bytes, data)
+                    else:
+                        read_record = partial(
+                            read_tar_member,
+                            archive_path,
+                            member.offset_data,
+                            member.size,
+                        )
+                    yield member.name, json_index, data, read_record
+
+
+def load_archive_json(archive_path, json_index):
+    """
+    Decode the first member stored as <json_index>.json
+
+    Args:
+        archive_path (str or Path): Path to the course archive
+        json_index (int): The integer in the member's file name
+
+    Returns:
+        dict: The decoded record
+    """
+    for _, member_index, data, _ in iter_archive_members(archive_path):
+        if member_index == json_index:
+            return decode_raw_json(data, json_index)
+    raise KeyError(f"{json_index}.json is not in {archive_path}")
+
+
+def load_archive_jsons(
+    archive_path, max_workers=None, lazy_payloads=False, projected=False
+):
+    """
+    Load every raw JSON member of a course archive, the same way load_raw_jsons loads a
+    course directory
+
+    Args:
+        archive_path (str or Path): Path to the course archive
+        max_workers (int or None):
+            If set to more than one, decode zip members using a thread pool. Tar archives are
+            always streamed in a single pass.
+        lazy_payloads (bool):
+            If true, replace base64 data with LazyPayload references to the archive member.
+            Compressed tar archives can't be read at an offset, so their raw records are kept
+            in memory for these instead.
+        projected (bool): If true, only decode the keys the parser reads
+
+    Returns:
+        list of dict:
+            The JSON from the course sorted by order index
+    """
+    archive_path = Path(archive_path)
+
+    def _decode(member):
+        _, json_index, data, read_record = member
+        return decode_raw_json(
+            data,
+            json_index,
+            read_record=read_record,
+            lazy_payloads=lazy_payloads,
+            projected=projected,
+        )
+
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            members = [
+                (info.filename, _json_index(info.filename))
+                for info in archive.infolist()
+                if not info.is_dir()
+            ]
+            members = [member for member in members if member[1] is not None]
+            loaded_jsons = map_with_workers(
+                lambda member: _decode(
+                    (
+                        *member,
+                        archive.read(member[0]),
+                        partial(read_archive_member, archive_path, member[0]),
+                    )
+                ),
+                members,
+                max_workers=max_workers,
+            )
+    else:
+        loaded_jsons = [
+            _decode(member) for member in iter_archive_members(archive_path)
+        ]
+
+    return sorted(loaded_jsons, key=lambda d: d["order_index"])
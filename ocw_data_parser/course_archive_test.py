@@ -0,0 +1,216 @@
+"""Tests for reading courses from archives"""
+
+import os
+from pathlib import Path
+import shutil
+import tarfile
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+import zipfile
+
+import pytest
+
+import ocw_data_parser.test_constants as constants
+from ocw_data_parser.course_archive import (
+    archive_course_name,
+    is_course_archive,
+    load_archive_json,
+    load_archive_jsons,
+)
+from ocw_data_parser.course_bundle import BUNDLE_SUFFIX, write_course_bundle
+from ocw_data_parser.ocw_data_parser import OCWParser, load_raw_jsons
+from ocw_data_parser.utils import (
+    DATAFIELD_KEYS,
+    LazyPayload,
+    find_course_sources,
+    get_binary_data,
+    is_course_published,
+    parse_all,
+)
+
+
+# pylint: disable=redefined-outer-name
+
+
+def make_archive(source_dir, archive_path, prefix=""):
+    """
+    Write every file in source_dir to an archive, with member names starting with prefix
+
+    Args:
+        source_dir (str or Path): The course directory to archive
+        archive_path (Path): The path of the archive, whose suffix picks the format
+        prefix (str): A directory to put the course in inside the archive
+    """
+    source_dir = Path(source_dir)
+    paths = sorted(path for path in source_dir.rglob("*") if path.is_file())
+    if archive_path.name.endswith(".zip"):
+        with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            for path in paths:
+                archive.write(path, prefix + path.relative_to(source_dir).as_posix())
+    else:
+        mode = "w:gz" if archive_path.name.endswith((".tar.gz", ".tgz")) else "w"
+        with tarfile.open(archive_path, mode) as archive:
+            for path in paths:
+                archive.add(path, prefix + path.relative_to(source_dir).as_posix())
+
+
+@pytest.fixture(params=["course-1.tar", "course-1.tar.gz", "course-1.zip"])
+def archive_path(request):
+    """An archive of course-1 in each supported format"""
+    with TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / request.param
+        make_archive(constants.SINGLE_COURSE_DIR, path)
+        yield path
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ["course-1.tar", "course-1"],
+        ["course-1.tar.gz", "course-1"],
+        ["course-1.tgz", "course-1"],
+        ["course-1.zip", "course-1"],
+        ["course-1.json", None],
+        ["course-1", None],
+    ],
+)
+def test_archive_course_name(name, expected):
+    """archive_course_name should strip the archive suffix"""
+    assert archive_course_name(name) == expected
+
+
+def test_is_course_archive(archive_path):
+    """Only archive files should be detected as archives"""
+    assert is_course_archive(archive_path) is True
+    assert is_course_archive(constants.SINGLE_COURSE_DIR) is False
+
+
+@pytest.mark.parametrize("max_workers", [None, 4])
+def test_load_archive_jsons(archive_path, max_workers):
+    """Loading an archive should give the same JSON as loading the course directory"""
+    expected = load_raw_jsons(constants.SINGLE_COURSE_DIR)
+    assert load_archive_jsons(archive_path, max_workers=max_workers) == expected
+    assert load_raw_jsons(archive_path, max_workers=max_workers) == expected
+
+
+def test_load_archive_jsons_prefixed():
+    """Courses wrapped in a top level directory inside the archive should load the same way"""
+    with TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "course-1.tar.gz"
+        make_archive(constants.SINGLE_COURSE_DIR, path, prefix="./course-1/")
+        assert load_raw_jsons(path) == load_raw_jsons(constants.SINGLE_COURSE_DIR)
+
+
+def test_load_archive_jsons_lazy_payloads(archive_path):
+    """Lazy payloads should be read back from the archive member"""
+    expected = load_raw_jsons(constants.SINGLE_COURSE_DIR)
+    lazy_jsons = load_raw_jsons(archive_path, lazy_payloads=True)
+    lazy_count = 0
+    for expected_json, lazy_json in zip(expected, lazy_jsons):
+        for key in DATAFIELD_KEYS:
+            if key in expected_json:
+                assert isinstance(lazy_json[key]["data"], LazyPayload)
+                if lazy_count < 3:
+                    assert get_binary_data(lazy_json) == get_binary_data(expected_json)
+                lazy_count += 1
+    assert lazy_count > 0
+
+
+def test_load_archive_jsons_lazy_payloads_single_pass(archive_path):
+    """Reading lazy payloads from a tar archive shouldn't read the archive as a stream again"""
+    lazy_jsons = load_raw_jsons(archive_path, lazy_payloads=True)
+    expected = load_raw_jsons(constants.SINGLE_COURSE_DIR)
+    with patch(
+        "ocw_data_parser.course_archive.tarfile.open", side_effect=AssertionError
+    ):
+        for expected_json, lazy_json in zip(expected, lazy_jsons):
+            if any(key in expected_json for key in DATAFIELD_KEYS):
+                assert get_binary_data(lazy_json) == get_binary_data(expected_json)
+
+
+def test_load_archive_jsons_invalid_member():
+    """A non-numeric JSON file name should raise a ValueError, like a course directory does"""
+    with TemporaryDirectory() as temp_dir:
+        source_dir = Path(temp_dir) / "course"
+        os.makedirs(source_dir / "0")
+        (source_dir / "0" / "1.json").write_text("{}")
+        (source_dir / "0" / "test.json").write_text("{}")
+        path = Path(temp_dir) / "course.zip"
+        make_archive(source_dir, path)
+        with pytest.raises(ValueError):
+            load_raw_jsons(path)
+
+
+def test_load_archive_json(archive_path):
+    """load_archive_json should find a single member"""
+    first_json = load_archive_json(archive_path, 1)
+    assert first_json["actual_file_name"] == "1.json"
+    with pytest.raises(KeyError):
+        load_archive_json(archive_path, 99999)
+
+
+def test_parser_from_archive(ocw_parser, archive_path):
+    """OCWParser should read an archive passed as course_dir"""
+    with TemporaryDirectory() as destination_dir:
+        parser = OCWParser(
+            course_dir=archive_path,
+            destination_dir=destination_dir,
+            static_prefix=constants.STATIC_PREFIX,
+        )
+    assert parser.parsed_json == ocw_parser.parsed_json
+
+
+def test_parse_all_archives():
+    """parse_all should parse archives found in courses_dir"""
+    with TemporaryDirectory() as courses_dir, TemporaryDirectory() as destination_dir:
+        make_archive(
+            Path(constants.COURSE_DIR) / "course-1",
+            Path(courses_dir) / "course-1.zip",
+        )
+        make_archive(
+            Path(constants.COURSE_DIR) / "course-2",
+            Path(courses_dir) / "course-2.tar.gz",
+        )
+        with patch(
+            "ocw_data_parser.utils.is_course_published", return_value=True
+        ), patch("ocw_data_parser.OCWParser") as mock_parser:
+            parse_all(courses_dir, destination_dir, upload_parsed_json=False)
+        assert sorted(
+            call.kwargs["course_dir"].name for call in mock_parser.call_args_list
+        ) == ["course-1.zip", "course-2.tar.gz"]
+        assert sorted(path.name for path in Path(destination_dir).iterdir()) == [
+            "course-1",
+            "course-2",
+        ]
+
+
+def test_find_course_sources():
+    """Course directories, bundles and archives should all be found in one walk of the tree"""
+    with TemporaryDirectory() as courses_dir:
+        courses_dir = Path(courses_dir)
+        shutil.copytree(
+            Path(constants.COURSE_DIR) / "course-1", courses_dir / "nested" / "course-1"
+        )
+        write_course_bundle(
+            Path(constants.COURSE_DIR) / "course-2",
+            courses_dir / f"course-2{BUNDLE_SUFFIX}",
+        )
+        make_archive(
+            Path(constants.COURSE_DIR) / "course-2",
+            courses_dir / "nested" / "course-3.tar.gz",
+        )
+        with patch.object(Path, "rglob", side_effect=AssertionError) as mock_rglob:
+            sources = find_course_sources(courses_dir)
+        assert mock_rglob.call_count == 0
+    assert sources == [
+        (courses_dir / "nested" / "course-1", "course-1"),
+        (courses_dir / f"course-2{BUNDLE_SUFFIX}", "course-2"),
+        (courses_dir / "nested" / "course-3.tar.gz", "course-3"),
+    ]
+
+
+def test_is_course_published_archive(archive_path):
+    """is_course_published should read 1.json from an archive"""
+    assert is_course_published(archive_path) == is_course_published(
+        constants.SINGLE_COURSE_DIR
+    )
@@ -0,0 +1,246 @@
+"""
+A single file format holding every raw JSON record of a course
+
+A bundle is laid out as:
+
+- the 8 byte magic string followed by a 4 byte little endian format version
+- the raw JSON records, byte for byte as they were exported from Plone
+- an index, which is a JSON list of [directory name, json index, offset, length] entries
+- the offset and length of the index as 8 byte little endian integers, and the magic string again
+"""
+
+from functools import partial
+import mmap
+import os
+from pathlib import Path
+import struct
+
+from ocw_data_parser import json_backend
+from ocw_data_parser.utils import decode_raw_json, list_raw_json_files, map_with_workers
+
+
+BUNDLE_MAGIC = b"OCWBNDL\x00"
+BUNDLE_VERSION = 1
+BUNDLE_SUFFIX = ".ocwbundle"
+
+_HEADER = struct.Struct(f"<{len(BUNDLE_MAGIC)}sI")
+_FOOTER = struct.Struct(f"<QQ{len(BUNDLE_MAGIC)}s")
+
+
+def is_course_bundle(path):
+    """
+    Check whether a path points to a course bundle
+
+    Args:
+        path (str or Path): A path
+
+    Returns:
+        bool: True if the path is a file which starts with the bundle magic string
+    """
+    path = Path(path)
+    if not path.is_file():
+        return False
+    with open(path, "rb") as file:
+        return file.read(len(BUNDLE_MAGIC)) == BUNDLE_MAGIC
+
+
+def write_course_bundle(course_dir, bundle_path):
+    """
+    Convert a course directory of raw JSON files into a course bundle
+
+    Args:
+        course_dir (str or Path): Course directory path
+        bundle_path (str or Path): Path of the bundle file to write
+    """
+    course_dir = Path(course_dir)
+    index = []
+    with open(bundle_path, "wb") as bundle:
+        bundle.write(_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION))
+        for file_path, json_index in list_raw_json_files(course_dir):
+            with open(file_path, "rb") as file:
+                data = file.read()
+            index.append([file_path.parent.name, json_index, bundle.tell(), len(data)])
+            bundle.write(data)
+        index_data = json_backend.dumps(index).encode()
+        index_offset = bundle.tell()
+        bundle.write(index_data)
+        bundle.write(_FOOTER.pack(index_offset, len(index_data), BUNDLE_MAGIC))
+
+
+def bundle_courses(courses_dir, destination_dir):
+    """
+    Write a course bundle for each course directory found in courses_dir
+
+    Args:
+        courses_dir (str or Path): The directory containing JSON from Plone for each course
+        destination_dir (str or Path): The directory to write a <course>.ocwbundle file to
+
+    Returns:
+        list of Path: The bundles which were written
+    """
+    courses_dir = Path(courses_dir)
+    destination_dir = Path(destination_dir)
+    os.makedirs(destination_dir, exist_ok=True)
+    bundle_paths = []
+    for first_json_path in courses_dir.rglob("1.json"):
+        source_path = first_json_path.parent.parent
+        bundle_path = destination_dir / f"{source_path.name}{BUNDLE_SUFFIX}"
+        write_course_bundle(source_path, bundle_path)
+        bundle_paths.append(bundle_path)
+    return bundle_paths
+
+
+def read_bundle_record(bundle_path, offset, length):
+    """
+    Read one raw JSON record from a bundle without mapping the whole file
+
+    Args:
+        bundle_path (str or Path): Path to the course bundle
+        offset (int): Offset of the record in the bundle
+        length (int): Length of the record in bytes
+
+    Returns:
+        bytes: The raw JSON record
+    """
+    with open(bundle_path, "rb") as file:
+        file.seek(offset)
+        return file.read(length)
+
+
+class CourseBundle:
+    """Memory mapped random access to the records of a course bundle"""
+
+    def __init__(self, bundle_path):
+        """
+        Args:
+            bundle_path (str or Path): Path to the course bundle
+        """
+        self.bundle_path = Path(bundle_path)
+        self._file = open(self.bundle_path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version = _HEADER.unpack_from(self._mmap, 0)
+            index_offset, index_length, footer_magic = _FOOTER.unpack_from(
+                self._mmap, len(self._mmap) - _FOOTER.size
+            )
+        except (ValueError, struct.error) as ex:
+            self.close()
+            raise ValueError(f"{bundle_path} is not a course bundle") from ex
+        if magic != BUNDLE_MAGIC or footer_magic != BUNDLE_MAGIC:
+            self.close()
+            raise ValueError(f"{bundle_path} is not a course bundle")
+        if version != BUNDLE_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported course bundle version {version}")
+        self.entries = json_backend.loads(
+            self._mmap[index_offset : index_offset + index_length]
+        )
+        # Keyed by the record's path relative to the course directory, since each
+        # subdirectory numbers its files from 1
+        self._positions = {
+            f"{entry[0]}/{entry[1]}.json": position
+            for position, entry in enumerate(self.entries)
+        }
+        # The first record with each file name, for lookups without a directory
+        self._first_positions = {}
+        for position, entry in enumerate(self.entries):
+            self._first_positions.setdefault(entry[1], position)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def close(self):
+        """Release the memory map and the file handle"""
+        if getattr(self, "_mmap", None) is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def read_record(self, position):
+        """
+        Get the bytes of a record
+
+        Args:
+            position (int): Position of the record in the bundle index
+
+        Returns:
+            bytes: The raw JSON record
+        """
+        _, _, offset, length = self.entries[position]
+        return self._mmap[offset : offset + length]
+
+    def load_record(self, position, lazy_payloads=False, projected=False):
+        """
+        Decode a record and annotate it like load_raw_jsons does
+
+        Args:
+            position (int): Position of the record in the bundle index
+            lazy_payloads (bool): If true, replace base64 data with LazyPayload references
+            projected (bool): If true, only decode the keys the parser reads
+
+        Returns:
+            dict: The decoded record
+        """
+        _, json_index, offset, length = self.entries[position]
+        return decode_raw_json(
+            self.read_record(position),
+            json_index,
+            read_record=partial(read_bundle_record, self.bundle_path, offset, length),
+            lazy_payloads=lazy_payloads,
+            projected=projected,
+        )
+
+    def load_json(self, json_index, lazy_payloads=False, directory=None):
+        """
+        Decode the record which was stored as <directory>/<json_index>.json
+
+        Args:
+            json_index (int): The integer in the record's original file name
+            lazy_payloads (bool): If true, replace base64 data with LazyPayload references
+            directory (str or None):
+                The name of the record's subdirectory. If None, the first record in the bundle
+                with that file name is used.
+
+        Returns:
+            dict: The decoded record
+        """
+        if directory is None:
+            position = self._first_positions.get(json_index)
+        else:
+            position = self._positions.get(f"{directory}/{json_index}.json")
+        if position is None:
+            raise KeyError(f"{json_index}.json is not in {self.bundle_path}")
+        return self.load_record(position, lazy_payloads=lazy_payloads)
+
+
+def load_bundle_jsons(
+    bundle_path, max_workers=None, lazy_payloads=False, projected=False
+):
+    """
+    Load every record of a course bundle, the same way load_raw_jsons loads a course directory
+
+    Args:
+        bundle_path (str or Path): Path to the course bundle
+        max_workers (int or None): If set to more than one, decode records using a thread pool
+        lazy_payloads (bool): If true, replace base64 data with LazyPayload references
+        projected (bool): If true, only decode the keys the parser reads
+
+    Returns:
+        list of dict:
+            The JSON from the course sorted by order index
+    """
+    with CourseBundle(bundle_path) as bundle:
+        loaded_jsons = map_with_workers(
+            partial(
+                bundle.load_record, lazy_payloads=lazy_payloads, projected=projected
+            ),
+            range(len(bundle)),
+            max_workers=max_workers,
+        )
+    return sorted(loaded_jsons, key=lambda d: d["order_index"])
@@ -0,0 +1,170 @@
+"""Tests for course bundles"""
+
+import json
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+import pytest
+
+import ocw_data_parser.test_constants as constants
+from ocw_data_parser.course_bundle import (
+    BUNDLE_SUFFIX,
+    CourseBundle,
+    bundle_courses,
+    is_course_bundle,
+    load_bundle_jsons,
+    write_course_bundle,
+)
+from ocw_data_parser.ocw_data_parser import OCWParser, load_raw_jsons
+from ocw_data_parser.utils import (
+    DATAFIELD_KEYS,
+    LazyPayload,
+    find_course_sources,
+    get_binary_data,
+    is_course_published,
+    parse_all,
+)
+
+
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture
+def bundle_path():
+    """A course bundle for course-1"""
+    with TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / f"course-1{BUNDLE_SUFFIX}"
+        write_course_bundle(constants.SINGLE_COURSE_DIR, path)
+        yield path
+
+
+def test_is_course_bundle(bundle_path):
+    """Only bundle files should be detected as bundles"""
+    assert is_course_bundle(bundle_path) is True
+    assert is_course_bundle(constants.SINGLE_COURSE_DIR) is False
+    assert (
+        is_course_bundle(Path(constants.SINGLE_COURSE_DIR) / "jsons" / "1.json")
+        is False
+    )
+
+
+@pytest.mark.parametrize("max_workers", [None, 4])
+def test_load_bundle_jsons(bundle_path, max_workers):
+    """Loading a bundle should give the same JSON as loading the course directory"""
+    expected = load_raw_jsons(constants.SINGLE_COURSE_DIR)
+    assert load_bundle_jsons(bundle_path, max_workers=max_workers) == expected
+    assert load_raw_jsons(bundle_path, max_workers=max_workers) == expected
+
+
+def test_load_bundle_jsons_lazy_payloads(bundle_path):
+    """Lazy payloads in a bundle should be read back from the record's byte range"""
+    expected = load_raw_jsons(constants.SINGLE_COURSE_DIR)
+    lazy_jsons = load_raw_jsons(bundle_path, lazy_payloads=True)
+    lazy_count = 0
+    for expected_json, lazy_json in zip(expected, lazy_jsons):
+        for key in DATAFIELD_KEYS:
+            if key in expected_json:
+                assert isinstance(lazy_json[key]["data"], LazyPayload)
+                assert get_binary_data(lazy_json) == get_binary_data(expected_json)
+                lazy_count += 1
+    assert lazy_count > 0
+
+
+def test_course_bundle_random_access(bundle_path):
+    """Records should be readable by their original file name"""
+    with CourseBundle(bundle_path) as bundle:
+        assert len(bundle) == len(load_raw_jsons(constants.SINGLE_COURSE_DIR))
+        first_json = bundle.load_json(1)
+        assert first_json["actual_file_name"] == "1.json"
+        assert first_json["order_index"] == 1
+        position = next(
+            position for position, entry in enumerate(bundle.entries) if entry[1] == 1
+        )
+        assert (
+            bundle.read_record(position)
+            == (Path(constants.SINGLE_COURSE_DIR) / "jsons" / "1.json").read_bytes()
+        )
+        with pytest.raises(KeyError):
+            bundle.load_json(99999)
+
+
+def test_course_bundle_same_file_names():
+    """Records with the same file name in different subdirectories should both be readable"""
+    with TemporaryDirectory() as temp_dir:
+        course_dir = Path(temp_dir) / "course"
+        for directory in ["first", "second"]:
+            os.makedirs(course_dir / directory)
+            (course_dir / directory / "1.json").write_text(
+                json.dumps({"title": directory})
+            )
+        path = Path(temp_dir) / f"course{BUNDLE_SUFFIX}"
+        write_course_bundle(course_dir, path)
+        with CourseBundle(path) as bundle:
+            assert bundle.load_json(1, directory="first")["title"] == "first"
+            assert bundle.load_json(1, directory="second")["title"] == "second"
+            assert bundle.load_json(1)["title"] == bundle.entries[0][0]
+            with pytest.raises(KeyError):
+                bundle.load_json(1, directory="third")
+            with pytest.raises(KeyError):
+                bundle.load_json(2)
+
+
+@pytest.mark.parametrize("contents", [b"", b"{}", b"OCWBNDL\x00"])
+def test_course_bundle_invalid(contents):
+    """Opening something which isn't a bundle should raise a ValueError"""
+    with TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "invalid"
+        path.write_bytes(contents)
+        with pytest.raises(ValueError):
+            CourseBundle(path)
+
+
+def test_parser_from_bundle(ocw_parser, bundle_path):
+    """OCWParser should read a bundle passed as course_dir"""
+    with TemporaryDirectory() as destination_dir:
+        parser = OCWParser(
+            course_dir=bundle_path,
+            destination_dir=destination_dir,
+            static_prefix=constants.STATIC_PREFIX,
+        )
+    assert parser.parsed_json == ocw_parser.parsed_json
+
+
+def test_bundle_courses():
+    """bundle_courses should write one bundle per course directory"""
+    with TemporaryDirectory() as destination_dir:
+        bundle_paths = bundle_courses(constants.COURSE_DIR, destination_dir)
+        assert sorted(path.name for path in bundle_paths) == [
+            f"course-1{BUNDLE_SUFFIX}",
+            f"course-2{BUNDLE_SUFFIX}",
+        ]
+        assert sorted(
+            course_name for _, course_name in find_course_sources(destination_dir)
+        ) == ["course-1", "course-2"]
+
+
+def test_parse_all_bundles():
+    """parse_all should parse bundles found in courses_dir"""
+    with TemporaryDirectory() as courses_dir, TemporaryDirectory() as destination_dir:
+        bundle_courses(constants.COURSE_DIR, courses_dir)
+        with patch(
+            "ocw_data_parser.utils.is_course_published", return_value=True
+        ), patch("ocw_data_parser.OCWParser") as mock_parser:
+            parse_all(courses_dir, destination_dir, upload_parsed_json=False)
+        assert mock_parser.call_count == 2
+        assert sorted(
+            call.kwargs["course_dir"].name for call in mock_parser.call_args_list
+        ) == [f"course-1{BUNDLE_SUFFIX}", f"course-2{BUNDLE_SUFFIX}"]
+        assert sorted(path.name for path in Path(destination_dir).iterdir()) == [
+            "course-1",
+            "course-2",
+        ]
+
+
+def test_is_course_published_bundle(bundle_path):
+    """is_course_published should read 1.json from a bundle"""
+    assert is_course_published(bundle_path) == is_course_published(
+        constants.SINGLE_COURSE_DIR
+    )
@@ -384,6 +384,42 @@ TAG_MAPPING = [
 ]
 
 
+def build_tag_lookup(tag_mapping):
+    """
+    Build a lookup table from rows like those in TAG_MAPPING, checking that each
+    ocw_feature / ocw_subfeature pair is only mapped once
+
+    Args:
+        tag_mapping (list of dict): rows with ocw_feature, ocw_subfeature and course_feature_tag
+
+    Returns:
+        dict: the course_feature_tag for each (ocw_feature, ocw_subfeature) pair
+
+    Raises:
+        ValueError: if a pair is mapped more than once, either to the same tag or to a different one
+    """
+    lookup = {}
+    problems = []
+    for row in tag_mapping:
+        feature, subfeature = row["ocw_feature"], row["ocw_subfeature"]
+        tag = row["course_feature_tag"]
+        if (feature, subfeature) not in lookup:
+            lookup[(feature, subfeature)] = tag
+            continue
+        existing_tag = lookup[(feature, subfeature)]
+        kind = "duplicate" if existing_tag == tag else "conflicting"
+        problems.append(
+            f"{kind} {feature!r} / {subfeature!r} -> {existing_tag!r}, {tag!r}"
+        )
+    if problems:
+        raise ValueError("Invalid course feature tag mapping: " + "; ".join(problems))
+    return lookup
+
+
+# TAG_MAPPING keyed by (ocw_feature, ocw_subfeature)
+TAG_LOOKUP = build_tag_lookup(TAG_MAPPING)
+
+
 def match_course_feature_tag(feature, subfeature):
     """
     Matches a course feature tag to an ocw_feature / ocw_subfeature pair
@@ -395,11 +431,22 @@ def match_course_feature_tag(feature, subfeature):
     Returns:
         string: the course_feature_tag that matches the passed in feature and subfeature
     """
-    return next(
-        (
-            x["course_feature_tag"]
-            for x in TAG_MAPPING
-            if x["ocw_feature"] == feature and x["ocw_subfeature"] == subfeature
-        ),
-        None,
-    )
+    return TAG_LOOKUP.get((feature, subfeature))
+
+
+def match_many(feature_requirements):
+    """
+    Matches a course feature tag to each of a course's feature requirements
+
+    Args:
+        feature_requirements (list of dict): dicts with ocw_feature and ocw_subfeature properties
+
+    Returns:
+        list of string: the matching course_feature_tag for each feature requirement, or None
+    """
+    return [
+        TAG_LOOKUP.get(
+            (feature_requirement["ocw_feature"], feature_requirement["ocw_subfeature"])
+        )
+        for feature_requirement in feature_requirements
+    ]
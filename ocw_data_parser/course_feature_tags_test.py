@@ -0,0 +1,90 @@
+"""Tests for course feature tag matching"""
+
+import pytest
+
+from ocw_data_parser.course_feature_tags import (
+    FEATURE_ASSIGNMENTS,
+    FEATURE_AV_LECTURES,
+    FEATURE_RESOURCE_INDEX,
+    SUBFEATURE_AUDIO,
+    SUBFEATURE_NONE,
+    SUBFEATURE_VIDEO,
+    TAG_LECTURE_AUDIO,
+    TAG_LECTURE_VIDEOS,
+    TAG_MAPPING,
+    TAG_NONE,
+    build_tag_lookup,
+    match_course_feature_tag,
+    match_many,
+)
+
+
+def _scan_tag_mapping(feature, subfeature):
+    """Match a tag by scanning TAG_MAPPING, like match_course_feature_tag used to"""
+    return next(
+        (
+            row["course_feature_tag"]
+            for row in TAG_MAPPING
+            if row["ocw_feature"] == feature and row["ocw_subfeature"] == subfeature
+        ),
+        None,
+    )
+
+
+def test_match_course_feature_tag():
+    """Every row of TAG_MAPPING should be matched the same way a scan would match it"""
+    for row in TAG_MAPPING:
+        feature, subfeature = row["ocw_feature"], row["ocw_subfeature"]
+        assert match_course_feature_tag(feature, subfeature) == _scan_tag_mapping(
+            feature, subfeature
+        )
+    assert match_course_feature_tag(FEATURE_AV_LECTURES, SUBFEATURE_VIDEO) == (
+        TAG_LECTURE_VIDEOS
+    )
+    assert match_course_feature_tag(FEATURE_RESOURCE_INDEX, SUBFEATURE_NONE) == (
+        TAG_NONE
+    )
+    assert match_course_feature_tag(FEATURE_ASSIGNMENTS, "missing") is None
+    assert match_course_feature_tag("missing", SUBFEATURE_NONE) is None
+
+
+def test_match_many():
+    """match_many should match each feature requirement in order"""
+    assert match_many([]) == []
+    assert match_many(
+        [
+            {"ocw_feature": FEATURE_AV_LECTURES, "ocw_subfeature": SUBFEATURE_AUDIO},
+            {"ocw_feature": "missing", "ocw_subfeature": SUBFEATURE_NONE},
+            {
+                "ocw_feature": FEATURE_AV_LECTURES,
+                "ocw_subfeature": SUBFEATURE_VIDEO,
+                "ocw_feature_url": "./resolveuid/123",
+            },
+        ]
+    ) == [TAG_LECTURE_AUDIO, None, TAG_LECTURE_VIDEOS]
+
+
+def test_build_tag_lookup():
+    """The lookup should have one entry for each row of TAG_MAPPING"""
+    lookup = build_tag_lookup(TAG_MAPPING)
+    assert len(lookup) == len(TAG_MAPPING)
+    assert lookup[(FEATURE_AV_LECTURES, SUBFEATURE_AUDIO)] == TAG_LECTURE_AUDIO
+
+
+@pytest.mark.parametrize(
+    "tag, problem",
+    [[TAG_LECTURE_VIDEOS, "duplicate"], [TAG_LECTURE_AUDIO, "conflicting"]],
+)
+def test_build_tag_lookup_invalid(tag, problem):
+    """A feature and subfeature which are mapped twice should raise a ValueError"""
+    tag_mapping = TAG_MAPPING + [
+        {
+            "ocw_feature": FEATURE_AV_LECTURES,
+            "ocw_subfeature": SUBFEATURE_VIDEO,
+            "course_feature_tag": tag,
+        }
+    ]
+    with pytest.raises(ValueError) as exc_info:
+        build_tag_lookup(tag_mapping)
+    assert problem in str(exc_info.value)
+    assert FEATURE_AV_LECTURES in str(exc_info.value)
@@ -0,0 +1,196 @@
+"""
+Find the href of each <a> tag in HTML
+
+extract_links finds the same links as feeding the HTML to CustomHTMLParser, but it only looks at
+tags instead of also unescaping and reporting all the text between them. Declarations and
+processing instructions are rare in course HTML, so any HTML which contains them is handed to
+CustomHTMLParser instead.
+
+The patterns below are adapted from html.parser's private tokenizer, which can change between
+Python releases. html_links_test compares both on every string in the test courses, so a
+difference shows up as a test failure rather than as missing links.
+"""
+
+from html import unescape
+from html.parser import HTMLParser
+import re
+
+
+class CustomHTMLParser(HTMLParser):
+    """Capture links from an HTML file"""
+
+    def __init__(self):
+        super().__init__()
+        self.output_list = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            self.output_list.append(dict(attrs).get("href"))
+
+    def error(self, message):
+        """Raise parsing errors"""
+        raise Exception(message)
+
+
+# Adapted from html.parser, which doesn't expose these
+_STARTTAG_OPEN = re.compile(r"<[a-zA-Z]")
+_TAGFIND = re.compile(r"([a-zA-Z][^\t\n\r\f />\x00]*)(?:\s|/(?!>))*")
+_ATTRFIND = re.compile(
+    r"((?<=[\'\"\s/])[^\s/>][^\s/=>]*)(\s*=+\s*"
+    r"(\'[^\']*\'|\"[^\"]*\"|(?![\'\"])[^>\s]*))?(?:\s|/(?!>))*"
+)
+_LOCATE_STARTTAG_END = re.compile(
+    r"""
+  <[a-zA-Z][^\t\n\r\f />\x00]*       # tag name
+  (?:[\s/]*                          # optional whitespace before attribute name
+    (?:(?<=['"\s/])[^\s/>][^\s/=>]*  # attribute name
+      (?:\s*=+\s*                    # value indicator
+        (?:'[^']*'                   # LITA-enclosed value
+          |"[^"]*"                   # LIT-enclosed value
+          |(?!['"])[^>\s]*           # bare value
+         )
+        \s*                          # possibly followed by a space
+       )?(?:\s|/(?!>))*
+     )*
+   )?
+  \s*                                # trailing whitespace
+""",
+    re.VERBOSE,
+)
+_ENDTAG_FIND = re.compile(r"</\s*([a-zA-Z][-.a-zA-Z0-9:_]*)\s*>")
+_COMMENT_CLOSE = re.compile(r"--\s*>")
+_CDATA_CLOSE = {
+    "script": re.compile(r"</\s*script\s*>", re.I),
+    "style": re.compile(r"</\s*style\s*>", re.I),
+}
+
+
+def _start_tag_end(html, position):
+    """
+    Find the end of the start tag at position
+
+    Returns:
+        int: The index after the tag, or -1 if the tag isn't complete
+    """
+    end = _LOCATE_STARTTAG_END.match(html, position).end()
+    next_char = html[end : end + 1]
+    if next_char == ">":
+        return end + 1
+    if next_char == "/":
+        if html.startswith("/>", end):
+            return end + 2
+        return -1
+    if next_char == "" or next_char in (
+        "abcdefghijklmnopqrstuvwxyz=/ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    ):
+        return -1
+    return end if end > position else position + 1
+
+
+def _read_start_tag(html, position, end):
+    """
+    Read the name and, for tags which matter here, the attributes of a start tag
+
+    Returns:
+        tuple(str, list, bool):
+            The lowercased tag name, which is None if html.parser would treat the tag as text,
+            the attributes, and whether the tag closes itself
+    """
+    match = _TAGFIND.match(html, position + 1)
+    tag = match.group(1).lower()
+    if tag != "a" and tag not in _CDATA_CLOSE:
+        return tag, [], False
+    attrs = []
+    attr_position = match.end()
+    while attr_position < end:
+        match = _ATTRFIND.match(html, attr_position)
+        if not match:
+            break
+        name, rest, value = match.group(1, 2, 3)
+        if not rest:
+            value = None
+        elif value[:1] == "'" == value[-1:] or value[:1] == '"' == value[-1:]:
+            value = value[1:-1]
+        if value:
+            value = unescape(value)
+        attrs.append((name.lower(), value))
+        attr_position = match.end()
+    ending = html[attr_position:end].strip()
+    if ending not in (">", "/>"):
+        return None, attrs, False
+    return tag, attrs, ending == "/>"
+
+
+def _end_tag_end(html, position):
+    """
+    Find the end of the end tag at position
+
+    Returns:
+        int: The index after the tag, or -1 if the tag isn't complete
+    """
+    close = html.find(">", position + 1)
+    if close < 0:
+        return -1
+    if _ENDTAG_FIND.match(html, position):
+        return close + 1
+    name_match = _TAGFIND.match(html, position + 2)
+    if not name_match:
+        if html.startswith("</>", position):
+            return position + 3
+        close = html.find(">", position + 2)
+        return close + 1 if close >= 0 else -1
+    return html.find(">", name_match.end()) + 1
+
+
+def _parser_links(html):
+    """Find links using CustomHTMLParser"""
+    parser = CustomHTMLParser()
+    parser.feed(html)
+    return parser.output_list
+
+
+def extract_links(html):  # pylint: disable=too-many-branches
+    """
+    Find the href of each <a> tag, like CustomHTMLParser does
+
+    Args:
+        html (str): Some HTML
+
+    Returns:
+        list of str: The href of each <a> tag in order, or None for a tag without one
+    """
+    links = []
+    position = 0
+    length = len(html)
+    while position < length:
+        position = html.find("<", position)
+        if position < 0:
+            break
+        if _STARTTAG_OPEN.match(html, position):
+            end = _start_tag_end(html, position)
+            if end < 0:
+                break
+            tag, attrs, closes_itself = _read_start_tag(html, position, end)
+            if tag == "a":
+                links.append(dict(attrs).get("href"))
+            elif tag in _CDATA_CLOSE and not closes_itself:
+                # Nothing is a tag until the matching end tag
+                match = _CDATA_CLOSE[tag].search(html, end)
+                if not match:
+                    break
+                end = match.end()
+        elif html.startswith("</", position):
+            end = _end_tag_end(html, position)
+        elif html.startswith("<!--", position):
+            match = _COMMENT_CLOSE.search(html, position + 4)
+            end = match.end() if match else -1
+        elif html.startswith(("<?", "<!"), position):
+            return _parser_links(html)
+        elif position + 1 < length:
+            end = position + 1
+        else:
+            break
+        if end < 0:
+            break
+        position = end
+    return links
@@ -0,0 +1,76 @@
+"""Tests for finding links in HTML"""
+
+from pathlib import Path
+
+import pytest
+
+import ocw_data_parser.test_constants as constants
+from ocw_data_parser.html_links import CustomHTMLParser, extract_links
+from ocw_data_parser.ocw_data_parser import load_raw_jsons
+
+
+def parser_links(html):
+    """Find links with CustomHTMLParser"""
+    parser = CustomHTMLParser()
+    parser.feed(html)
+    return parser.output_list
+
+
+def corpus_html(value):
+    """Every string containing a tag in some course JSON, including nested values"""
+    if isinstance(value, str):
+        if "<" in value:
+            yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from corpus_html(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from corpus_html(item)
+
+
+@pytest.mark.parametrize(
+    "course_dir",
+    sorted(path for path in Path(constants.COURSE_DIR).iterdir() if path.is_dir()),
+    ids=lambda path: path.name,
+)
+def test_extract_links_corpus(course_dir):
+    """extract_links should find the same links as CustomHTMLParser in each test course"""
+    count = 0
+    for html in corpus_html(load_raw_jsons(course_dir)):
+        assert extract_links(html) == parser_links(html)
+        count += 1
+    assert count > 0
+
+
+@pytest.mark.parametrize(
+    "html",
+    [
+        "",
+        "no tags",
+        "<a href=\"/ans7870/a.mp4\">one</a><A HREF='/ans7870/b.mp4'>two</A>",
+        "<a href=/ans7870/bare.mp4>bare</a>",
+        '<a href="first" href="second">last wins</a>',
+        "<a name=anchor>no href</a><a href>empty</a>",
+        '<a href="/ans7870/x.mp4?a=1&amp;b=2">escaped</a>',
+        '<a href="x.mp4"/><abbr href="no">abbr</abbr><a\nhref="newline">',
+        '<!-- <a href="commented"> --><a href="after">',
+        '<script>var x = "<a href=\'in script\'>";</script><a href="after">',
+        '<style><a href="in style"></style ><a href="after">',
+        '<img alt="<a href=\'in attribute\'>"><a href="after">',
+        '<p a = "1"  <a href="broken">',
+        '1 < 2 <a href="after less than">',
+        '</ p><a href="after bad end tag"></>',
+        '<a href="incomplete',
+        '<a href="x"><script><a href="unclosed script">',
+        '<!DOCTYPE html><a href="after doctype">',
+        '<?php echo 1 ?><a href="after pi">',
+        '<![CDATA[<a href="in cdata">]]><a href="after cdata">',
+        '<a href="trailing"><',
+        '<a href="x" / >',
+        '<a/href="slash">',
+    ],
+)
+def test_extract_links_edge_cases(html):
+    """extract_links should match CustomHTMLParser on unusual HTML"""
+    assert extract_links(html) == parser_links(html)
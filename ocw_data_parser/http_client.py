@@ -0,0 +1,170 @@
+"""
+A shared HTTP session for downloading media, like the files on old.ocw.mit.edu and the ans7870 hosts
+
+The session keeps connections alive between requests, limits how many connections are open to each
+host, sets a timeout on every request and retries failed requests with exponential backoff.
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# Seconds to wait to connect, and then between bytes of the response
+DEFAULT_TIMEOUT = (10, 60)
+DEFAULT_RETRIES = 3
+# Retries wait backoff_factor * 2 ** (retry number - 1) seconds
+DEFAULT_BACKOFF_FACTOR = 0.5
+# The most connections to keep open to any one host
+DEFAULT_MAX_CONNECTIONS_PER_HOST = 10
+# How many hosts to keep connections open to
+DEFAULT_MAX_HOSTS = 10
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+# Holds the shared session under "session" once it's been created
+_SHARED = {}
+_SHARED_LOCK = threading.Lock()
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """An HTTPAdapter which uses a default timeout for requests which don't set one"""
+
+    def __init__(self, *args, timeout=DEFAULT_TIMEOUT, **kwargs):
+        """
+        Args:
+            timeout (float or tuple(float, float)): The timeout for requests, in seconds
+        """
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def make_session(  # pylint: disable=too-many-arguments
+    timeout=DEFAULT_TIMEOUT,
+    retries=DEFAULT_RETRIES,
+    backoff_factor=DEFAULT_BACKOFF_FACTOR,
+    max_connections_per_host=DEFAULT_MAX_CONNECTIONS_PER_HOST,
+    max_hosts=DEFAULT_MAX_HOSTS,
+):
+    """
+    Create an HTTP session with connection pooling, timeouts and retries
+
+    Args:
+        timeout (float or tuple(float, float)): The connect and read timeouts, in seconds
+        retries (int): How many times to retry a request which fails to connect or read,
+            or which gets a response with one of RETRY_STATUSES
+        backoff_factor (float): Controls how long to wait between retries
+        max_connections_per_host (int): The most connections to open to a host at once.
+            Requests wait for a connection to be free once this many are in use.
+        max_hosts (int): How many hosts to keep connections open to
+
+    Returns:
+        requests.Session: The session
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        # Return the last response after retrying so callers can call raise_for_status
+        raise_on_status=False,
+    )
+    adapter = TimeoutHTTPAdapter(
+        timeout=timeout,
+        max_retries=retry,
+        pool_connections=max_hosts,
+        pool_maxsize=max_connections_per_host,
+        pool_block=True,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session():
+    """
+    Get the shared HTTP session, creating it with the default settings if needed
+
+    Returns:
+        requests.Session: The shared session
+    """
+    with _SHARED_LOCK:
+        if "session" not in _SHARED:
+            _SHARED["session"] = make_session()
+        return _SHARED["session"]
+
+
+def configure_session(**kwargs):
+    """
+    Replace the shared HTTP session with one using different settings
+
+    Args:
+        **kwargs: Arguments for make_session
+
+    Returns:
+        requests.Session: The new shared session
+    """
+    session = make_session(**kwargs)
+    with _SHARED_LOCK:
+        previous = _SHARED.get("session")
+        _SHARED["session"] = session
+    if previous is not None:
+        previous.close()
+    return session
+
+
+def get(url, **kwargs):
+    """
+    Send a GET request using the shared HTTP session
+
+    Args:
+        url (str): The URL to get
+        **kwargs: Other arguments for requests.Session.get, like stream
+
+    Returns:
+        requests.Response: The response
+    """
+    return get_session().get(url, **kwargs)
+
+
+def conditional_headers(validators):
+    """
+    Headers for a request which only gets a file if it has changed
+
+    Args:
+        validators (dict or None): The etag and last_modified from response_validators
+
+    Returns:
+        dict: The If-None-Match and If-Modified-Since headers
+    """
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def response_validators(response):
+    """
+    Get the headers which identify the version of a file from a response
+
+    Args:
+        response (requests.Response): A response
+
+    Returns:
+        dict: The etag and last_modified of the file, for the headers the response has
+    """
+    validators = {}
+    if response.headers.get("ETag"):
+        validators["etag"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        validators["last_modified"] = response.headers["Last-Modified"]
+    return validators
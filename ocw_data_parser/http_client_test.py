@@ -0,0 +1,138 @@
+"""Tests for the shared HTTP session"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+
+import pytest
+import requests
+
+from ocw_data_parser import http_client
+
+
+# pylint: disable=redefined-outer-name
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Respond to requests with the statuses in server.statuses, then with 200"""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Send the next status"""
+        with self.server.lock:
+            self.server.requests += 1
+            status = self.server.statuses.pop(0) if self.server.statuses else 200
+        if self.path == "/slow":
+            time.sleep(1)
+        body = self.path.encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Don't log requests"""
+
+
+@pytest.fixture
+def stub_server():
+    """A local HTTP server which counts connections and requests"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.requests = 0
+    server.statuses = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _url(server, path):
+    """The URL of a path on the stub server"""
+    host, port = server.server_address
+    return f"http://{host}:{port}{path}"
+
+
+def test_connection_reuse(stub_server):
+    """Requests to the same host should reuse a connection"""
+    session = http_client.make_session()
+    for number in range(5):
+        response = session.get(_url(stub_server, f"/{number}"))
+        assert response.content == f"/{number}".encode()
+    assert stub_server.requests == 5
+    assert stub_server.connections == 1
+
+
+def test_connections_per_host(stub_server):
+    """Concurrent requests should not open more connections than the limit"""
+    session = http_client.make_session(max_connections_per_host=2)
+    threads = [
+        threading.Thread(target=session.get, args=(_url(stub_server, "/slow"),))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stub_server.requests == 4
+    assert stub_server.connections == 2
+
+
+def test_retry(stub_server):
+    """Requests which get a server error should be retried"""
+    stub_server.statuses = [503, 500]
+    session = http_client.make_session(backoff_factor=0)
+    response = session.get(_url(stub_server, "/file"))
+    assert response.status_code == 200
+    assert stub_server.requests == 3
+
+
+def test_retry_exhausted(stub_server):
+    """The last response should be returned if the retries run out"""
+    stub_server.statuses = [503, 503, 503]
+    session = http_client.make_session(retries=2, backoff_factor=0)
+    response = session.get(_url(stub_server, "/file"))
+    assert response.status_code == 503
+    with pytest.raises(requests.exceptions.HTTPError):
+        response.raise_for_status()
+    assert stub_server.requests == 3
+
+
+def test_no_retry_not_found(stub_server):
+    """Client errors should not be retried"""
+    stub_server.statuses = [404]
+    session = http_client.make_session(backoff_factor=0)
+    assert session.get(_url(stub_server, "/file")).status_code == 404
+    assert stub_server.requests == 1
+
+
+def test_timeout(stub_server):
+    """Requests should time out by default"""
+    session = http_client.make_session(timeout=0.2, retries=1, backoff_factor=0)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        session.get(_url(stub_server, "/slow"))
+    assert stub_server.requests == 2
+
+
+def test_shared_session(stub_server):
+    """get should use the shared session, which configure_session replaces"""
+    session = http_client.get_session()
+    assert http_client.get_session() is session
+    try:
+        new_session = http_client.configure_session(retries=0)
+        assert new_session is not session
+        assert http_client.get_session() is new_session
+        for _ in range(2):
+            assert http_client.get(_url(stub_server, "/file")).ok
+        assert stub_server.connections == 1
+    finally:
+        http_client.configure_session()
@@ -0,0 +1,148 @@
+"""
+JSON encoding and decoding used when loading raw course JSON and exporting parsed JSON
+
+orjson is used for decoding when it is installed, otherwise the standard library is used.
+Encoding always goes through the standard library so that exported files stay byte-for-byte
+identical no matter which backend is installed.
+"""
+
+import json
+import re
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+BACKEND_JSON = "json"
+BACKEND_ORJSON = "orjson"
+
+_SETTINGS = {"backend": BACKEND_ORJSON if orjson is not None else BACKEND_JSON}
+
+# orjson turns integers outside the 64 bit range into floats instead of raising an error.
+# Any float this large might have been such an integer, so those documents are left to json.
+_LARGEST_EXACT_INT = 2**63
+# Such an integer has at least 19 digits, so documents without a run of 19 digits don't need
+# to be checked
+_LONG_DIGITS = re.compile(rb"\d{19}")
+_LONG_DIGITS_STR = re.compile(r"\d{19}")
+
+
+def _has_large_float(value):
+    """
+    Check whether a decoded value contains a float which might have been a large integer
+
+    Args:
+        value (any): A decoded JSON value
+
+    Returns:
+        bool: True if any float in the value is at least 2 ** 63 in magnitude
+    """
+    if isinstance(value, float):
+        return abs(value) >= _LARGEST_EXACT_INT
+    if isinstance(value, dict):
+        value = value.values()
+    elif not isinstance(value, list):
+        return False
+    return any(_has_large_float(item) for item in value if not isinstance(item, str))
+
+
+def available_backends():
+    """
+    List the backends which can be used in this environment
+
+    Returns:
+        list of str: Backend names
+    """
+    return [BACKEND_JSON] + ([BACKEND_ORJSON] if orjson is not None else [])
+
+
+def get_backend():
+    """
+    Get the name of the backend currently used for decoding
+
+    Returns:
+        str: The backend name
+    """
+    return _SETTINGS["backend"]
+
+
+def set_backend(name):
+    """
+    Select the backend used for decoding
+
+    Args:
+        name (str): One of the names returned by available_backends()
+    """
+    if name not in available_backends():
+        raise ValueError(f"JSON backend {name} is not available")
+    _SETTINGS["backend"] = name
+
+
+def loads(data):
+    """
+    Decode a JSON document
+
+    Args:
+        data (bytes or str): The JSON document
+
+    Returns:
+        any: The decoded value
+    """
+    if _SETTINGS["backend"] == BACKEND_ORJSON:
+        try:
+            decoded = orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson is stricter than the standard library (NaN, lone surrogates),
+            # so let json decide whether the document is really invalid
+            pass
+        else:
+            long_digits = _LONG_DIGITS_STR if isinstance(data, str) else _LONG_DIGITS
+            if long_digits.search(data) is None or not _has_large_float(decoded):
+                return decoded
+    return json.loads(data)
+
+
+def load_path(path):
+    """
+    Read and decode a JSON file
+
+    Args:
+        path (str or Path): Path to a JSON file
+
+    Returns:
+        any: The decoded value
+    """
+    with open(path, "rb") as file:
+        return loads(file.read())
+
+
+def dumps(obj, beautify=False):
+    """
+    Encode a value to a JSON string
+
+    Args:
+        obj (any): The value to encode
+        beautify (bool): Pretty print with sorted keys and an indent of 4
+
+    Returns:
+        str: The JSON document
+    """
+    if beautify:
+        return json.dumps(obj, sort_keys=True, indent=4)
+    # A one-shot dumps uses the C encoder for the whole document, unlike json.dump
+    # which writes the output in many small chunks
+    return json.dumps(obj)
+
+
+def dump(obj, file, beautify=False):
+    """
+    Encode a value and write it to a text file
+
+    Args:
+        obj (any): The value to encode
+        file (file): A file opened for writing text
+        beautify (bool): Pretty print with sorted keys and an indent of 4
+    """
+    file.write(dumps(obj, beautify=beautify))
@@ -0,0 +1,92 @@
+"""Tests for the JSON backend"""
+
+import json
+from io import StringIO
+
+import pytest
+
+from ocw_data_parser import json_backend
+
+
+# pylint: disable=unused-argument,redefined-outer-name
+
+
+@pytest.fixture(params=json_backend.available_backends())
+def backend(request):
+    """Run a test once for each available backend, restoring the original afterwards"""
+    original = json_backend.get_backend()
+    json_backend.set_backend(request.param)
+    yield request.param
+    json_backend.set_backend(original)
+
+
+def test_set_backend_invalid():
+    """An unknown backend name should raise a ValueError"""
+    with pytest.raises(ValueError):
+        json_backend.set_backend("xyzzy")
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        '{"a": 1, "b": [1.5, "two", null, true], "c": {"d": "\\u00e9"}}',
+        b'{"a": "caf\\u00e9", "b": "\xc3\xa9"}',
+        '{"nan": NaN, "inf": Infinity}',
+        '{"big": 123456789012345678901234567890}',
+        '{"small": -9223372036854775809}',
+        '{"surrogate": "\\ud800"}',
+        '{"dup": 1, "dup": 2}',
+    ],
+)
+def test_loads_matches_stdlib(backend, document):
+    """Every backend should decode documents the same way json.loads does"""
+    expected = json.loads(document)
+    actual = json_backend.loads(document)
+    assert repr(actual) == repr(expected)
+
+
+def test_loads_skips_float_check(backend, mocker):
+    """Decoded documents should only be checked for large floats if they have long numbers"""
+    has_large_float = mocker.patch(
+        "ocw_data_parser.json_backend._has_large_float", return_value=False
+    )
+    assert json_backend.loads('{"a": [1.5, 12345678901234567]}') == {
+        "a": [1.5, 12345678901234567]
+    }
+    has_large_float.assert_not_called()
+    json_backend.loads(b'{"a": 1234567890123456789}')
+    assert has_large_float.call_count == (
+        1 if backend == json_backend.BACKEND_ORJSON else 0
+    )
+
+
+def test_loads_invalid(backend):
+    """Invalid documents should raise json.JSONDecodeError for every backend"""
+    with pytest.raises(json.decoder.JSONDecodeError):
+        json_backend.loads("{")
+
+
+def test_load_path(backend):
+    """load_path should read and decode a file"""
+    path = "ocw_data_parser/test_json/course_dir/course-1/jsons/1.json"
+    with open(path) as file:
+        expected = json.load(file)
+    assert json_backend.load_path(path) == expected
+
+
+@pytest.mark.parametrize("beautify", [True, False])
+def test_dump_matches_stdlib(ocw_parser, beautify):
+    """Encoded parsed JSON should be identical to the json module's output"""
+    expected = StringIO()
+    if beautify:
+        json.dump(ocw_parser.parsed_json, expected, sort_keys=True, indent=4)
+    else:
+        json.dump(ocw_parser.parsed_json, expected)
+
+    actual = StringIO()
+    json_backend.dump(ocw_parser.parsed_json, actual, beautify=beautify)
+    assert actual.getvalue() == expected.getvalue()
+    assert (
+        json_backend.dumps(ocw_parser.parsed_json, beautify=beautify)
+        == expected.getvalue()
+    )
@@ -0,0 +1,106 @@
+"""
+A parsed JSON dict whose larger sections are composed the first time they are read
+
+Everything which reads the whole dict, like items(), values(), ==, repr() and json.dumps, composes
+the remaining sections first, so it can be used anywhere the plain dict was.
+"""
+
+
+class LazySection:  # pylint: disable=too-few-public-methods
+    """A placeholder for a section of the parsed JSON which hasn't been composed yet"""
+
+    __slots__ = ("compose",)
+
+    def __init__(self, compose):
+        """
+        Args:
+            compose (callable): Called with no arguments to compose the section
+        """
+        self.compose = compose
+
+
+class LazyParsedJson(dict):
+    """
+    A dict where LazySection values are replaced by the section they compose on first access
+    """
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if isinstance(value, LazySection):
+            value = value.compose()
+            dict.__setitem__(self, key, value)
+        return value
+
+    def __iter__(self):
+        # Defining __iter__ makes dict(), {**...} and dict.update read values through
+        # __getitem__ instead of copying the placeholders
+        return dict.__iter__(self)
+
+    def __eq__(self, other):
+        self.compose_all()
+        if isinstance(other, LazyParsedJson):
+            other.compose_all()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        self.compose_all()
+        return dict.__repr__(self)
+
+    def __reduce__(self):
+        # Copies and pickles are plain dicts with every section composed
+        return dict, (dict(self),)
+
+    def is_composed(self, key):
+        """
+        Check whether a section has been composed yet
+
+        Args:
+            key (str): A key of the parsed JSON
+
+        Returns:
+            bool: False if the value of key is still waiting to be composed
+        """
+        return not isinstance(dict.__getitem__(self, key), LazySection)
+
+    def compose_all(self):
+        """
+        Compose every section which hasn't been read yet
+
+        Returns:
+            LazyParsedJson: This dict
+        """
+        for key in list(dict.keys(self)):
+            self[key]  # pylint: disable=pointless-statement
+        return self
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def items(self):
+        return dict.items(self.compose_all())
+
+    def values(self):
+        return dict.values(self.compose_all())
+
+    def copy(self):
+        return dict(self)
+
+    def pop(self, key, *default):
+        if key in self:
+            self[key]  # pylint: disable=pointless-statement
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        self.compose_all()
+        return dict.popitem(self)
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        return dict.setdefault(self, key, default)
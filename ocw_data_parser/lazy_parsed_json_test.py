@@ -0,0 +1,86 @@
+"""Tests for the lazily composed parsed JSON"""
+
+import copy
+import json
+import pickle
+from unittest.mock import Mock
+
+import pytest
+
+from ocw_data_parser.lazy_parsed_json import LazyParsedJson, LazySection
+
+
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture
+def compose():
+    """A compose function for a single section"""
+    return Mock(return_value=[{"uid": "abc"}])
+
+
+@pytest.fixture
+def lazy_json(compose):
+    """A parsed JSON with one section which hasn't been composed"""
+    return LazyParsedJson(
+        {"uid": "123", "course_files": LazySection(compose), "title": "Title"}
+    )
+
+
+EXPECTED = {"uid": "123", "course_files": [{"uid": "abc"}], "title": "Title"}
+
+
+def test_compose_on_first_read(lazy_json, compose):
+    """A section should be composed once, the first time it is read"""
+    assert lazy_json["uid"] == "123"
+    assert lazy_json.get("missing") is None
+    assert "course_files" in lazy_json
+    assert len(lazy_json) == 3
+    assert list(lazy_json) == ["uid", "course_files", "title"]
+    assert lazy_json.is_composed("course_files") is False
+    compose.assert_not_called()
+
+    assert lazy_json.get("course_files") == [{"uid": "abc"}]
+    assert lazy_json["course_files"] is lazy_json["course_files"]
+    assert lazy_json.is_composed("course_files") is True
+    compose.assert_called_once_with()
+
+
+@pytest.mark.parametrize(
+    "read",
+    [
+        dict,
+        lambda value: {**value},
+        lambda value: dict(value.items()),
+        lambda value: dict(zip(value.keys(), value.values())),
+        LazyParsedJson.copy,
+        copy.deepcopy,
+        lambda value: pickle.loads(pickle.dumps(value)),
+        lambda value: json.loads(json.dumps(value)),
+        LazyParsedJson.compose_all,
+    ],
+)
+def test_read_whole(lazy_json, compose, read):
+    """Reading the whole dict should compose every section"""
+    assert read(lazy_json) == EXPECTED
+    compose.assert_called_once_with()
+
+
+def test_compare(lazy_json):
+    """Comparisons should compare the composed sections"""
+    assert lazy_json == EXPECTED
+    assert EXPECTED == lazy_json
+    assert not lazy_json != EXPECTED  # pylint: disable=unneeded-not
+    assert lazy_json != {**EXPECTED, "title": "Other"}
+    assert repr(lazy_json) == repr(EXPECTED)
+
+
+def test_mutate(lazy_json, compose):
+    """Setting or removing a section should behave like a dict"""
+    assert lazy_json.setdefault("course_files", []) == [{"uid": "abc"}]
+    assert lazy_json.pop("course_files") == [{"uid": "abc"}]
+    assert lazy_json.setdefault("course_files", []) == []
+    assert lazy_json.popitem() == ("course_files", [])
+    lazy_json["title"] = "New"
+    assert lazy_json == {"uid": "123", "title": "New"}
+    compose.assert_called_once_with()
@@ -0,0 +1,375 @@
+"""
+An on-disk cache of downloaded media, shared between courses
+
+Files are stored once under the SHA-256 hash of their content, with an index from each URL to the
+hash of the file downloaded from it. The same ans7870 videos and shared images are linked from many
+courses, so once one parser has downloaded a file the rest read it from disk. The ETag and
+Last-Modified headers of each file are kept too, so a later run only downloads files which have
+changed. When the cache grows past its size limit the least recently used files are removed,
+apart from files which are being opened by MediaCache.open.
+
+The cache is off until configure_media_cache is called.
+"""
+
+from contextlib import contextmanager
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import tempfile
+import threading
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 20 * 1024**3
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Holds the shared cache under "cache" once it's been configured
+_SHARED = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def url_key(url):
+    """
+    The part of a URL which identifies a file, ignoring the scheme and the old.ocw.mit.edu alias
+
+    Args:
+        url (str): A URL
+
+    Returns:
+        str: The URL without its scheme, with old.ocw.mit.edu replaced by ocw.mit.edu
+    """
+    key = url.split("://", 1)[-1]
+    if key.startswith("old.ocw.mit.edu/"):
+        key = key[len("old.") :]
+    return key
+
+
+def file_hash(path):
+    """
+    Hash a file a chunk at a time
+
+    Args:
+        path (Path): The file to hash
+
+    Returns:
+        str: The hex SHA-256 digest of the file's content
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MediaCache:  # pylint: disable=too-many-instance-attributes
+    """A size limited, content addressed cache of downloaded files"""
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        """
+        Args:
+            directory (str or Path): Where to keep the cached files
+            max_size (int): How many bytes of files to keep before removing the least recently used
+        """
+        directory = Path(directory)
+        self.max_size = max_size
+        self.objects_dir = directory / "objects"
+        self.urls_dir = directory / "urls"
+        self.tmp_dir = directory / "tmp"
+        for path in (self.objects_dir, self.urls_dir, self.tmp_dir):
+            os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._url_locks = {}
+        # The keys of URLs which have been downloaded or checked for changes
+        self._checked = set()
+        # How many threads are opening each file, which keeps it from being evicted
+        self._pins = {}
+        self._size = None
+
+    def object_path(self, content_hash):
+        """
+        Where the file with a content hash is stored
+
+        Args:
+            content_hash (str): The hex SHA-256 digest of the file's content
+
+        Returns:
+            Path: The path of the file in the cache
+        """
+        return self.objects_dir / content_hash[:2] / content_hash
+
+    def _index_path(self, url):
+        """The path of the index entry for a URL"""
+        return self.urls_dir / hashlib.sha256(url_key(url).encode("utf-8")).hexdigest()
+
+    def _read_index(self, url):
+        """The index entry for a URL, or None if it hasn't been downloaded"""
+        try:
+            return json.loads(self._index_path(url).read_text())
+        except FileNotFoundError:
+            return None
+
+    def lookup(self, url):
+        """
+        Find the cached file for a URL, marking it as recently used
+
+        Args:
+            url (str): The URL the file was downloaded from
+
+        Returns:
+            Path or None: The cached file, or None if the URL hasn't been downloaded
+        """
+        entry = self._read_index(url)
+        if entry is None:
+            return None
+        path = self.object_path(entry["hash"])
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def _pin(self, path, must_exist=True):
+        """
+        Keep a file from being evicted until it's unpinned
+
+        Returns:
+            bool: False if must_exist is set and the file has already been evicted
+        """
+        with self._lock:
+            if must_exist and not path.exists():
+                return False
+            self._pins[path] = self._pins.get(path, 0) + 1
+            return True
+
+    def _unpin(self, path):
+        """Let a pinned file be evicted again, once every thread which pinned it unpins it"""
+        with self._lock:
+            self._pins[path] -= 1
+            if not self._pins[path]:
+                del self._pins[path]
+
+    def store(self, url, source_path, validators=None, pin=False):
+        """
+        Move a downloaded file into the cache
+
+        Args:
+            url (str): The URL the file was downloaded from
+            source_path (Path): The downloaded file, which should be in tmp_dir
+            validators (dict or None): The etag and last_modified of the file
+            pin (bool): If true, the file is pinned before it's added, so it can't be evicted
+
+        Returns:
+            Path: The cached file
+        """
+        content_hash = file_hash(source_path)
+        path = self.object_path(content_hash)
+        if pin:
+            self._pin(path, must_exist=False)
+        os.makedirs(path.parent, exist_ok=True)
+        if path.exists():
+            # Another URL had the same content
+            os.unlink(source_path)
+            os.utime(path)
+            added = 0
+        else:
+            os.replace(source_path, path)
+            added = path.stat().st_size
+        index_path = self._index_path(url)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.tmp_dir, delete=False
+        ) as index_file:
+            json.dump({**(validators or {}), "hash": content_hash}, index_file)
+        os.replace(index_file.name, index_path)
+        with self._lock:
+            if self._size is not None:
+                self._size += added
+        self._evict(keep=path)
+        return path
+
+    def fetch(self, url, download):
+        """
+        Get the cached file for a URL, downloading it first if it isn't cached.
+        The first time a cached file is fetched by this MediaCache, it is downloaded again
+        only if the server says it has changed since it was cached.
+        Only one thread downloads a URL at a time, and the others wait to use its file.
+
+        The file can be evicted by other threads as soon as this returns, so use open to read it
+        while the cache is shared.
+
+        Args:
+            url (str): The URL of the file
+            download (callable):
+                Called with the URL, a path to download the file to and, if the file is already
+                cached, validators=the etag and last_modified it was cached with. Returns the
+                validators of the downloaded file, or None if the cached file hasn't changed.
+
+        Returns:
+            Path: The cached file
+        """
+        return self._fetch(url, download)
+
+    def open(self, url, download):
+        """
+        Open the cached file for a URL, downloading it first like fetch does. The file is
+        pinned until it's open, so other threads can't evict it in between.
+
+        Args:
+            url (str): The URL of the file
+            download (callable): Downloads the file, as for fetch
+
+        Returns:
+            file object: The cached file, opened for reading bytes
+        """
+        path = self._fetch(url, download, pin=True)
+        try:
+            return open(path, "rb")
+        finally:
+            self._unpin(path)
+
+    def _fetch(self, url, download, pin=False):
+        """
+        Get the cached file for a URL like fetch does
+
+        Args:
+            url (str): The URL of the file
+            download (callable): Downloads the file, as for fetch
+            pin (bool): If true, the returned file is pinned, and the caller must unpin it
+
+        Returns:
+            Path: The cached file
+        """
+        key = url_key(url)
+        with self._lock:
+            url_lock = self._url_locks.setdefault(key, threading.Lock())
+        with url_lock:
+            path = self.lookup(url)
+            if path is not None and pin and not self._pin(path):
+                # Another thread evicted it after the lookup
+                path = None
+            validators = None
+            if path is not None:
+                validators = {
+                    name: value
+                    for name, value in self._read_index(url).items()
+                    if name != "hash"
+                }
+                if key in self._checked or not validators:
+                    return path
+            handle, download_path = tempfile.mkstemp(dir=self.tmp_dir)
+            os.close(handle)
+            download_path = Path(download_path)
+            # The pin on a cached file which isn't returned is released at the end
+            stale_path = path if pin else None
+            try:
+                if validators:
+                    validators = download(url, download_path, validators=validators)
+                    if validators is None:
+                        log.debug("%s has not changed since it was cached", url)
+                        self._checked.add(key)
+                        stale_path = None
+                        return path
+                else:
+                    validators = download(url, download_path)
+                path = self.store(url, download_path, validators, pin=pin)
+                self._checked.add(key)
+                return path
+            finally:
+                if download_path.exists():
+                    os.unlink(download_path)
+                if stale_path is not None:
+                    self._unpin(stale_path)
+
+    def _evict(self, keep=None):
+        """Remove the least recently used files until the cache is within max_size"""
+        with self._lock:
+            if self._size is not None and self._size <= self.max_size:
+                return
+            files = []
+            for path in self.objects_dir.glob("*/*"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+            size = sum(file_size for _, file_size, _ in files)
+            for _, file_size, path in sorted(files, key=lambda file: file[0]):
+                if size <= self.max_size:
+                    break
+                if path == keep or path in self._pins:
+                    continue
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                size -= file_size
+                log.debug("Removed %s from the media cache", path.name)
+            self._size = size
+
+
+def configure_media_cache(directory, max_size=DEFAULT_MAX_SIZE):
+    """
+    Use a shared media cache for all downloads, or stop using one
+
+    Args:
+        directory (str or Path or None): Where to keep cached files, or None to turn the cache off
+        max_size (int): How many bytes of files to keep
+
+    Returns:
+        MediaCache or None: The shared cache
+    """
+    cache = MediaCache(directory, max_size=max_size) if directory else None
+    set_media_cache(cache)
+    return cache
+
+
+def set_media_cache(cache):
+    """
+    Replace the shared media cache
+
+    Args:
+        cache (MediaCache or None): The cache to share, or None to turn the cache off
+
+    Returns:
+        MediaCache or None: The shared cache which was replaced
+    """
+    with _SHARED_LOCK:
+        previous_cache = _SHARED.get("cache")
+        _SHARED["cache"] = cache
+    return previous_cache
+
+
+@contextmanager
+def use_media_cache(directory, max_size=DEFAULT_MAX_SIZE):
+    """
+    Share a media cache until the with block exits, then put the previous shared cache back
+
+    Args:
+        directory (str or Path or None):
+            Where to keep cached files, or None to leave the shared cache as it is
+        max_size (int): How many bytes of files to keep
+
+    Yields:
+        MediaCache or None: The shared cache
+    """
+    if not directory:
+        yield get_media_cache()
+        return
+    cache = MediaCache(directory, max_size=max_size)
+    previous_cache = set_media_cache(cache)
+    try:
+        yield cache
+    finally:
+        set_media_cache(previous_cache)
+
+
+def get_media_cache():
+    """
+    Get the shared media cache
+
+    Returns:
+        MediaCache or None: The shared cache, or None if it hasn't been configured
+    """
+    with _SHARED_LOCK:
+        return _SHARED.get("cache")
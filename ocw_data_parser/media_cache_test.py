@@ -0,0 +1,226 @@
+"""Tests for the media cache"""
+
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import threading
+import time
+
+import pytest
+
+from ocw_data_parser.media_cache import (
+    MediaCache,
+    configure_media_cache,
+    file_hash,
+    get_media_cache,
+    url_key,
+    use_media_cache,
+)
+
+
+# pylint: disable=redefined-outer-name, unused-argument
+
+
+@pytest.fixture
+def cache_dir():
+    """A directory for the cache"""
+    with TemporaryDirectory() as tempdir:
+        yield Path(tempdir)
+
+
+def _downloader(contents, calls):
+    """A download function which writes contents[url] and records each call"""
+
+    def download(url, path, validators=None):
+        calls.append(url)
+        path.write_bytes(contents[url])
+        return {}
+
+    return download
+
+
+def test_url_key():
+    """URLs for the same file on either OCW host or scheme should have the same key"""
+    assert (
+        url_key("http://ocw.mit.edu/ans7870/video.mp4")
+        == url_key("https://old.ocw.mit.edu/ans7870/video.mp4")
+        == "ocw.mit.edu/ans7870/video.mp4"
+    )
+    assert url_key("http://example.com/a") != url_key("http://example.com/b")
+
+
+def test_fetch(cache_dir):
+    """A URL should be downloaded once, and stored under the hash of its content"""
+    calls = []
+    cache = MediaCache(cache_dir)
+    download = _downloader({"http://ocw.mit.edu/a.mp4": b"video"}, calls)
+    path = cache.fetch("http://ocw.mit.edu/a.mp4", download)
+    assert path.read_bytes() == b"video"
+    assert path.name == file_hash(path)
+    assert cache.fetch("https://old.ocw.mit.edu/a.mp4", download) == path
+    assert MediaCache(cache_dir).lookup("http://ocw.mit.edu/a.mp4") == path
+    assert calls == ["http://ocw.mit.edu/a.mp4"]
+    assert cache.lookup("http://ocw.mit.edu/b.mp4") is None
+    assert os.listdir(cache_dir / "tmp") == []
+
+
+def test_same_content(cache_dir):
+    """Two URLs with the same content should share one file"""
+    calls = []
+    cache = MediaCache(cache_dir)
+    download = _downloader(
+        {"http://a.com/1": b"same", "http://b.com/2": b"same"}, calls
+    )
+    assert cache.fetch("http://a.com/1", download) == cache.fetch(
+        "http://b.com/2", download
+    )
+    assert len(list(cache.objects_dir.glob("*/*"))) == 1
+    assert calls == ["http://a.com/1", "http://b.com/2"]
+
+
+def test_evict(cache_dir):
+    """The least recently used files should be removed when the cache is too big"""
+    calls = []
+    cache = MediaCache(cache_dir, max_size=10)
+    download = _downloader(
+        {
+            "http://a.com/1": b"1111",
+            "http://a.com/2": b"2222",
+            "http://a.com/3": b"3333",
+        },
+        calls,
+    )
+    first = cache.fetch("http://a.com/1", download)
+    second = cache.fetch("http://a.com/2", download)
+    # Make the second file older, then use the first one again
+    os.utime(second, (time.time() - 60, time.time() - 60))
+    os.utime(first, (time.time() - 120, time.time() - 120))
+    assert cache.lookup("http://a.com/1") == first
+    cache.fetch("http://a.com/3", download)
+    assert cache.lookup("http://a.com/2") is None
+    assert first.exists()
+    cache.fetch("http://a.com/2", download)
+    assert calls == [
+        "http://a.com/1",
+        "http://a.com/2",
+        "http://a.com/3",
+        "http://a.com/2",
+    ]
+
+
+def test_open_pins(cache_dir):
+    """A file which is being opened shouldn't be evicted by other fetches"""
+    calls = []
+    cache = MediaCache(cache_dir, max_size=4)
+    download = _downloader(
+        {"http://a.com/1": b"1111", "http://a.com/2": b"2222", "http://a.com/3": b"3"},
+        calls,
+    )
+    # The state open is in after fetching and before opening the file
+    first = cache._fetch(  # pylint: disable=protected-access
+        "http://a.com/1", download, pin=True
+    )
+    cache.fetch("http://a.com/2", download)
+    assert first.exists()
+    cache._unpin(first)  # pylint: disable=protected-access
+    cache.fetch("http://a.com/3", download)
+    assert not first.exists()
+
+    with cache.open("http://a.com/1", download) as file:
+        assert file.read() == b"1111"
+    assert cache._pins == {}  # pylint: disable=protected-access
+
+
+def test_revalidate(cache_dir):
+    """A cached file should be checked for changes the first time each MediaCache fetches it"""
+    calls = []
+    content = {"body": b"first", "etag": '"1"'}
+
+    def download(url, path, validators=None):
+        calls.append(validators)
+        if validators and validators["etag"] == content["etag"]:
+            return None
+        path.write_bytes(content["body"])
+        return {"etag": content["etag"]}
+
+    first = MediaCache(cache_dir).fetch("http://a.com/1", download)
+    assert calls == [None]
+    cache = MediaCache(cache_dir)
+    for _ in range(2):
+        assert cache.fetch("http://a.com/1", download) == first
+    assert calls == [None, {"etag": '"1"'}]
+
+    content.update(body=b"second", etag='"2"')
+    assert cache.fetch("http://a.com/1", download) == first
+    second = MediaCache(cache_dir).fetch("http://a.com/1", download)
+    assert second.read_bytes() == b"second"
+    assert calls == [None, {"etag": '"1"'}, {"etag": '"1"'}]
+    assert MediaCache(cache_dir).lookup("http://a.com/1") == second
+
+
+def test_concurrent_fetch(cache_dir):
+    """Threads fetching the same URL should wait for one download"""
+    calls = []
+    cache = MediaCache(cache_dir)
+
+    def download(url, path):
+        calls.append(url)
+        time.sleep(0.2)
+        path.write_bytes(b"video")
+        return {}
+
+    paths = []
+    threads = [
+        threading.Thread(
+            target=lambda: paths.append(cache.fetch("http://a.com/1", download))
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == ["http://a.com/1"]
+    assert len(set(paths)) == 1 and len(paths) == 4
+
+
+def test_fetch_error(cache_dir):
+    """A failed download should not be cached or leave files behind"""
+    cache = MediaCache(cache_dir)
+
+    def download(url, path):
+        path.write_bytes(b"part of a")
+        raise ValueError(url)
+
+    with pytest.raises(ValueError):
+        cache.fetch("http://a.com/1", download)
+    assert cache.lookup("http://a.com/1") is None
+    assert os.listdir(cache_dir / "tmp") == []
+    assert list(cache.objects_dir.glob("*/*")) == []
+
+
+def test_configure_media_cache(cache_dir):
+    """The shared cache should be off until it's configured"""
+    assert get_media_cache() is None
+    try:
+        cache = configure_media_cache(cache_dir, max_size=100)
+        assert get_media_cache() is cache
+        assert cache.max_size == 100
+    finally:
+        configure_media_cache(None)
+    assert get_media_cache() is None
+
+
+def test_use_media_cache(cache_dir):
+    """use_media_cache should put the previous shared cache back afterwards"""
+    try:
+        previous_cache = configure_media_cache(cache_dir / "previous")
+        with use_media_cache(cache_dir / "cache", max_size=100) as cache:
+            assert get_media_cache() is cache
+            assert cache.max_size == 100
+        assert get_media_cache() is previous_cache
+        with use_media_cache(None) as cache:
+            assert cache is previous_cache
+        assert get_media_cache() is previous_cache
+    finally:
+        configure_media_cache(None)
@@ -1,30 +1,51 @@
-"""OCWParser and related functions"""
+"""OCWParser and related functions"""  # pylint: disable=too-many-lines
 
 import copy
-from html.parser import HTMLParser
-import json
+from functools import lru_cache, partial
 import logging
 import os
 from pathlib import Path
 from urllib.parse import urljoin
+import uuid
 
 import boto3
 import requests
-from smart_open import smart_open
 
+from ocw_data_parser import json_backend
+from ocw_data_parser.course_archive import is_course_archive, load_archive_jsons
+from ocw_data_parser.course_bundle import is_course_bundle, load_bundle_jsons
+
+# CustomHTMLParser is still importable from here, where it used to be defined
+from ocw_data_parser.html_links import (  # pylint: disable=unused-import
+    CustomHTMLParser,
+    extract_links,
+)
+from ocw_data_parser.lazy_parsed_json import LazyParsedJson, LazySection
+from ocw_data_parser.s3_uploader import MIN_PART_SIZE, S3Uploader
 from ocw_data_parser.utils import (
-    convert_to_vtt,
-    course_page_from_relative_url,
-    find_all_values_for_key,
-    get_binary_data,
+    CoursePageLookup,
+    build_children_index,
+    convert_many_to_vtt,
+    decode_raw_json,
+    download_file,
     htmlify,
+    list_raw_json_files,
+    map_with_workers,
+    open_binary_data,
+    open_url,
     ordered_instructors,
-    update_file_location,
+    update_file_locations,
+    write_binary_data,
 )
-from ocw_data_parser.course_feature_tags import match_course_feature_tag
+from ocw_data_parser.course_feature_tags import match_many
+from ocw_data_parser.validator_store import ValidatorStore
+from ocw_data_parser.vtt_cache import VttCache
 
 log = logging.getLogger(__name__)
 
+# Keeps the ETag and Last-Modified of each foreign media file in the output directory
+FOREIGN_MEDIA_VALIDATORS_FILE = "foreign_media_validators.json"
+
 
 def _get(obj, key):
     """
@@ -43,59 +64,76 @@ def _get(obj, key):
     return value
 
 
-class CustomHTMLParser(HTMLParser):
-    """Capture links from an HTML file"""
-
-    def __init__(self):
-        super().__init__()
-        self.output_list = []
-
-    def handle_starttag(self, tag, attrs):
-        if tag == "a":
-            self.output_list.append(dict(attrs).get("href"))
-
-    def error(self, message):
-        """Raise parsing errors"""
-        raise Exception(message)
+def _load_raw_json(file_path, json_index, lazy_payloads=False, projected=False):
+    """
+    Load a single raw json and annotate it with its file name and order index
 
+    Args:
+        file_path (Path): Path to the raw json file
+        json_index (int): The numeric stem of the file name
+        lazy_payloads (bool): If true, replace base64 data with LazyPayload references to the file
+        projected (bool): If true, only decode the keys the parser reads
 
-def load_raw_jsons(course_dir):
+    Returns:
+        dict: The loaded JSON
     """
-    Loads all course raw jsons sequentially and returns them in an ordered list
+    with open(file_path, "rb") as file:
+        data = file.read()
+    return decode_raw_json(
+        data,
+        json_index,
+        read_record=partial(Path.read_bytes, file_path),
+        lazy_payloads=lazy_payloads,
+        projected=projected,
+    )
+
+
+def load_raw_jsons(course_dir, max_workers=None, lazy_payloads=False, projected=False):
+    """
+    Loads all course raw jsons and returns them in an ordered list
 
     Args:
-        course_dir (str or Path): Course directory path
+        course_dir (str or Path):
+            Course directory path, or the path to a course bundle or a .tar, .tar.gz or .zip archive
+        max_workers (int or None):
+            If set to more than one, read and decode the files concurrently using a thread pool
+            of at most this many workers
+        lazy_payloads (bool):
+            If true, base64 data in _datafield_image and _datafield_file is not kept in memory.
+            It is read again from the file when the binary data is needed.
+        projected (bool):
+            If true, only decode the keys which generate_parsed_json and the functions it calls
+            read, as listed in projection.PROJECTED_KEYS. Values of other keys are skipped
+            without being built, and base64 data is loaded lazily as with lazy_payloads.
 
     Returns:
         list of dict:
             The JSON from the course sorted by order index
     """
     course_dir = Path(course_dir)
-    dict_of_all_course_dirs = dict()
-    for dir_in_question in course_dir.iterdir():
-        if dir_in_question.is_dir():
-            dict_of_all_course_dirs[dir_in_question.name] = []
-            for file in dir_in_question.iterdir():
-                if file.suffix == ".json":
-                    # Turn file name to int to enforce sequential json loading later
-                    dict_of_all_course_dirs[dir_in_question.name].append(int(file.stem))
-            dict_of_all_course_dirs[dir_in_question.name] = sorted(
-                dict_of_all_course_dirs[dir_in_question.name]
-            )
+    if is_course_bundle(course_dir):
+        return load_bundle_jsons(
+            course_dir,
+            max_workers=max_workers,
+            lazy_payloads=lazy_payloads,
+            projected=projected,
+        )
+    if is_course_archive(course_dir):
+        return load_archive_jsons(
+            course_dir,
+            max_workers=max_workers,
+            lazy_payloads=lazy_payloads,
+            projected=projected,
+        )
 
     # Load JSONs into memory
-    loaded_jsons = []
-    for key, val in dict_of_all_course_dirs.items():
-        path_to_subdir = course_dir / key
-        for json_index in val:
-            file_path = path_to_subdir / f"{json_index}.json"
-            with open(file_path) as file:
-                loaded_json = json.load(file)
-            # Add the json file name (used for error reporting)
-            loaded_json["actual_file_name"] = f"{json_index}.json"
-            # The only representation we have of ordering is the file name
-            loaded_json["order_index"] = int(json_index)
-            loaded_jsons.append(loaded_json)
+    loaded_jsons = map_with_workers(
+        lambda args: _load_raw_json(
+            *args, lazy_payloads=lazy_payloads, projected=projected
+        ),
+        list_raw_json_files(course_dir),
+        max_workers=max_workers,
+    )
 
     loaded_jsons = sorted(loaded_jsons, key=lambda d: d["order_index"])
     return loaded_jsons
@@ -149,6 +187,100 @@ def _compose_page_dict(json_file):
     return page_dict
 
 
+PAGE_TYPES = [
+    "CourseHomeSection",
+    "SRHomePage",
+    "CourseSection",
+    "DownloadSection",
+    "ThisCourseAtMITSection",
+    "SupplementalResourceSection",
+]
+HOME_SECTION_CLASSNAMES = ["CourseHomeSection", "SRHomePage"]
+FOREIGN_MEDIA_KEYS = [
+    "bottomtext",
+    "courseoutcomestext",
+    "description",
+    "image_caption_text",
+    "optional_text",
+    "text",
+]
+
+
+def _is_page(json_file):
+    """Is this record a course page?"""
+    return (  # pylint: disable=too-many-boolean-expressions
+        (
+            json_file["_content_type"] == "text/html"
+            or json_file["_content_type"] == "text/plain"
+        )
+        and "technical_location" in json_file
+        and json_file["technical_location"]
+        and json_file["id"] != "page-not-found"
+        and "_type" in json_file
+        and json_file["_type"] in PAGE_TYPES
+    )
+
+
+def _is_media(json_file):
+    """Is this record a media file?"""
+    # Any content type other than text/html counts, as in find_all_values_for_key
+    return (
+        json_file["_content_type"]
+        and json_file["_content_type"] != "text/html"
+        and json_file.get("_type", "").startswith("OCW")
+    )
+
+
+def _is_embed(json_file):
+    """Is this record the parent of embedded media?"""
+    return json_file and "inline_embed_id" in json_file and json_file["inline_embed_id"]
+
+
+def _may_link_foreign_media(json_file):
+    """Could this record have links to foreign media?"""
+    return any(
+        isinstance(json_file.get(key), str) and "/ans7870/" in json_file[key]
+        for key in FOREIGN_MEDIA_KEYS
+    )
+
+
+def classify_records(jsons):
+    """
+    Sort course JSON into the groups which generate_parsed_json needs, in a single pass
+
+    Args:
+        jsons (list of dict): Course input
+
+    Returns:
+        dict:
+            Lists of home sections, pages, media, embeds and foreign media candidates, each in
+            the same order as jsons, and the children index from build_children_index
+    """
+    records = {
+        "home_sections": [],
+        "pages": [],
+        "media": [],
+        "embeds": [],
+        "foreign_media_candidates": [],
+        "children_index": {},
+    }
+    for json_file in jsons:
+        records["children_index"].setdefault(json_file.get("parent_uid"), []).append(
+            json_file
+        )
+        if json_file.get("_classname", None) in HOME_SECTION_CLASSNAMES:
+            records["home_sections"].append(json_file)
+        if _is_page(json_file):
+            records["pages"].append(json_file)
+        if _is_media(json_file):
+            records["media"].append(json_file)
+        if _is_embed(json_file):
+            records["embeds"].append(json_file)
+        if _may_link_foreign_media(json_file):
+            records["foreign_media_candidates"].append(json_file)
+    return records
+
+
 def compose_pages(jsons):
     """
     Create page dicts from course JSONs
@@ -160,29 +292,7 @@ def compose_pages(jsons):
         list of dict:
             Course page information
     """
-    page_types = [
-        "CourseHomeSection",
-        "SRHomePage",
-        "CourseSection",
-        "DownloadSection",
-        "ThisCourseAtMITSection",
-        "SupplementalResourceSection",
-    ]
-    pages = []
-    for json_file in jsons:
-        if (  # pylint: disable=too-many-boolean-expressions
-            (
-                json_file["_content_type"] == "text/html"
-                or json_file["_content_type"] == "text/plain"
-            )
-            and "technical_location" in json_file
-            and json_file["technical_location"]
-            and json_file["id"] != "page-not-found"
-            and "_type" in json_file
-            and json_file["_type"] in page_types
-        ):
-            pages.append(_compose_page_dict(json_file))
-    return pages
+    return [_compose_page_dict(json_file) for json_file in jsons if _is_page(json_file)]
 
 
 def _compose_media_dict(media_json, bucket_base_url):
@@ -223,86 +333,86 @@ def compose_media(jsons, bucket_base_url):
     Returns:
         list of dict: The media dicts from the course
     """
-    media_jsons = []
-    all_media_types = find_all_values_for_key(jsons, "_content_type")
-    for json_file in jsons:
-        if json_file["_content_type"] in all_media_types and json_file.get(
-            "_type", ""
-        ).startswith("OCW"):
-            # Keep track of the jsons that contain media in case we want to extract
-            media_jsons.append(json_file)
-
+    # Keep track of the jsons that contain media in case we want to extract
+    media_jsons = [json_file for json_file in jsons if _is_media(json_file)]
     return [
         _compose_media_dict(media_json, bucket_base_url) for media_json in media_jsons
     ], media_jsons
 
 
-def compose_embedded_media(jsons):
+def _compose_embedded_media_dict(json_file, children_index):
+    temp = {
+        "order_index": json_file.get("order_index"),
+        "title": json_file["title"],
+        "template_type": json_file["template_type"],
+        "uid": json_file["_uid"],
+        "parent_uid": json_file["parent_uid"],
+        "technical_location": json_file["technical_location"],
+        "short_url": json_file["id"],
+        "inline_embed_id": json_file["inline_embed_id"],
+        "about_this_resource_text": json_file["about_this_resource_text"],
+        "optional_text": json_file.get("optional_text"),
+        "optional_tab_title": json_file.get("optional_tab_title"),
+        "resource_index_text": json_file.get("resource_index_text"),
+        "related_resources_text": json_file["related_resources_text"],
+        "text": json_file["text"],
+        "transcript": json_file["transcript"],
+        "embedded_media": [],
+        "start_time": json_file["start_time"],
+        "end_time": json_file["end_time"],
+        "media_index": json_file["media_index"],
+    }
+    # Find all children of linked embedded media
+    for child in children_index.get(json_file["_uid"], []):
+        embedded_media = {
+            "uid": child["_uid"],
+            "parent_uid": child["parent_uid"],
+            "id": child["id"],
+            "title": child["title"],
+            "type": child.get("media_asset_type"),
+        }
+        if "media_location" in child and child["media_location"]:
+            embedded_media["media_location"] = child["media_location"]
+        if "technical_location" in child and child["technical_location"]:
+            embedded_media["technical_location"] = child["technical_location"]
+        temp["embedded_media"].append(embedded_media)
+    return temp
+
+
+def compose_embedded_media(jsons, children_index=None):
     """
     Create dicts for embedded media from course JSONs
 
     Args:
         jsons (list of dict): Course input
+        children_index (dict or None):
+            A map of parent_uid to child records from build_children_index. It's built from jsons
+            if not passed.
 
     Returns:
         list of dict: Embedded media info
     """
-    linked_media_parents = dict()
-    for json_file in jsons:
-        if (
-            json_file
-            and "inline_embed_id" in json_file
-            and json_file["inline_embed_id"]
-        ):
-            temp = {
-                "order_index": json_file.get("order_index"),
-                "title": json_file["title"],
-                "template_type": json_file["template_type"],
-                "uid": json_file["_uid"],
-                "parent_uid": json_file["parent_uid"],
-                "technical_location": json_file["technical_location"],
-                "short_url": json_file["id"],
-                "inline_embed_id": json_file["inline_embed_id"],
-                "about_this_resource_text": json_file["about_this_resource_text"],
-                "optional_text": json_file.get("optional_text"),
-                "optional_tab_title": json_file.get("optional_tab_title"),
-                "resource_index_text": json_file.get("resource_index_text"),
-                "related_resources_text": json_file["related_resources_text"],
-                "text": json_file["text"],
-                "transcript": json_file["transcript"],
-                "embedded_media": [],
-                "start_time": json_file["start_time"],
-                "end_time": json_file["end_time"],
-                "media_index": json_file["media_index"],
-            }
-            # Find all children of linked embedded media
-            for child in jsons:
-                if child["parent_uid"] == json_file["_uid"]:
-                    embedded_media = {
-                        "uid": child["_uid"],
-                        "parent_uid": child["parent_uid"],
-                        "id": child["id"],
-                        "title": child["title"],
-                        "type": child.get("media_asset_type"),
-                    }
-                    if "media_location" in child and child["media_location"]:
-                        embedded_media["media_location"] = child["media_location"]
-                    if "technical_location" in child and child["technical_location"]:
-                        embedded_media["technical_location"] = child[
-                            "technical_location"
-                        ]
-                    temp["embedded_media"].append(embedded_media)
-            linked_media_parents[json_file["inline_embed_id"]] = temp
-    return linked_media_parents
+    if children_index is None:
+        children_index = build_children_index(jsons)
+    return {
+        json_file["inline_embed_id"]: _compose_embedded_media_dict(
+            json_file, children_index
+        )
+        for json_file in jsons
+        if _is_embed(json_file)
+    }
 
 
-def compose_course_features(jsons, course_pages):
+def compose_course_features(jsons, course_pages, page_lookup=None):
     """
     Create course feature dicts from input JSONs
 
     Args:
         jsons (list of dict): Course info
         course_pages (list of dict): Course page info generated from compose_pages
+        page_lookup (CoursePageLookup or None):
+            A lookup for course_pages which can be shared between calls. It's built from
+            course_pages if not passed.
 
     Returns:
         list of dict:
@@ -311,10 +421,10 @@ def compose_course_features(jsons, course_pages):
     course_features = []
     feature_requirements = jsons[0].get("feature_requirements")
     if feature_requirements:
+        if page_lookup is None:
+            page_lookup = CoursePageLookup(course_pages)
         for feature_requirement in feature_requirements:
-            page = course_page_from_relative_url(
-                feature_requirement["ocw_feature_url"], course_pages
-            )
+            page = page_lookup.find(feature_requirement["ocw_feature_url"])
             if page:
                 course_feature = copy.copy(feature_requirement)
                 course_feature["ocw_feature_url"] = "./resolveuid/" + page["uid"]
@@ -322,13 +432,16 @@ def compose_course_features(jsons, course_pages):
     return course_features
 
 
-def compose_course_feature_tags(jsons, course_pages):
+def compose_course_feature_tags(jsons, course_pages, page_lookup=None):
     """
     Create course feature tag dicts from input JSONs
 
     Args:
         jsons (list of dict): Course info
         course_pages (list of dict): Course page info generated from compose_pages
+        page_lookup (CoursePageLookup or None):
+            A lookup for course_pages which can be shared between calls. It's built from
+            course_pages if not passed.
 
     Returns:
         list of dict:
@@ -337,25 +450,53 @@ def compose_course_feature_tags(jsons, course_pages):
     course_feature_tags = []
     feature_requirements = jsons[0].get("feature_requirements")
     if feature_requirements:
-        for feature_requirement in feature_requirements:
-            page = course_page_from_relative_url(
-                feature_requirement["ocw_feature_url"], course_pages
+        if page_lookup is None:
+            page_lookup = CoursePageLookup(course_pages)
+        found = [
+            (
+                feature_requirement,
+                page_lookup.find(feature_requirement["ocw_feature_url"]),
             )
-            if page:
-                matching_tag = match_course_feature_tag(
-                    feature_requirement["ocw_feature"],
-                    feature_requirement["ocw_subfeature"],
+            for feature_requirement in feature_requirements
+        ]
+        found = [(requirement, page) for requirement, page in found if page]
+        matching_tags = match_many([requirement for requirement, _ in found])
+        for (_, page), matching_tag in zip(found, matching_tags):
+            if matching_tag:
+                course_feature_tags.append(
+                    {
+                        "course_feature_tag": matching_tag,
+                        "ocw_feature_url": "./resolveuid/" + page["uid"],
+                    }
                 )
-                if matching_tag:
-                    course_feature_tags.append(
-                        {
-                            "course_feature_tag": matching_tag,
-                            "ocw_feature_url": "./resolveuid/" + page["uid"],
-                        }
-                    )
     return course_feature_tags
 
 
+def _foreign_media_links(course_json):
+    """
+    Find the links to foreign media in one record
+
+    Args:
+        course_json (dict): A record from the course input
+
+    Returns:
+        list of dict: Information about each link to foreign media
+    """
+    large_media_links = []
+    for key in FOREIGN_MEDIA_KEYS:
+        if (
+            key in course_json
+            and isinstance(course_json[key], str)
+            and "/ans7870/" in course_json[key]
+        ):
+            for link in extract_links(course_json[key]):
+                if link and "/ans7870/" in link and "." in link.split("/")[-1]:
+                    large_media_links.append(
+                        {"parent_uid": course_json.get("_uid"), "link": link.strip()}
+                    )
+    return large_media_links
+
+
 def gather_foreign_media(jsons):
     """
     Information about links to foreign media
@@ -366,33 +507,7 @@ def gather_foreign_media(jsons):
     Returns:
         list of dict: Information about each link to foreign media
     """
-    containing_keys = [
-        "bottomtext",
-        "courseoutcomestext",
-        "description",
-        "image_caption_text",
-        "optional_text",
-        "text",
-    ]
-    large_media_links = []
-    for course_json in jsons:  # pylint: disable=too-many-nested-blocks
-        for key in containing_keys:
-            if (
-                key in course_json
-                and isinstance(course_json[key], str)
-                and "/ans7870/" in course_json[key]
-            ):
-                parser = CustomHTMLParser()
-                parser.feed(course_json[key])
-                if parser.output_list:
-                    for link in parser.output_list:
-                        if link and "/ans7870/" in link and "." in link.split("/")[-1]:
-                            obj = {
-                                "parent_uid": course_json.get("_uid"),
-                                "link": link.strip(),
-                            }
-                            large_media_links.append(obj)
-    return large_media_links
+    return [link for course_json in jsons for link in _foreign_media_links(course_json)]
 
 
 def compose_open_learning_library_related(jsons):
@@ -429,13 +544,42 @@ def compose_open_learning_library_related(jsons):
     return open_learning_library_related
 
 
+def _extract_media_file(path_to_containing_folder, media_json):
+    """
+    Write the binary data for a media file to a local directory
+
+    Args:
+        path_to_containing_folder (Path): The directory to write to
+        media_json (dict): The JSON for the media file
+
+    Returns:
+        str or None: The name of the file, or None if its binary data couldn't be found
+    """
+    file_name = media_json.get("_uid") + "_" + media_json.get("id")
+    binary_data = open_binary_data(media_json)
+    if binary_data is None:
+        return None
+    # Records with the same _uid and id are written to the same path, possibly by other workers
+    # at the same time, so each one is written to its own file and moved into place
+    path = path_to_containing_folder / file_name
+    part_path = path.with_name(f"{file_name}.{uuid.uuid4().hex}.part")
+    try:
+        with open(part_path, "wb") as file:
+            write_binary_data(binary_data, file)
+        os.replace(part_path, path)
+    finally:
+        if part_path.exists():
+            os.unlink(part_path)
+    return file_name
+
+
 class OCWParser:  # pylint: disable=too-many-instance-attributes
     """
     Parses JSON files from OCW's Plone database and outputs combined JSON files
     with S3 links for media
     """
 
-    def __init__(  # pylint: disable=too-many-arguments
+    def __init__(  # pylint: disable=too-many-arguments, too-many-locals
         self,
         course_dir=None,
         destination_dir=None,
@@ -448,6 +592,13 @@ class OCWParser:  # pylint: disable=too-many-instance-attributes
         s3_target_folder="",
         beautify_parsed_json=False,
         create_vtt_files=False,
+        load_workers=None,
+        lazy_payloads=False,
+        projected=False,
+        media_workers=None,
+        vtt_workers=None,
+        vtt_cache_dir=None,
+        upload_workers=None,
     ):
         if not (course_dir and destination_dir) and not loaded_jsons:
             raise Exception(
@@ -467,8 +618,14 @@ class OCWParser:  # pylint: disable=too-many-instance-attributes
         self.s3_bucket_access_key = s3_bucket_access_key
         self.s3_bucket_secret_access_key = s3_bucket_secret_access_key
         self.s3_target_folder = s3_target_folder
+        self.load_workers = load_workers
+        self.lazy_payloads = lazy_payloads
+        self.projected = projected
+        self.media_workers = media_workers
+        self.vtt_workers = vtt_workers
+        self.vtt_cache_dir = vtt_cache_dir
+        self.upload_workers = upload_workers
         self.media_jsons = []
-        self.large_media_links = []
         self.course_image_uid = ""
         self.course_thumbnail_image_uid = ""
         self.course_image_s3_link = ""
@@ -476,9 +633,14 @@ class OCWParser:  # pylint: disable=too-many-instance-attributes
         self.course_image_alt_text = ""
         self.course_thumbnail_image_alt_text = ""
         self.parsed_json = None
+        self._large_media_links = []
+        self.children_index = {}
+        self._course_pages = None
+        self._html_pages = None
+        self._page_generation = None
         if course_dir and destination_dir:
             # Preload raw jsons
-            self.jsons = load_raw_jsons(self.course_dir)
+            self.jsons = self._load_raw_jsons()
         else:
             self.jsons = loaded_jsons
         if create_vtt_files:
@@ -489,15 +651,109 @@ class OCWParser:  # pylint: disable=too-many-instance-attributes
                 self.destination_dir = self.destination_dir / self.jsons[0].get("id")
         self.beautify_parsed_json = beautify_parsed_json
 
+    def _load_raw_jsons(self):
+        """
+        Load the raw JSON for course_dir using the parser's loading options
+
+        Returns:
+            list of dict: The JSON from the course sorted by order index
+        """
+        return load_raw_jsons(
+            self.course_dir,
+            max_workers=self.load_workers,
+            lazy_payloads=self.lazy_payloads,
+            projected=self.projected,
+        )
+
+    @property
+    def jsons(self):
+        """
+        The raw JSON for the course
+
+        Returns:
+            list of dict: The JSON from the course sorted by order index
+        """
+        return self._jsons
+
+    @jsons.setter
+    def jsons(self, jsons):
+        self._jsons = jsons
+        self.clear_page_cache()
+
+    def clear_page_cache(self):
+        """
+        Forget the composed pages and their HTML, so that they are composed again from jsons.
+        This needs to be called after changing the contents of jsons in place.
+        """
+        self._course_pages = None
+        self._html_pages = None
+        # Replaced on each clear, so a parsed JSON can tell whether the cache is still its own
+        self._page_generation = object()
+
+    def get_course_pages(self, page_jsons=None):
+        """
+        Compose the course pages once and reuse them until jsons changes
+
+        Args:
+            page_jsons (list of dict): The page JSON from jsons, if it has already been picked out
+
+        Returns:
+            list of dict: Course page information
+        """
+        if self._course_pages is None:
+            self._course_pages = compose_pages(
+                self.jsons if page_jsons is None else page_jsons
+            )
+        return self._course_pages
+
+    def get_html_pages(self):
+        """
+        Wrap the course pages which have text in HTML, once until jsons changes
+
+        Returns:
+            list of tuple(str, str, str): The uid, filename and HTML of each page
+        """
+        if self._html_pages is None:
+            self._html_pages = []
+            for page in self.get_course_pages():
+                filename, html = htmlify(page)
+                if filename and html:
+                    self._html_pages.append((page.get("uid"), filename, html))
+        return self._html_pages
+
     def get_parsed_json(self):
         """
-        Return parsed JSON
+        Return parsed JSON, with every section composed
 
         Returns:
             dict: The combined JSON
         """
+        if isinstance(self.parsed_json, LazyParsedJson):
+            self.parsed_json.compose_all()
         return self.parsed_json
 
+    @property
+    def large_media_links(self):
+        """
+        Links to media hosted outside of OCW. Reading this composes the course_foreign_files
+        section of the parsed JSON if it hasn't been already, so errors from composing it are
+        raised here.
+
+        Returns:
+            list of dict: The course_foreign_files section of the parsed JSON
+        """
+        if self.parsed_json is None:
+            return self._large_media_links
+        return self.parsed_json["course_foreign_files"]
+
+    @large_media_links.setter
+    def large_media_links(self, value):
+        """Replace the course_foreign_files section of the parsed JSON"""
+        if self.parsed_json is None:
+            self._large_media_links = value
+        else:
+            self.parsed_json["course_foreign_files"] = value
+
     def setup_s3_uploading(
         self,
         s3_bucket_name,
@@ -528,15 +784,18 @@ class OCWParser:  # pylint: disable=too-many-instance-attributes
             dict: The combined JSON for the course
         """
         if not self.jsons:
-            self.jsons = load_raw_jsons(self.course_dir)
+            self.jsons = self._load_raw_jsons()
+        records = classify_records(self.jsons)
+        # Each parsed JSON gets its own page dicts, since file locations are updated in place
+        self.clear_page_cache()
+        page_generation = self._page_generation
+        self.children_index = records["children_index"]
 
         # Find "CourseHomeSection" JSON and extract chp_image value
-        for j in self.jsons:
-            classname = j.get("_classname", None)
-            # CourseHomeSection for courses and SRHomePage is for resources
-            if classname in ["CourseHomeSection", "SRHomePage"]:
-                self.course_image_uid = j.get("chp_image")
-                self.course_thumbnail_image_uid = j.get("chp_image_thumb")
+        # CourseHomeSection for courses and SRHomePage is for resources
+        for j in records["home_sections"]:
+            self.course_image_uid = j.get("chp_image")
+            self.course_thumbnail_image_uid = j.get("chp_image_thumb")
 
         master_course = self.jsons[0].get("master_course_number")
         aka_course_numbers = self.jsons[0].get("aka_course_number")
@@ -545,94 +804,128 @@ class OCWParser:  # pylint: disable=too-many-instance-attributes
         instructors = ordered_instructors(
             self.jsons[0].get("instructors"), contributor_list
         )
-        course_pages = compose_pages(self.jsons)
-        course_files, self.media_jsons = compose_media(
-            self.jsons, self.get_s3_base_url()
+        # Keep track of the jsons that contain media in case we want to extract
+        self.media_jsons = records["media"]
+        bucket_base_url = self.get_s3_base_url()
+
+        def course_pages():
+            if self._page_generation is page_generation:
+                # Share the pages with get_html_pages while the cache belongs to this parsed JSON
+                return self.get_course_pages(records["pages"])
+            return compose_pages(records["pages"])
+
+        @lru_cache(maxsize=None)
+        def page_lookup():
+            return CoursePageLookup(new_json["course_pages"])
+
+        # Generate parsed JSON. The larger sections are composed when they are first read.
+        new_json = LazyParsedJson(
+            {
+                "uid": self.jsons[0].get("_uid"),
+                "title": self.jsons[0].get("title"),
+                "description": self.jsons[1].get("description"),
+                "other_information_text": self.jsons[1].get("other_information_text"),
+                "chp_display_level": self.jsons[0].get("chp_display_level"),
+                "first_published_to_production": _get(
+                    self.jsons[0], "first_published_to_production"
+                ),
+                "last_published_to_production": _get(
+                    self.jsons[0], "last_published_to_production"
+                ),
+                "last_unpublishing_date": _get(self.jsons[0], "last_unpublishing_date"),
+                "retirement_date": _get(self.jsons[0], "retirement_date"),
+                "sort_as": self.jsons[0].get("sort_as"),
+                "department_number": master_course.split(".")[0]
+                if master_course
+                else "",
+                "master_course_number": master_course.split(".")[1]
+                if master_course
+                else "",
+                "new_course_numbers": [
+                    {
+                        key.replace("aka_", "")
+                        if key.startswith("aka_")
+                        else key: value
+                        for key, value in aka_course_number.items()
+                    }
+                    for aka_course_number in aka_course_numbers
+                ]
+                if aka_course_numbers
+                else [],
+                "other_version_parent_uids": self.jsons[0].get("master_subject"),
+                "from_semester": self.jsons[0].get("from_semester"),
+                "from_year": self.jsons[0].get("from_year"),
+                "to_semester": self.jsons[0].get("to_semester"),
+                "to_year": self.jsons[0].get("to_year"),
+                "course_level": self.jsons[0].get("course_level"),
+                "url": technical_location.split("ocw.mit.edu")[1]
+                if technical_location
+                else "",
+                "short_url": self.jsons[0].get("id"),
+                "image_src": self.course_image_s3_link,
+                "thumbnail_image_src": self.course_thumbnail_image_s3_link,
+                "image_description": self.course_image_alt_text,
+                "thumbnail_image_description": self.course_thumbnail_image_alt_text,
+                "image_alternate_text": self.jsons[1].get("image_alternate_text"),
+                "image_caption_text": self.jsons[1].get("image_caption_text"),
+                "tags": [{"name": tag} for tag in self.jsons[0].get("subject")],
+                "instructors": [
+                    {key: value for key, value in instructor.items() if key != "mit_id"}
+                    for instructor in instructors
+                ]
+                if instructors
+                else [],
+                "metadata_contributor_list": contributor_list
+                if contributor_list
+                else [],
+                "language": self.jsons[0].get("language"),
+                "extra_course_number": self.jsons[0].get("linked_course_number"),
+                "course_collections": self.jsons[0].get("category_features"),
+                "course_pages": LazySection(course_pages),
+                "course_features": LazySection(
+                    lambda: compose_course_features(
+                        self.jsons, new_json["course_pages"], page_lookup()
+                    )
+                ),
+                "course_feature_tags": LazySection(
+                    lambda: compose_course_feature_tags(
+                        self.jsons, new_json["course_pages"], page_lookup()
+                    )
+                ),
+                "course_files": LazySection(
+                    lambda: compose_media(records["media"], bucket_base_url)[0]
+                ),
+                "course_embedded_media": LazySection(
+                    lambda: compose_embedded_media(
+                        records["embeds"], records["children_index"]
+                    )
+                ),
+                "course_foreign_files": LazySection(
+                    lambda: gather_foreign_media(records["foreign_media_candidates"])
+                ),
+                "open_learning_library_related": compose_open_learning_library_related(
+                    self.jsons
+                ),
+                "dspace_handle": self.jsons[0].get("dspace_handle"),
+                "features_tracking": self.jsons[0].get("features_tracking"),
+                "is_update_of": self.jsons[0].get("is_update_of"),
+                "highlights_text": self.jsons[1].get("highlights_text"),
+                "related_content": self.jsons[1].get("related_content"),
+                "excludeFromNav": self.jsons[1].get("excludeFromNav"),
+            }
         )
-        foreign_media = gather_foreign_media(self.jsons)
-        self.large_media_links = foreign_media
-
-        # Generate parsed JSON
-        new_json = {
-            "uid": self.jsons[0].get("_uid"),
-            "title": self.jsons[0].get("title"),
-            "description": self.jsons[1].get("description"),
-            "other_information_text": self.jsons[1].get("other_information_text"),
-            "chp_display_level": self.jsons[0].get("chp_display_level"),
-            "first_published_to_production": _get(
-                self.jsons[0], "first_published_to_production"
-            ),
-            "last_published_to_production": _get(
-                self.jsons[0], "last_published_to_production"
-            ),
-            "last_unpublishing_date": _get(self.jsons[0], "last_unpublishing_date"),
-            "retirement_date": _get(self.jsons[0], "retirement_date"),
-            "sort_as": self.jsons[0].get("sort_as"),
-            "department_number": master_course.split(".")[0] if master_course else "",
-            "master_course_number": master_course.split(".")[1]
-            if master_course
-            else "",
-            "new_course_numbers": [
-                {
-                    key.replace("aka_", "") if key.startswith("aka_") else key: value
-                    for key, value in aka_course_number.items()
-                }
-                for aka_course_number in aka_course_numbers
-            ]
-            if aka_course_numbers
-            else [],
-            "other_version_parent_uids": self.jsons[0].get("master_subject"),
-            "from_semester": self.jsons[0].get("from_semester"),
-            "from_year": self.jsons[0].get("from_year"),
-            "to_semester": self.jsons[0].get("to_semester"),
-            "to_year": self.jsons[0].get("to_year"),
-            "course_level": self.jsons[0].get("course_level"),
-            "url": technical_location.split("ocw.mit.edu")[1]
-            if technical_location
-            else "",
-            "short_url": self.jsons[0].get("id"),
-            "image_src": self.course_image_s3_link,
-            "thumbnail_image_src": self.course_thumbnail_image_s3_link,
-            "image_description": self.course_image_alt_text,
-            "thumbnail_image_description": self.course_thumbnail_image_alt_text,
-            "image_alternate_text": self.jsons[1].get("image_alternate_text"),
-            "image_caption_text": self.jsons[1].get("image_caption_text"),
-            "tags": [{"name": tag} for tag in self.jsons[0].get("subject")],
-            "instructors": [
-                {key: value for key, value in instructor.items() if key != "mit_id"}
-                for instructor in instructors
-            ]
-            if instructors
-            else [],
-            "metadata_contributor_list": contributor_list if contributor_list else [],
-            "language": self.jsons[0].get("language"),
-            "extra_course_number": self.jsons[0].get("linked_course_number"),
-            "course_collections": self.jsons[0].get("category_features"),
-            "course_pages": course_pages,
-            "course_features": compose_course_features(self.jsons, course_pages),
-            "course_feature_tags": compose_course_feature_tags(
-                self.jsons, course_pages
-            ),
-            "course_files": course_files,
-            "course_embedded_media": compose_embedded_media(self.jsons),
-            "course_foreign_files": foreign_media,
-            "open_learning_library_related": compose_open_learning_library_related(
-                self.jsons
-            ),
-            "dspace_handle": self.jsons[0].get("dspace_handle"),
-            "features_tracking": self.jsons[0].get("features_tracking"),
-            "is_update_of": self.jsons[0].get("is_update_of"),
-            "highlights_text": self.jsons[1].get("highlights_text"),
-            "related_content": self.jsons[1].get("related_content"),
-            "excludeFromNav": self.jsons[1].get("excludeFromNav"),
-        }
 
         self.parsed_json = new_json
         return new_json
 
-    def extract_media_locally(self):
+    def extract_media_locally(self, max_workers=None):
         """
         Output media files to a local path
+
+        Args:
+            max_workers (int or None):
+                If more than one, decode, download and write this many media files at once.
+                Defaults to media_workers.
         """
         if not self.media_jsons:
             log.debug("You have to compose media for course first!")
@@ -647,23 +940,20 @@ class OCWParser:  # pylint: disable=too-many-instance-attributes
             self.static_prefix if self.static_prefix else str(path_to_containing_folder)
         )
         os.makedirs(path_to_containing_folder, exist_ok=True)
-        for page in compose_pages(self.jsons):
-            filename, html = htmlify(page)
-            if filename and html:
-                with open(path_to_containing_folder / filename, "w") as file:
-                    file.write(html)
-        for media_json in self.media_jsons:
+        for _, filename, html in self.get_html_pages():
+            with open(path_to_containing_folder / filename, "w") as file:
+                file.write(html)
+        file_names = map_with_workers(
+            partial(_extract_media_file, path_to_containing_folder),
+            self.media_jsons,
+            max_workers=self.media_workers if max_workers is None else max_workers,
+        )
+        # The results are in the same order as media_jsons, however many workers there are
+        uid_locations = {}
+        for media_json, file_name in zip(self.media_jsons, file_names):
             uid = media_json.get("_uid")
-            file_name = uid + "_" + media_json.get("id")
-            binary_data = get_binary_data(media_json)
-            if binary_data is not None:
-                with open(path_to_containing_folder / file_name, "wb") as file:
-                    file.write(binary_data)
-                update_file_location(
-                    self.parsed_json,
-                    urljoin(url_path_to_media, file_name),
-                    uid,
-                )
+            if file_name is not None:
+                uid_locations[uid] = urljoin(url_path_to_media, file_name)
                 log.info("Extracted %s", file_name)
             else:
                 json_file = media_json["actual_file_name"]
@@ -674,12 +964,18 @@ class OCWParser:  # pylint: disable=too-many-instance-attributes
                     self.parsed_json.get("short_url"),
                     uid,
                 )
+        update_file_locations(self.parsed_json, uid_locations=uid_locations)
         log.info("Done! extracted static media to %s", path_to_containing_folder)
         self.export_parsed_json()
 
-    def extract_foreign_media_locally(self):
+    def extract_foreign_media_locally(self, max_workers=None):
         """
         Extract foreign media files to a local directory
+
+        Args:
+            max_workers (int or None):
+                If more than one, download this many foreign media files at once.
+                Defaults to media_workers.
         """
         if not self.large_media_links:
             log.debug("Your course has 0 foreign media files")
@@ -694,22 +990,62 @@ class OCWParser:  # pylint: disable=too-many-instance-attributes
             self.static_prefix if self.static_prefix else str(path_to_containing_folder)
         )
         os.makedirs(path_to_containing_folder, exist_ok=True)
+        # Files downloaded by an earlier run are only downloaded again if they've changed
+        validator_store = ValidatorStore(
+            self.destination_dir / "output" / FOREIGN_MEDIA_VALIDATORS_FILE
+        )
+
+        def _download(file_name_and_links):
+            """
+            Download one file from the first of its links which works, returning the errors
+            instead of raising them
+            """
+            file_name, candidate_links = file_name_and_links
+            errors = []
+            for link in candidate_links:
+                try:
+                    download_file(
+                        link,
+                        path_to_containing_folder / file_name,
+                        validator_store=validator_store,
+                    )
+                except requests.exceptions.RequestException as ex:
+                    errors.append((link, ex))
+                else:
+                    return []
+            return errors
+
+        # Links with the same file name would be saved to the same path, so each file name is
+        # downloaded once. The last link is tried first, since it's the file a serial run would
+        # leave there, then the others from last to first.
+        links = {}
         for media in self.large_media_links:
-            file_name = media["link"].split("/")[-1]
-            response = requests.get(media["link"])
-            try:
-                response.raise_for_status()
-            except requests.exceptions.HTTPError:
-                log.exception(
-                    "Could not fetch link %s for course %s",
-                    media["link"],
-                    self.parsed_json.get("short_url"),
-                )
+            link = media["link"]
+            candidate_links = links.setdefault(link.split("/")[-1], [])
+            if link in candidate_links:
+                candidate_links.remove(link)
+            candidate_links.insert(0, link)
+        errors = map_with_workers(
+            _download,
+            list(links.items()),
+            max_workers=self.media_workers if max_workers is None else max_workers,
+        )
+        # Log and update locations in link order, however many workers there are
+        filename_locations = {}
+        for file_name, file_errors in zip(links, errors):
+            if file_errors:
+                for link, error in file_errors:
+                    log.error(
+                        "Could not fetch link %s for course %s",
+                        link,
+                        self.parsed_json.get("short_url"),
+                        exc_info=error,
+                    )
                 continue
-            with open(path_to_containing_folder / file_name, "wb") as file:
-                file.write(response.content)
-            update_file_location(self.parsed_json, url_path_to_media + file_name)
+            filename_locations[file_name] = url_path_to_media + file_name
             log.info("Extracted %s", file_name)
+        validator_store.save()
+        update_file_locations(self.parsed_json, filename_locations=filename_locations)
         log.info("Done! extracted foreign media to %s", path_to_containing_folder)
         self.export_parsed_json()
 
@@ -728,10 +1064,9 @@ class OCWParser:  # pylint: disable=too-many-instance-attributes
             self.parsed_json["short_url"]
         )
         with open(file_path, "w") as json_file:
-            if self.beautify_parsed_json:
-                json.dump(self.parsed_json, json_file, sort_keys=True, indent=4)
-            else:
-                json.dump(self.parsed_json, json_file)
+            json_backend.dump(
+                self.parsed_json, json_file, beautify=self.beautify_parsed_json
+            )
         log.info("Extracted %s", file_path)
 
     def find_course_image_s3_link(self):
@@ -801,6 +1136,9 @@ class OCWParser:  # pylint: disable=too-many-instance-attributes
         media_uid_filter=None,
         update_external_media=True,
         chunk_size=1000000,
+        max_workers=None,
+        progress=None,
+        part_size=MIN_PART_SIZE,
     ):
         """
         Update file_location for parsed JSON content and optionally upload to S3
@@ -812,6 +1150,13 @@ class OCWParser:  # pylint: disable=too-many-instance-attributes
             media_uid_filter (???):
             update_external_media (bool): If true, update foreign media file content
             chunk_size (int): Chunk size to use when uploading to S3
+            max_workers (int or None):
+                If more than one, upload this many files at once. Defaults to upload_workers.
+            progress (callable or None):
+                Called with the key and the number of bytes sent as each part of a file is uploaded
+            part_size (int):
+                Part size for multipart uploads to S3. Parts can't be smaller than 5 MiB,
+                so smaller sizes are raised to that.
         """
         upload_to_s3 = self.upload_to_s3
         if upload:
@@ -819,35 +1164,103 @@ class OCWParser:  # pylint: disable=too-many-instance-attributes
         bucket_base_url = self.get_s3_base_url()
         if bucket_base_url:
             s3_bucket = self.get_s3_bucket()
-            if update_pages:
-                for page in compose_pages(self.jsons):
-                    filename, html = htmlify(page)
-                    if filename and html:
-                        if upload_to_s3:
-                            s3_bucket.put_object(
-                                Key=self.s3_target_folder + filename,
-                                Body=html,
-                                ACL="public-read",
+            uid_locations = {}
+            filename_locations = {}
+
+            def _upload_media(uploader, file, key):
+                """Upload a media file, returning False if it has no binary data"""
+                binary_data = open_binary_data(file)
+                if binary_data is None:
+                    return False
+                with binary_data:
+                    if upload_to_s3:
+                        uploader.upload_fileobj(key, binary_data)
+                return True
+
+            def _upload_foreign_media(uploader, link, key):
+                """Upload a foreign media file, returning the HTTPError if it can't be fetched"""
+                try:
+                    # This reads from the media cache if there is one
+                    with open_url(link) as binary_data:
+                        # Foreign media has always been uploaded without a public ACL
+                        uploader.upload_fileobj(key, binary_data, acl=None)
+                except requests.exceptions.HTTPError as error:
+                    return error
+                return None
+
+            # The uploads run concurrently, but their results are applied in the order of a
+            # serial run below, so parsed_json is the same either way
+            with S3Uploader(
+                s3_bucket,
+                max_workers=self.upload_workers if max_workers is None else max_workers,
+                part_size=part_size,
+                progress=progress,
+                read_size=chunk_size,
+            ) as uploader:
+                page_uploads = []
+                if update_pages:
+                    for uid, filename, html in self.get_html_pages():
+                        page_uploads.append(
+                            (
+                                uid,
+                                filename,
+                                uploader.submit(
+                                    uploader.put, self.s3_target_folder + filename, html
+                                )
+                                if upload_to_s3
+                                else None,
                             )
-                        update_file_location(
-                            self.parsed_json,
-                            bucket_base_url + filename,
-                            page.get("uid"),
                         )
-            if update_media:
-                if media_uid_filter:
-                    media_jsons = [
-                        media_json
-                        for media_json in self.media_jsons
-                        if media_json.get("_uid") in media_uid_filter
-                    ]
-                else:
-                    media_jsons = self.media_jsons
-                for file in media_jsons:
-                    uid = file.get("_uid")
-                    filename = uid + "_" + file.get("id")
-                    binary_data = get_binary_data(file)
-                    if binary_data is None:
+                media_uploads = []
+                if update_media:
+                    if media_uid_filter:
+                        media_jsons = [
+                            media_json
+                            for media_json in self.media_jsons
+                            if media_json.get("_uid") in media_uid_filter
+                        ]
+                    else:
+                        media_jsons = self.media_jsons
+                    for file in media_jsons:
+                        filename = file.get("_uid") + "_" + file.get("id")
+                        media_uploads.append(
+                            (
+                                file,
+                                filename,
+                                uploader.submit(
+                                    _upload_media,
+                                    uploader,
+                                    file,
+                                    self.s3_target_folder + filename,
+                                ),
+                            )
+                        )
+                foreign_uploads = []
+                if update_external_media:
+                    for media in self.large_media_links:
+                        filename = media["link"].split("/")[-1]
+                        if upload_to_s3:
+                            foreign_uploads.append(
+                                (
+                                    media["link"],
+                                    filename,
+                                    uploader.submit(
+                                        _upload_foreign_media,
+                                        uploader,
+                                        media["link"],
+                                        self.s3_target_folder + filename,
+                                    ),
+                                )
+                            )
+                        filename_locations[filename] = bucket_base_url + filename
+
+                for uid, filename, future in page_uploads:
+                    if future is not None:
+                        # Raise the error if the page couldn't be uploaded
+                        future.result()
+                    uid_locations[uid] = bucket_base_url + filename
+                for file, filename, future in media_uploads:
+                    if not future.result():
                         log.error(
                             "Could not load binary data for file %s in json file %s for course %s",
                             filename,
@@ -855,15 +1268,8 @@ class OCWParser:  # pylint: disable=too-many-instance-attributes
                             self.parsed_json.get("short_url"),
                         )
                         continue
-                    if upload_to_s3:
-                        s3_bucket.put_object(
-                            Key=self.s3_target_folder + filename,
-                            Body=binary_data,
-                            ACL="public-read",
-                        )
-                    update_file_location(
-                        self.parsed_json, bucket_base_url + filename, uid
-                    )
+                    uid = file.get("_uid")
+                    uid_locations[uid] = bucket_base_url + filename
                     if self.course_image_uid and uid == self.course_image_uid:
                         self.course_image_s3_link = bucket_base_url + filename
                         self.course_image_alt_text = file.get("description")
@@ -884,35 +1290,21 @@ class OCWParser:  # pylint: disable=too-many-instance-attributes
                         self.parsed_json[
                             "thumbnail_image_description"
                         ] = self.course_thumbnail_image_alt_text
-            if update_external_media:
-                for media in self.large_media_links:
-                    filename = media["link"].split("/")[-1]
-
-                    if upload_to_s3:
-                        try:
-                            response = requests.get(media["link"], stream=True)
-                            response.raise_for_status()
-                            s3_uri = (
-                                f"s3://{self.s3_bucket_access_key}:{self.s3_bucket_secret_access_key}@"
-                                f"{self.s3_bucket_name}/"
-                            )
-                            with smart_open(
-                                s3_uri + self.s3_target_folder + filename, "wb"
-                            ) as handle:
-                                for chunk in response.iter_content(
-                                    chunk_size=chunk_size
-                                ):
-                                    handle.write(chunk)
-                            response.close()
-                            log.info("Uploaded %s", filename)
-                        except requests.exceptions.HTTPError:
-                            log.exception(
-                                "Could NOT upload %s for course %s from link %s",
-                                filename,
-                                self.parsed_json.get("short_url"),
-                                media["link"],
-                            )
-                    update_file_location(self.parsed_json, bucket_base_url + filename)
+                for link, filename, future in foreign_uploads:
+                    error = future.result()
+                    if error is not None:
+                        log.error(
+                            "Could NOT upload %s for course %s from link %s",
+                            filename,
+                            self.parsed_json.get("short_url"),
+                            link,
+                            exc_info=error,
+                        )
+            update_file_locations(
+                self.parsed_json,
+                uid_locations=uid_locations,
+                filename_locations=filename_locations,
+            )
 
     def upload_all_media_to_s3(self, upload_parsed_json=False):
         """
@@ -937,7 +1329,7 @@ class OCWParser:  # pylint: disable=too-many-instance-attributes
         if short_url:
             s3_bucket.put_object(
                 Key=self.s3_target_folder + f"{short_url}_parsed.json",
-                Body=json.dumps(self.parsed_json),
+                Body=json_backend.dumps(self.parsed_json),
                 ACL="private",
             )
         else:
@@ -959,12 +1351,23 @@ class OCWParser:  # pylint: disable=too-many-instance-attributes
                 )
         self.upload_parsed_json_to_s3(s3_bucket)
 
-    def populate_vtt_files(self):
+    def populate_vtt_files(self, max_workers=None):
         """
         for each srt caption file create a vtt file
+
+        Args:
+            max_workers (int or None):
+                If more than one, convert captions in this many processes. Defaults to vtt_workers.
         """
-        for loaded_json in self.jsons:
-            if loaded_json["_content_type"] == "application/x-subrip":
-                new_json = convert_to_vtt(loaded_json)
-                if new_json:
-                    self.jsons.append(new_json)
+        self.jsons.extend(
+            convert_many_to_vtt(
+                [
+                    loaded_json
+                    for loaded_json in self.jsons
+                    if loaded_json["_content_type"] == "application/x-subrip"
+                ],
+                max_workers=self.vtt_workers if max_workers is None else max_workers,
+                cache=VttCache(self.vtt_cache_dir) if self.vtt_cache_dir else None,
+            )
+        )
+        self.clear_page_cache()
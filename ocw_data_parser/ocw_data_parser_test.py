@@ -1,22 +1,43 @@
-"""Tests for OCWParser"""
+"""Tests for OCWParser"""  # pylint: disable=too-many-lines
 
+import io
 import json
 import logging
 import os
-from base64 import b64decode
+from base64 import b64decode, b64encode
 from copy import deepcopy
 from pathlib import Path
 import shutil
 from tempfile import TemporaryDirectory
+import threading
 from unittest.mock import patch, ANY
+import uuid
 
 from requests.exceptions import HTTPError
 import responses
 import pytest
 from webvtt.errors import MalformedFileError
 
-from ocw_data_parser.ocw_data_parser import OCWParser, load_raw_jsons
-from ocw_data_parser.utils import update_srt_to_vtt
+from ocw_data_parser.ocw_data_parser import (
+    OCWParser,
+    classify_records,
+    compose_course_feature_tags,
+    compose_embedded_media,
+    compose_media,
+    compose_pages,
+    gather_foreign_media,
+    load_raw_jsons,
+)
+from ocw_data_parser.projection import PROJECTED_KEYS
+from ocw_data_parser.s3_uploader import MIN_PART_SIZE, S3Uploader
+from ocw_data_parser.utils import (
+    DATAFIELD_KEYS,
+    Base64Reader,
+    LazyPayload,
+    get_binary_data,
+    htmlify,
+    update_srt_to_vtt,
+)
 import ocw_data_parser.test_constants as constants
 
 log = logging.getLogger(__name__)
@@ -92,8 +113,9 @@ def test_load_raw_jsons_invalid_file(ocw_parser):
         os.remove(os.path.join(constants.SINGLE_COURSE_DIR, "jsons/999.json"))
 
 
-def test_load_raw_jsons():
-    """Test that load_raw_jsons"""
+@pytest.mark.parametrize("max_workers", [None, 1, 8])
+def test_load_raw_jsons(max_workers):
+    """Test that load_raw_jsons returns every json in order, with or without a thread pool"""
     with TemporaryDirectory() as project_dir:
         for num in range(1, 4000):
             group = int(num / 1000)
@@ -104,9 +126,124 @@ def test_load_raw_jsons():
             with open(filepath, "w") as file:
                 file.write('{"a":2,"b":3,"c":4}')
 
-        jsons = load_raw_jsons(project_dir)
+        jsons = load_raw_jsons(project_dir, max_workers=max_workers)
 
     assert [_json["order_index"] for _json in jsons] == list(range(1, 4000))
+    assert [_json["actual_file_name"] for _json in jsons] == [
+        f"{num}.json" for num in range(1, 4000)
+    ]
+
+
+def test_load_raw_jsons_parallel_invalid_file():
+    """A decoding error in a worker thread should be raised by load_raw_jsons"""
+    with TemporaryDirectory() as project_dir:
+        parent_dir = Path(project_dir) / "0"
+        os.makedirs(parent_dir)
+        for num in range(1, 20):
+            with open(parent_dir / f"{num}.json", "w") as file:
+                file.write('{"a":2}' if num != 7 else "{")
+
+        with pytest.raises(json.decoder.JSONDecodeError):
+            load_raw_jsons(project_dir, max_workers=4)
+
+
+def test_parser_load_workers(ocw_parser):
+    """Loading a course with a thread pool should produce the same parsed JSON"""
+    with TemporaryDirectory() as destination_dir:
+        parser = OCWParser(
+            course_dir=constants.SINGLE_COURSE_DIR,
+            destination_dir=destination_dir,
+            static_prefix=constants.STATIC_PREFIX,
+            load_workers=4,
+        )
+    assert parser.jsons == load_raw_jsons(constants.SINGLE_COURSE_DIR)
+    assert parser.parsed_json == ocw_parser.parsed_json
+
+
+def test_load_raw_jsons_lazy_payloads():
+    """Lazy payloads should only keep a reference to base64 data, which loads the same bytes"""
+    eager_jsons = load_raw_jsons(constants.SINGLE_COURSE_DIR)
+    lazy_jsons = load_raw_jsons(constants.SINGLE_COURSE_DIR, lazy_payloads=True)
+    assert len(eager_jsons) == len(lazy_jsons)
+
+    lazy_count = 0
+    for eager_json, lazy_json in zip(eager_jsons, lazy_jsons):
+        for key in DATAFIELD_KEYS:
+            if key in eager_json:
+                assert isinstance(lazy_json[key]["data"], LazyPayload)
+                assert lazy_json[key]["data"].load() == eager_json[key]["data"]
+                assert get_binary_data(lazy_json) == get_binary_data(eager_json)
+                lazy_count += 1
+        assert {
+            key: value for key, value in lazy_json.items() if key not in DATAFIELD_KEYS
+        } == {
+            key: value for key, value in eager_json.items() if key not in DATAFIELD_KEYS
+        }
+    assert lazy_count > 0
+
+
+def test_parser_lazy_payloads(ocw_parser):
+    """A parser using lazy payloads should produce the same parsed JSON"""
+    with TemporaryDirectory() as destination_dir:
+        parser = OCWParser(
+            course_dir=constants.SINGLE_COURSE_DIR,
+            destination_dir=destination_dir,
+            static_prefix=constants.STATIC_PREFIX,
+            lazy_payloads=True,
+        )
+        assert parser.parsed_json == ocw_parser.parsed_json
+        parser.extract_media_locally()
+        ocw_parser.extract_media_locally()
+        lazy_static_files = Path(parser.destination_dir) / "output" / "static_files"
+        static_files = Path(ocw_parser.destination_dir) / "output" / "static_files"
+        assert sorted(path.name for path in lazy_static_files.iterdir()) == sorted(
+            path.name for path in static_files.iterdir()
+        )
+        for path in static_files.iterdir():
+            assert (lazy_static_files / path.name).read_bytes() == path.read_bytes()
+
+
+def test_load_raw_jsons_projected():
+    """A projected load should only keep the projected keys, with lazy payloads"""
+    full_jsons = load_raw_jsons(constants.SINGLE_COURSE_DIR)
+    projected_jsons = load_raw_jsons(constants.SINGLE_COURSE_DIR, projected=True)
+    assert len(full_jsons) == len(projected_jsons)
+
+    lazy_count = 0
+    for full_json, projected_json in zip(full_jsons, projected_jsons):
+        for key in DATAFIELD_KEYS:
+            if key in full_json:
+                assert isinstance(projected_json[key]["data"], LazyPayload)
+                assert get_binary_data(projected_json) == get_binary_data(full_json)
+                lazy_count += 1
+        assert {
+            key: value
+            for key, value in projected_json.items()
+            if key not in DATAFIELD_KEYS
+        } == {
+            key: value
+            for key, value in full_json.items()
+            if key in PROJECTED_KEYS | {"actual_file_name", "order_index"}
+            and key not in DATAFIELD_KEYS
+        }
+    assert lazy_count > 0
+
+
+@pytest.mark.parametrize("course_dir", ["course-1", "course-2"])
+def test_parser_projected(course_dir):
+    """A parser using a projected load should produce the same parsed JSON"""
+    with TemporaryDirectory() as destination_dir:
+        parsers = [
+            OCWParser(
+                course_dir=Path(constants.COURSE_DIR) / course_dir,
+                destination_dir=destination_dir,
+                static_prefix=constants.STATIC_PREFIX,
+                s3_bucket_name="testing",
+                projected=projected,
+            )
+            for projected in [False, True]
+        ]
+    assert parsers[1].parsed_json == parsers[0].parsed_json
 
 
 def test_upload_all_data_to_s3(ocw_parser_s3, s3_bucket):
@@ -167,7 +304,7 @@ def test_upload_all_data_to_s3_no_binary_data(ocw_parser_s3, caplog):
     """
     Test that there is a descriptive error message when there is no binary data in a json file
     """
-    with patch("ocw_data_parser.ocw_data_parser.get_binary_data", return_value=None):
+    with patch("ocw_data_parser.ocw_data_parser.open_binary_data", return_value=None):
         ocw_parser_s3.upload_all_media_to_s3()
         assert (
             "Could not load binary data for file 9dbd5e22e2379a1bb4e844757c445dfd_7UJ4CFRGd-U.srt "
@@ -182,7 +319,7 @@ def test_upload_all_data_to_s3_large_media_link_upload_error(
     """
     Test that there is a descriptive error message when a large media file cannot be uploaded
     """
-    get_mock = mocker.patch("requests.get")
+    get_mock = mocker.patch("ocw_data_parser.http_client.get")
     get_mock.return_value.raise_for_status.side_effect = HTTPError()
     ocw_parser_s3.upload_all_media_to_s3()
     assert (
@@ -626,6 +763,16 @@ def test_course_feature_tags(ocw_parser):
     ]
 
 
+def test_course_feature_tags_unmatched_requirement(ocw_parser):
+    """Feature requirements which don't link to a course page don't need a feature"""
+    jsons = deepcopy(ocw_parser.jsons)
+    jsons[0]["feature_requirements"].append({"ocw_feature_url": "./resolveuid/missing"})
+    assert (
+        compose_course_feature_tags(jsons, ocw_parser.parsed_json["course_pages"])
+        == ocw_parser.parsed_json["course_feature_tags"]
+    )
+
+
 def test_tags(ocw_parser):
     """assert tags output"""
     expected_tags = [
@@ -694,6 +841,63 @@ def test_course_embedded_media(ocw_parser):
     }
 
 
+def test_course_embedded_media_children_index(ocw_parser):
+    """compose_embedded_media should give the same output with the parser's children index"""
+    assert ocw_parser.children_index
+    assert (
+        compose_embedded_media(ocw_parser.jsons, ocw_parser.children_index)
+        == compose_embedded_media(ocw_parser.jsons)
+        == ocw_parser.parsed_json["course_embedded_media"]
+    )
+
+
+def test_classify_records(ocw_parser):
+    """Each bucket should give the compose functions the same output as the full input"""
+    records = classify_records(ocw_parser.jsons)
+    assert records["pages"]
+    assert compose_pages(records["pages"]) == compose_pages(ocw_parser.jsons)
+    assert compose_media(records["media"], "https://example.com/") == compose_media(
+        ocw_parser.jsons, "https://example.com/"
+    )
+    assert gather_foreign_media(
+        records["foreign_media_candidates"]
+    ) == gather_foreign_media(ocw_parser.jsons)
+    assert compose_embedded_media(
+        records["embeds"], records["children_index"]
+    ) == compose_embedded_media(ocw_parser.jsons)
+    assert [json_file["_classname"] for json_file in records["home_sections"]] == [
+        "CourseHomeSection"
+    ]
+    assert records["children_index"] == ocw_parser.children_index
+
+
+def test_generate_parsed_json_single_pass(ocw_parser):
+    """generate_parsed_json should only iterate over the course JSON once"""
+
+    class CountingList(list):
+        """A list which counts how many times it is iterated"""
+
+        iterations = 0
+
+        def __iter__(self):
+            self.iterations += 1
+            return super().__iter__()
+
+    parsed_json = ocw_parser.generate_parsed_json()
+    ocw_parser.jsons = CountingList(ocw_parser.jsons)
+    assert ocw_parser.generate_parsed_json() == parsed_json
+    assert ocw_parser.jsons.iterations == 1
+
+
+def test_children_index(ocw_parser):
+    """The parser should index its JSON by parent uid"""
+    for json_file in ocw_parser.jsons:
+        assert any(
+            child is json_file
+            for child in ocw_parser.children_index[json_file["parent_uid"]]
+        )
+
+
 def test_foreign_files(ocw_parser):
     """assert course_foreign_files output"""
     assert len(ocw_parser.parsed_json["course_foreign_files"]) == 20
@@ -726,6 +930,74 @@ def test_extract_media_locally(ocw_parser):
     assert counts == expected_counts
 
 
+def test_extract_media_locally_workers(ocw_parser):
+    """Extracting media with several workers should give the same files and parsed JSON"""
+
+    def _extract(max_workers):
+        """Extract the media to a new directory, returning the files and the parsed JSON"""
+        with TemporaryDirectory() as destination_dir:
+            ocw_parser.destination_dir = Path(destination_dir)
+            ocw_parser.generate_parsed_json()
+            ocw_parser.extract_media_locally(max_workers=max_workers)
+            static_files = Path(destination_dir) / "output" / "static_files"
+            files = {path.name: path.read_bytes() for path in static_files.iterdir()}
+            parsed_json = json.loads(json.dumps(ocw_parser.parsed_json))
+        return files, parsed_json
+
+    serial_files, serial_json = _extract(None)
+    for max_workers in [4, 16]:
+        files, parsed_json = _extract(max_workers)
+        assert files == serial_files
+        assert parsed_json == serial_json
+    assert any(
+        course_file["file_location"].endswith(course_file["id"])
+        for course_file in serial_json["course_files"]
+    )
+
+
+def test_extract_media_locally_same_file_name(ocw_parser, mocker):
+    """Media records with the same file name written at the same time shouldn't be mixed up"""
+    contents = {"first": b"1" * 10 + b"2" * 10, "second": b"3" * 2 + b"4" * 2}
+    barrier = threading.Barrier(2, timeout=10)
+
+    def _write_binary_data(binary_data, file):
+        """Write half of the data, then wait for the other worker before writing the rest"""
+        data = binary_data.read()
+        file.write(data[: len(data) // 2])
+        file.flush()
+        barrier.wait()
+        file.write(data[len(data) // 2 :])
+
+    mocker.patch(
+        "ocw_data_parser.ocw_data_parser.open_binary_data",
+        side_effect=lambda media_json: io.BytesIO(contents[media_json["title"]]),
+    )
+    mocker.patch(
+        "ocw_data_parser.ocw_data_parser.write_binary_data",
+        side_effect=_write_binary_data,
+    )
+    ocw_parser.media_jsons = [
+        {"_uid": "uid", "id": "file.pdf", "title": title, "actual_file_name": "1.json"}
+        for title in contents
+    ]
+    ocw_parser.extract_media_locally(max_workers=2)
+    static_files = Path(ocw_parser.destination_dir) / "output" / "static_files"
+    assert (static_files / "uid_file.pdf").read_bytes() in contents.values()
+    assert not list(static_files.glob("*.part"))
+
+
+def test_extract_media_locally_media_workers(ocw_parser, mocker):
+    """extract_media_locally should use media_workers unless max_workers is passed"""
+    map_mock = mocker.patch(
+        "ocw_data_parser.ocw_data_parser.map_with_workers", return_value=[]
+    )
+    ocw_parser.media_workers = 8
+    ocw_parser.extract_media_locally()
+    assert map_mock.call_args.kwargs["max_workers"] == 8
+    ocw_parser.extract_media_locally(max_workers=2)
+    assert map_mock.call_args.kwargs["max_workers"] == 2
+
+
 def test_extract_text_media_locally(ocw_parser_course_2):
     """extract_media_locally should write plain/text media files to a local directory"""
     ocw_parser_course_2.extract_media_locally()
@@ -776,6 +1048,66 @@ def test_populate_vtt_files(ocw_parser):
     assert vtt_json["_uid"] == "2f2b1bbc318b5fdcade8ac2ec1b5a911"
 
 
+def test_populate_vtt_files_workers_cache(ocw_parser, mocker, caplog):
+    """
+    populate_vtt_files should give the same files when converting in processes or from a cache
+    """
+    with open(
+        "ocw_data_parser/test_json/course_dir/captions_example.json", "rb"
+    ) as file:
+        datafield = json.load(file)
+    srt_jsons = [
+        loaded_json
+        for loaded_json in ocw_parser.jsons
+        if loaded_json["_content_type"] == "application/x-subrip"
+    ]
+    assert len(srt_jsons) > 2
+    for loaded_json in srt_jsons:
+        loaded_json["_datafield_file"] = datafield
+    srt_jsons[1]["_datafield_file"] = {"data": b64encode(b"malformed").decode()}
+    jsons = list(ocw_parser.jsons)
+
+    results = []
+    with TemporaryDirectory() as cache_dir:
+        for max_workers, vtt_cache_dir in [
+            (None, None),
+            (4, None),
+            (4, cache_dir),
+            (None, cache_dir),
+        ]:
+            if len(results) == 3:
+                # Everything which converted should come from the cache now
+                mocker.patch(
+                    "ocw_data_parser.utils.srt_to_vtt",
+                    side_effect=MalformedFileError("not cached"),
+                )
+            caplog.clear()
+            ocw_parser.jsons = list(jsons)
+            ocw_parser.vtt_cache_dir = vtt_cache_dir
+            ocw_parser.populate_vtt_files(max_workers=max_workers)
+            results.append(ocw_parser.jsons[len(jsons) :])
+            error = (
+                "not cached"
+                if len(results) == 4
+                else "The file does not have a valid format."
+            )
+            assert [record.message for record in caplog.records] == [
+                "This file is malformed and cannot be converted to vtt "
+                f"{srt_jsons[1]['id']}. {error}"
+            ]
+    assert results[0] == results[1] == results[2] == results[3]
+    assert [new_json["id"] for new_json in results[0]] == [
+        update_srt_to_vtt(loaded_json["id"])
+        for loaded_json in srt_jsons
+        if loaded_json is not srt_jsons[1]
+    ]
+    assert {new_json["_uid"] for new_json in results[0]} == {
+        uuid.uuid5(uuid.UUID(loaded_json["_uid"]), "vtt").hex
+        for loaded_json in srt_jsons
+        if loaded_json is not srt_jsons[1]
+    }
+
+
 @pytest.mark.parametrize(
     "exception, expected_args",
     [
@@ -789,7 +1121,7 @@ def test_populate_vtt_files(ocw_parser):
 def test_populate_vtt_files_error(ocw_parser, mocker, exception, expected_args):
     """populate_vtt_files should log errors and continue"""
     mock_exception = mocker.patch("ocw_data_parser.utils.log.exception")
-    mocker.patch("webvtt.from_srt", side_effect=exception)
+    mocker.patch("ocw_data_parser.utils.srt_to_vtt", side_effect=exception)
     ocw_parser.populate_vtt_files()
     mock_exception.assert_any_call(*expected_args)
 
@@ -809,12 +1141,138 @@ def test_extract_foreign_media_locally(ocw_parser):
         assert len(list(static_files_dir.iterdir())) == 20
 
 
+def test_extract_foreign_media_locally_workers(ocw_parser, mocker):
+    """
+    extract_foreign_media_locally should stream the same files to disk with several workers
+    """
+    get_mock = mocker.patch("ocw_data_parser.http_client.get")
+    get_mock.return_value.headers = {}
+    get_mock.return_value.iter_content.side_effect = lambda _chunk_size: iter(
+        [b"some", b"bytes"]
+    )
+    results = []
+    for max_workers in [None, 8]:
+        with TemporaryDirectory() as tempdir:
+            tempdir = Path(tempdir)
+            ocw_parser.destination_dir = tempdir
+            ocw_parser.extract_foreign_media_locally(max_workers=max_workers)
+            static_files_dir = tempdir / "output" / "static_files"
+            files = {
+                path.name: path.read_bytes() for path in static_files_dir.iterdir()
+            }
+            results.append((files, ocw_parser.get_parsed_json()))
+    assert results[0] == results[1]
+    files = results[0][0]
+    assert len(files) == len(ocw_parser.large_media_links)
+    assert set(files.values()) == {b"somebytes"}
+    for call in get_mock.call_args_list:
+        assert call[1] == {"stream": True, "headers": {}}
+
+
+def test_extract_foreign_media_locally_same_file_name(ocw_parser, mocker):
+    """Links which would be saved to the same file should only be downloaded once"""
+    get_mock = mocker.patch("ocw_data_parser.http_client.get")
+    get_mock.return_value.headers = {}
+    get_mock.return_value.iter_content.side_effect = lambda _chunk_size: iter(
+        [b"some", b"bytes"]
+    )
+    foreign_file = ocw_parser.large_media_links[0]
+    ocw_parser.parsed_json["course_foreign_files"] = [
+        dict(foreign_file) for _ in range(6)
+    ]
+    with TemporaryDirectory() as tempdir:
+        tempdir = Path(tempdir)
+        ocw_parser.destination_dir = tempdir
+        ocw_parser.extract_foreign_media_locally(max_workers=6)
+        static_files_dir = tempdir / "output" / "static_files"
+        file_name = foreign_file["link"].split("/")[-1]
+        assert [path.name for path in static_files_dir.iterdir()] == [file_name]
+        assert (static_files_dir / file_name).read_bytes() == b"somebytes"
+    get_mock.assert_called_once()
+
+
+@pytest.mark.parametrize("working_links", [1, 0])
+def test_extract_foreign_media_locally_fallback(ocw_parser, mocker, working_links):
+    """If the last link for a file name fails, the other links for it should be tried"""
+    links = [f"https://example.com/{folder}/video.mp4" for folder in ["a", "b", "c"]]
+    working = links[:working_links]
+
+    def _get(url, **kwargs):  # pylint: disable=unused-argument
+        """Respond with an error unless the link works"""
+        response = mocker.Mock(headers={}, status_code=200)
+        response.iter_content.return_value = iter([url.encode()])
+        if url not in working:
+            response.raise_for_status.side_effect = HTTPError(url)
+        return response
+
+    get_mock = mocker.patch("ocw_data_parser.http_client.get", side_effect=_get)
+    log_mock = mocker.patch("ocw_data_parser.ocw_data_parser.log.error")
+    foreign_file = ocw_parser.large_media_links[0]
+    ocw_parser.parsed_json["course_foreign_files"] = [
+        {**foreign_file, "link": link} for link in links + links[1:2]
+    ]
+    with TemporaryDirectory() as tempdir:
+        tempdir = Path(tempdir)
+        ocw_parser.destination_dir = tempdir
+        ocw_parser.extract_foreign_media_locally(max_workers=2)
+        path = tempdir / "output" / "static_files" / "video.mp4"
+        if working:
+            assert path.read_bytes() == working[0].encode()
+            log_mock.assert_not_called()
+        else:
+            assert not path.exists()
+            assert [call.args[1] for call in log_mock.call_args_list] == [
+                links[1],
+                links[2],
+                links[0],
+            ]
+    assert [call.args[0] for call in get_mock.call_args_list] == [
+        links[1],
+        links[2],
+        links[0],
+    ]
+
+
+def test_extract_foreign_media_locally_conditional(ocw_parser, mocker):
+    """
+    extract_foreign_media_locally should only download files again if they have changed
+    """
+    get_mock = mocker.patch("ocw_data_parser.http_client.get")
+    get_mock.return_value.status_code = 200
+    get_mock.return_value.headers = {"ETag": '"1"'}
+    get_mock.return_value.iter_content.side_effect = lambda _chunk_size: iter(
+        [b"somebytes"]
+    )
+    with TemporaryDirectory() as tempdir:
+        tempdir = Path(tempdir)
+        ocw_parser.destination_dir = tempdir
+        ocw_parser.extract_foreign_media_locally()
+        parsed_json = ocw_parser.get_parsed_json()
+        for call in get_mock.call_args_list:
+            assert call[1] == {"stream": True, "headers": {}}
+
+        get_mock.reset_mock()
+        get_mock.return_value.status_code = 304
+        ocw_parser.extract_foreign_media_locally()
+        assert ocw_parser.get_parsed_json() == parsed_json
+        assert get_mock.call_count > 0
+        for call in get_mock.call_args_list:
+            assert call[1] == {"stream": True, "headers": {"If-None-Match": '"1"'}}
+        get_mock.return_value.iter_content.assert_not_called()
+        static_files_dir = tempdir / "output" / "static_files"
+        for path in static_files_dir.iterdir():
+            assert path.read_bytes() == b"somebytes"
+
+
 def test_extract_foreign_media_locally_error(ocw_parser, mocker, caplog):
     """
     extract_foreign_media_locally should log and continue if there is an error
     """
-    get_mock = mocker.patch("requests.get")
-    get_mock.return_value.content = b"somebytes"
+    get_mock = mocker.patch("ocw_data_parser.http_client.get")
+    get_mock.return_value.headers = {}
+    get_mock.return_value.iter_content.side_effect = lambda _chunk_size: iter(
+        [b"somebytes"]
+    )
     first = True
 
     def _raise_side_effect():
@@ -965,3 +1423,214 @@ def test_parse_ocw_feature_url(broken):
             ]
         )
         assert parsed_json["open_learning_library_related"] == expected
+
+
+def test_parsed_json_lazy_sections(ocw_parser):
+    """The larger sections should only be composed when they are read"""
+    lazy_sections = [
+        "course_pages",
+        "course_features",
+        "course_feature_tags",
+        "course_files",
+        "course_embedded_media",
+        "course_foreign_files",
+    ]
+    expected = dict(ocw_parser.generate_parsed_json())
+    with patch(
+        "ocw_data_parser.ocw_data_parser.compose_media", wraps=compose_media
+    ) as mock_compose_media:
+        parsed_json = ocw_parser.generate_parsed_json()
+        for key in lazy_sections:
+            assert parsed_json.is_composed(key) is False
+        assert parsed_json["title"] == expected["title"]
+        mock_compose_media.assert_not_called()
+
+        assert parsed_json["course_files"] == expected["course_files"]
+        assert parsed_json["course_files"] == expected["course_files"]
+        mock_compose_media.assert_called_once()
+        assert parsed_json.is_composed("course_pages") is False
+
+        assert ocw_parser.get_parsed_json() is parsed_json
+        for key in lazy_sections:
+            assert parsed_json.is_composed(key) is True
+        assert parsed_json == expected
+        assert json.loads(json.dumps(parsed_json)) == expected
+
+
+def test_set_large_media_links(ocw_parser):
+    """Assigning large_media_links should replace the course_foreign_files section"""
+    links = [{"parent_uid": "abc", "link": "https://example.com/video.mp4"}]
+    ocw_parser.large_media_links = links
+    assert ocw_parser.large_media_links == links
+    assert ocw_parser.get_parsed_json()["course_foreign_files"] == links
+
+    ocw_parser.parsed_json = None
+    assert ocw_parser.large_media_links == []
+    ocw_parser.large_media_links = links
+    assert ocw_parser.large_media_links == links
+
+
+def test_page_cache(ocw_parser_s3):
+    """Pages should be composed and wrapped in HTML once between changes to jsons"""
+    with patch(
+        "ocw_data_parser.ocw_data_parser.compose_pages", wraps=compose_pages
+    ) as mock_compose_pages, patch(
+        "ocw_data_parser.ocw_data_parser.htmlify", wraps=htmlify
+    ) as mock_htmlify:
+        parsed_json = ocw_parser_s3.generate_parsed_json()
+        ocw_parser_s3.extract_media_locally()
+        for _ in range(2):
+            ocw_parser_s3.update_s3_content(upload=False, update_external_media=False)
+        assert mock_compose_pages.call_count == 1
+        assert mock_htmlify.call_count == len(parsed_json["course_pages"])
+        assert ocw_parser_s3.get_course_pages() is parsed_json["course_pages"]
+        for uid, filename, _ in ocw_parser_s3.get_html_pages():
+            assert filename.startswith(uid)
+            assert any(
+                page["file_location"].endswith(filename)
+                for page in parsed_json["course_pages"]
+                if page["uid"] == uid
+            )
+
+        ocw_parser_s3.jsons = list(ocw_parser_s3.jsons)
+        ocw_parser_s3.get_html_pages()
+        assert mock_compose_pages.call_count == 2
+        ocw_parser_s3.populate_vtt_files()
+        ocw_parser_s3.get_html_pages()
+        assert mock_compose_pages.call_count == 3
+
+
+def test_page_cache_older_parsed_json(ocw_parser):
+    """A parsed JSON whose pages are read after a newer one is generated should get its own pages"""
+    older_json = ocw_parser.generate_parsed_json()
+    newer_json = ocw_parser.generate_parsed_json()
+    assert newer_json["course_pages"] is ocw_parser.get_course_pages()
+    assert older_json["course_pages"] == newer_json["course_pages"]
+    assert older_json["course_pages"] is not newer_json["course_pages"]
+    assert not any(
+        older_page is newer_page
+        for older_page, newer_page in zip(
+            older_json["course_pages"], newer_json["course_pages"]
+        )
+    )
+    assert ocw_parser.get_course_pages() is newer_json["course_pages"]
+
+
+def test_update_s3_content_streamed(ocw_parser_s3, s3_bucket):
+    """Media should be decoded as it's uploaded, with large files split into parts"""
+    media_json = next(
+        media_json
+        for media_json in ocw_parser_s3.media_jsons
+        if "_datafield_file" in media_json
+    )
+    data = os.urandom(9 * 1024 * 1024)
+    media_json["_datafield_file"]["data"] = b64encode(data).decode()
+    uid = media_json["_uid"]
+    with patch.object(
+        Base64Reader, "readinto", autospec=True, side_effect=Base64Reader.readinto
+    ) as mock_readinto:
+        ocw_parser_s3.update_s3_content(
+            upload=True,
+            update_pages=False,
+            update_external_media=False,
+            media_uid_filter=[uid],
+        )
+    # Read in 8MB parts rather than all at once
+    assert mock_readinto.call_count > 2
+    key = f"{ocw_parser_s3.s3_target_folder}{uid}_{media_json['id']}"
+    assert s3_bucket.Object(key).get()["Body"].read() == data
+
+
+def test_update_s3_content_workers(ocw_parser_s3, s3_bucket, mocker):
+    """
+    update_s3_content should upload the same files and make the same parsed_json with several
+    workers as it does with one, reporting the progress of each file
+    """
+    mocker.patch(
+        "ocw_data_parser.ocw_data_parser.open_url",
+        side_effect=lambda link: io.BytesIO(link.encode()),
+    )
+    original_json = deepcopy(ocw_parser_s3.parsed_json)
+    prefix = ocw_parser_s3.s3_target_folder
+    results = []
+    for max_workers in [None, 4]:
+        s3_bucket.objects.filter(Prefix=prefix).delete()
+        ocw_parser_s3.parsed_json = deepcopy(original_json)
+        sent = []
+        ocw_parser_s3.update_s3_content(
+            upload=True,
+            max_workers=max_workers,
+            progress=lambda key, num_bytes, sent=sent: sent.append(key),
+        )
+        uploaded = {
+            item.key: item.e_tag for item in s3_bucket.objects.filter(Prefix=prefix)
+        }
+        assert set(sent) == set(uploaded)
+        results.append((uploaded, ocw_parser_s3.get_parsed_json()))
+    assert results[0] == results[1]
+    uploaded = results[0][0]
+    assert len(uploaded) == (
+        len(list(ocw_parser_s3.get_html_pages()))
+        + len(ocw_parser_s3.media_jsons)
+        + len({media["link"] for media in ocw_parser_s3.large_media_links})
+    )
+
+
+@pytest.mark.parametrize("max_workers", [None, 4])
+def test_update_s3_content_page_error(ocw_parser_s3, mocker, max_workers):
+    """A page which can't be uploaded should raise an error instead of getting an S3 link"""
+    mocker.patch.object(S3Uploader, "put", side_effect=ValueError("upload failed"))
+    course_pages = deepcopy(ocw_parser_s3.parsed_json["course_pages"])
+    with pytest.raises(ValueError):
+        ocw_parser_s3.update_s3_content(
+            upload=True,
+            update_media=False,
+            update_external_media=False,
+            max_workers=max_workers,
+        )
+    assert ocw_parser_s3.parsed_json["course_pages"] == course_pages
+
+
+def test_update_s3_content_sizes(ocw_parser_s3, mocker):
+    """chunk_size should be the read size for uploads and part_size the multipart part size"""
+    uploader_mock = mocker.patch(
+        "ocw_data_parser.ocw_data_parser.S3Uploader", wraps=S3Uploader
+    )
+    ocw_parser_s3.update_s3_content(
+        upload=False,
+        update_media=False,
+        update_external_media=False,
+        chunk_size=4096,
+        part_size=2 * MIN_PART_SIZE,
+    )
+    assert uploader_mock.call_args.kwargs["read_size"] == 4096
+    assert uploader_mock.call_args.kwargs["part_size"] == 2 * MIN_PART_SIZE
+
+
+def test_update_s3_content_acl(ocw_parser_s3, s3_bucket, mocker):
+    """Pages and media should be public, but foreign media should keep the bucket's default ACL"""
+    mocker.patch(
+        "ocw_data_parser.ocw_data_parser.open_url",
+        side_effect=lambda link: io.BytesIO(link.encode()),
+    )
+    ocw_parser_s3.update_s3_content(upload=True, max_workers=4)
+    prefix = ocw_parser_s3.s3_target_folder
+    foreign_keys = {
+        prefix + media["link"].split("/")[-1]
+        for media in ocw_parser_s3.large_media_links
+    }
+    page_key = prefix + ocw_parser_s3.get_html_pages()[0][1]
+    media_json = ocw_parser_s3.media_jsons[0]
+    media_key = f"{prefix}{media_json['_uid']}_{media_json['id']}"
+
+    def is_public(key):
+        return any(
+            grant["Grantee"].get("URI")
+            == "http://acs.amazonaws.com/groups/global/AllUsers"
+            for grant in s3_bucket.Object(key).Acl().grants
+        )
+
+    assert is_public(page_key)
+    assert is_public(media_key)
+    assert foreign_keys
+    assert not any(is_public(key) for key in foreign_keys)
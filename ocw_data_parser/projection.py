@@ -0,0 +1,187 @@
+"""
+Decode only the keys of a raw JSON record which the parser reads
+
+The base64 data of _datafield_image and _datafield_file is cut out of the raw bytes before
+decoding, so it is never built, and only the keys the parser reads are kept afterwards. Walking
+the members one at a time in Python was measured to be several times slower than letting the
+C decoder build the short values and dropping the ones which aren't needed.
+"""
+
+import re
+
+from ocw_data_parser import json_backend
+
+
+# Keep this in sync with the keys read by generate_parsed_json, compose_pages, compose_media,
+# compose_embedded_media, gather_foreign_media, get_binary_data and convert_to_vtt
+PROJECTED_KEYS = frozenset(
+    [
+        "_classname",
+        "_content_type",
+        "_datafield_file",
+        "_datafield_image",
+        "_type",
+        "_uid",
+        "about_this_resource_text",
+        "aka_course_number",
+        "alternate_text",
+        "bottomtext",
+        "caption",
+        "category_features",
+        "chp_display_level",
+        "chp_image",
+        "chp_image_thumb",
+        "course_level",
+        "courselist_features",
+        "courseoutcomestext",
+        "courseoverviewtext",
+        "courseteamrolestext",
+        "credit",
+        "curriculuminformationtext",
+        "description",
+        "dspace_handle",
+        "end_time",
+        "excludeFromNav",
+        "feature_requirements",
+        "features_tracking",
+        "first_published_to_production",
+        "from_semester",
+        "from_year",
+        "highlights_text",
+        "howstudenttimewasspenttext",
+        "id",
+        "image_alternate_text",
+        "image_caption_text",
+        "inline_embed_id",
+        "instructorinsightstext",
+        "instructors",
+        "is_image_gallery",
+        "is_media_gallery",
+        "is_update_of",
+        "language",
+        "last_published_to_production",
+        "last_unpublishing_date",
+        "linked_course_number",
+        "list_in_left_nav",
+        "master_course_number",
+        "master_subject",
+        "media_asset_type",
+        "media_index",
+        "media_location",
+        "metadata_contributor_list",
+        "optional_tab_title",
+        "optional_text",
+        "other_information_text",
+        "other_platform_requirements",
+        "parent_uid",
+        "related_content",
+        "related_resources_text",
+        "resource_index_text",
+        "retirement_date",
+        "short_page_title",
+        "short_url",
+        "sort_as",
+        "start_time",
+        "studentinformationtext",
+        "subject",
+        "technical_location",
+        "template_type",
+        "text",
+        "theclassroomtext",
+        "title",
+        "to_semester",
+        "to_year",
+        "transcript",
+        "unique_identifier",
+    ]
+)
+
+# Objects whose "data" member holds base64 encoded file contents
+BLOB_KEYS = frozenset(["_datafield_image", "_datafield_file"])
+
+# The start of the "data" string in a _datafield_* object. Quotes inside JSON strings are always
+# escaped, so an unescaped "_datafield_file" followed by a colon can only be a key.
+_PAYLOAD_START = re.compile(
+    r'"(?:_datafield_image|_datafield_file)"\s*:\s*\{[^{}]*?"data"\s*:\s*"'
+)
+_PAYLOAD_START_BYTES = re.compile(_PAYLOAD_START.pattern.encode())
+
+
+def _string_end(data, start):
+    """
+    Find the closing quote of a JSON string without decoding it
+
+    Args:
+        data (bytes or str): A JSON document
+        start (int): The index just after the opening quote
+
+    Returns:
+        int: The index of the closing quote, or -1 if the string is unterminated
+    """
+    quote, backslash = (
+        (b'"', 92) if isinstance(data, (bytes, bytearray)) else ('"', "\\")
+    )
+    end = start - 1
+    while True:
+        end = data.find(quote, end + 1)
+        if end == -1:
+            return -1
+        # The quote is escaped if it follows an odd number of backslashes
+        escape = end - 1
+        while escape >= start and data[escape] == backslash:
+            escape -= 1
+        if (end - escape) % 2 == 1:
+            return end
+
+
+def strip_payloads(data):
+    """
+    Cut the base64 data of _datafield_image and _datafield_file out of a raw JSON record,
+    leaving empty strings, so that decoding the record never builds it
+
+    Args:
+        data (bytes or str): The raw JSON record
+
+    Returns:
+        bytes or str: The record without base64 data
+    """
+    payload_start = (
+        _PAYLOAD_START_BYTES if isinstance(data, (bytes, bytearray)) else _PAYLOAD_START
+    )
+    chunks = []
+    position = 0
+    for match in payload_start.finditer(data):
+        if match.start() < position:
+            continue
+        end = _string_end(data, match.end())
+        if end == -1:
+            # Leave it to the decoder to report the unterminated string
+            break
+        chunks.append(data[position : match.end()])
+        position = end
+    if not chunks:
+        return data
+    chunks.append(data[position:])
+    return data[:0].join(chunks)
+
+
+def decode_projected(data, lazy_value, keys=PROJECTED_KEYS):
+    """
+    Decode the projected keys of a raw JSON record
+
+    Args:
+        data (bytes or str): The raw JSON record, which must be an object
+        lazy_value (callable):
+            Called with _datafield_image or _datafield_file to make a stand-in for its base64 data
+        keys (collection of str): The keys to keep
+
+    Returns:
+        dict: The projected members, with stand-ins for base64 data
+    """
+    loaded_json = json_backend.loads(strip_payloads(data))
+    projected = {key: value for key, value in loaded_json.items() if key in keys}
+    for key in BLOB_KEYS:
+        datafield = projected.get(key)
+        if isinstance(datafield, dict) and "data" in datafield:
+            datafield["data"] = lazy_value(key)
+    return projected
@@ -0,0 +1,60 @@
+"""Tests for projected decoding of raw JSON"""
+
+import json
+
+import pytest
+
+from ocw_data_parser.projection import decode_projected, strip_payloads
+
+
+@pytest.mark.parametrize("as_bytes", [True, False])
+def test_strip_payloads(as_bytes):
+    """Only the base64 data of _datafield_* objects should be cut out"""
+    document = json.dumps(
+        {
+            "text": 'A quote \\" and "data": "not a payload"',
+            "_datafield_file": {"encoding": "base64", "data": "QUJD", "size": 3},
+            "data": "kept",
+            "_datafield_image": {"data": "REVG"},
+        }
+    )
+    if as_bytes:
+        document = document.encode()
+    assert json.loads(strip_payloads(document)) == {
+        "text": 'A quote \\" and "data": "not a payload"',
+        "_datafield_file": {"encoding": "base64", "data": "", "size": 3},
+        "data": "kept",
+        "_datafield_image": {"data": ""},
+    }
+
+
+def test_strip_payloads_no_datafield():
+    """A record without base64 data should be returned as is"""
+    document = b'{"_datafield_file": {"encoding": "base64"}, "data": "x"}'
+    assert strip_payloads(document) is document
+
+
+def test_decode_projected():
+    """Only projected keys should be kept, with stand-ins for base64 data"""
+    document = json.dumps(
+        {
+            "_uid": "abc",
+            "_workflow_history": {"review": [{"actor": "someone"}]},
+            "_datafield_file": {"encoding": "base64", "data": "QUJD"},
+        }
+    ).encode()
+    assert decode_projected(
+        document, lambda key: f"lazy {key}", keys=["_uid", "_datafield_file"]
+    ) == {
+        "_uid": "abc",
+        "_datafield_file": {"encoding": "base64", "data": "lazy _datafield_file"},
+    }
+
+
+@pytest.mark.parametrize(
+    "document", [b"{", b'{"_datafield_file": {"data": "QUJD}', b'{"a": 1} {}']
+)
+def test_decode_projected_invalid(document):
+    """Invalid JSON should raise the same error as a full decode"""
+    with pytest.raises(json.JSONDecodeError):
+        decode_projected(document, lambda key: None)
@@ -0,0 +1,176 @@
+"""
+Upload files to S3 from a pool of threads
+
+Files are uploaded with boto3's managed transfers, so a large file is split into parts which are
+uploaded concurrently as well. Each finished file is logged with the running totals, and a
+callback can be given to follow the bytes as they are sent.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+import logging
+import threading
+
+from boto3.s3.transfer import TransferConfig
+
+log = logging.getLogger(__name__)
+
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+# S3 rejects parts smaller than this, apart from the last one
+MIN_PART_SIZE = 5 * 1024 * 1024
+PART_CONCURRENCY = 4
+
+
+class ChunkedReader:  # pylint: disable=too-few-public-methods
+    """
+    Reads a file object at most chunk_size bytes at a time, however much is asked for at once
+    """
+
+    def __init__(self, fileobj, chunk_size):
+        """
+        Args:
+            fileobj (file-like): The file object to read
+            chunk_size (int): The most bytes to read from fileobj at a time
+        """
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+
+    def read(self, size=-1):
+        """Read size bytes, or until the end of the file if size is negative"""
+        chunks = []
+        remaining = -1 if size is None else size
+        while remaining:
+            chunk = self.fileobj.read(
+                self.chunk_size if remaining < 0 else min(remaining, self.chunk_size)
+            )
+            if not chunk:
+                break
+            chunks.append(chunk)
+            if remaining > 0:
+                remaining -= len(chunk)
+        return b"".join(chunks)
+
+
+class S3Uploader:  # pylint: disable=too-many-instance-attributes
+    """
+    Runs upload tasks in a thread pool, or one at a time as they're submitted if there is only
+    one worker. Use it as a context manager, which waits for the tasks to finish on exit.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        s3_bucket,
+        max_workers=None,
+        part_size=MIN_PART_SIZE,
+        progress=None,
+        read_size=None,
+    ):
+        """
+        Args:
+            s3_bucket (s3.Bucket): The bucket to upload to
+            max_workers (int or None): The maximum number of files to upload at once
+            part_size (int): The size of each part of a multipart upload, at least MIN_PART_SIZE
+            progress (callable or None):
+                Called with the key and the number of bytes sent each time part of a file is
+                uploaded. It may be called from several threads at once.
+            read_size (int or None):
+                If set, files which can't seek, like streamed downloads, are read this many
+                bytes at a time
+        """
+        # Unlike resources, boto3 clients can be shared between threads
+        self.client = s3_bucket.meta.client
+        self.bucket_name = s3_bucket.name
+        self.max_workers = max_workers
+        self.progress = progress
+        self.read_size = read_size
+        self.config = TransferConfig(
+            multipart_threshold=MULTIPART_THRESHOLD,
+            multipart_chunksize=max(part_size, MIN_PART_SIZE),
+            max_concurrency=PART_CONCURRENCY,
+        )
+        self.files_uploaded = 0
+        self.bytes_uploaded = 0
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def __enter__(self):
+        if self.max_workers and self.max_workers > 1:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def submit(self, func, *args):
+        """
+        Run a task which uploads files
+
+        Args:
+            func (callable): The task
+            *args: Arguments for func
+
+        Returns:
+            Future: The result of the task. Without a thread pool the task has already finished.
+        """
+        if self._executor is not None:
+            return self._executor.submit(func, *args)
+        future = Future()
+        try:
+            future.set_result(func(*args))
+        except Exception as exception:  # pylint: disable=broad-except
+            future.set_exception(exception)
+        return future
+
+    def _sent(self, key, num_bytes):
+        """Record that some bytes of a file have been uploaded"""
+        with self._lock:
+            self.bytes_uploaded += num_bytes
+        if self.progress is not None:
+            self.progress(key, num_bytes)
+
+    def _finished(self, key):
+        """Record that a file has been uploaded"""
+        with self._lock:
+            self.files_uploaded += 1
+            files_uploaded, bytes_uploaded = self.files_uploaded, self.bytes_uploaded
+        log.info(
+            "Uploaded %s (%d files and %d bytes so far)",
+            key,
+            files_uploaded,
+            bytes_uploaded,
+        )
+
+    def put(self, key, body, acl="public-read"):
+        """
+        Upload a small file in a single request
+
+        Args:
+            key (str): The key to upload to
+            body (str or bytes): The content of the file
+            acl (str): The canned ACL for the object
+        """
+        self.client.put_object(Bucket=self.bucket_name, Key=key, Body=body, ACL=acl)
+        self._sent(key, len(body.encode("utf-8") if isinstance(body, str) else body))
+        self._finished(key)
+
+    def upload_fileobj(self, key, fileobj, acl="public-read"):
+        """
+        Upload a file from a file-like object, in parts if it is large
+
+        Args:
+            key (str): The key to upload to
+            fileobj (file-like): The content of the file, which doesn't need to be seekable
+            acl (str or None): The canned ACL for the object, or None to leave it private
+        """
+        if self.read_size and not (hasattr(fileobj, "seekable") and fileobj.seekable()):
+            fileobj = ChunkedReader(fileobj, self.read_size)
+        self.client.upload_fileobj(
+            fileobj,
+            self.bucket_name,
+            key,
+            ExtraArgs={"ACL": acl} if acl else {},
+            Config=self.config,
+            Callback=lambda num_bytes: self._sent(key, num_bytes),
+        )
+        self._finished(key)
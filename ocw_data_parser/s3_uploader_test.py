@@ -0,0 +1,93 @@
+"""Tests for uploading to S3 from a thread pool"""
+
+import io
+import os
+import threading
+
+import pytest
+
+from ocw_data_parser.s3_uploader import MIN_PART_SIZE, ChunkedReader, S3Uploader
+
+
+def test_upload_fileobj_multipart(s3_bucket):
+    """A large file should be uploaded in parts, with its progress reported"""
+    data = os.urandom(2 * MIN_PART_SIZE + 1024)
+    sent = []
+    with S3Uploader(
+        s3_bucket, max_workers=2, progress=lambda key, num_bytes: sent.append(key)
+    ) as uploader:
+        future = uploader.submit(
+            uploader.upload_fileobj, "uploader/large", io.BytesIO(data)
+        )
+    future.result()
+    # The ETag of a multipart upload ends with the number of parts
+    assert s3_bucket.Object("uploader/large").e_tag.endswith('-3"')
+    assert set(sent) == {"uploader/large"}
+    assert uploader.files_uploaded == 1
+    assert uploader.bytes_uploaded == len(data)
+
+
+def test_chunked_reader():
+    """Reads should be split into chunks, and still return as much as was asked for"""
+    data = os.urandom(100)
+    source = io.BytesIO(data)
+    read_sizes = []
+    original_read = source.read
+    source.read = lambda size: read_sizes.append(size) or original_read(size)
+    reader = ChunkedReader(source, 16)
+    assert reader.read(40) == data[:40]
+    assert reader.read() == data[40:]
+    assert reader.read(10) == b""
+    assert max(read_sizes) == 16
+
+
+def test_upload_fileobj_read_size(s3_bucket, mocker):
+    """Files which can't seek should be read read_size bytes at a time"""
+    data = os.urandom(MIN_PART_SIZE + 1024)
+    seekable = io.BytesIO(data)
+    with S3Uploader(s3_bucket, read_size=1024) as uploader:
+        upload_mock = mocker.patch.object(uploader.client, "upload_fileobj")
+        uploader.upload_fileobj("uploader/seekable", seekable)
+        assert upload_mock.call_args.args[0] is seekable
+
+        unseekable = mocker.Mock(spec=["read"])
+        uploader.upload_fileobj("uploader/stream", unseekable)
+        reader = upload_mock.call_args.args[0]
+        assert isinstance(reader, ChunkedReader)
+        assert reader.fileobj is unseekable
+        assert reader.chunk_size == 1024
+
+
+def test_put(s3_bucket):
+    """A page should be uploaded in one request, counting its bytes"""
+    sent = {}
+    with S3Uploader(
+        s3_bucket, progress=lambda key, num_bytes: sent.update({key: num_bytes})
+    ) as uploader:
+        uploader.put("uploader/page.html", "<p>é</p>")
+    assert s3_bucket.Object("uploader/page.html").e_tag
+    assert sent == {"uploader/page.html": len("<p>é</p>".encode("utf-8"))}
+    assert uploader.files_uploaded == 1
+
+
+def test_submit_serial(s3_bucket):
+    """Without workers, a task should run when it's submitted, with errors kept in its future"""
+
+    def fail():
+        raise ValueError("no")
+
+    with S3Uploader(s3_bucket) as uploader:
+        future = uploader.submit(lambda value: value * 2, 21)
+        assert future.done()
+        assert future.result() == 42
+        failed = uploader.submit(fail)
+        with pytest.raises(ValueError):
+            failed.result()
+
+
+def test_submit_workers(s3_bucket):
+    """With workers, tasks should run at the same time"""
+    barrier = threading.Barrier(3, timeout=10)
+    with S3Uploader(s3_bucket, max_workers=3) as uploader:
+        futures = [uploader.submit(barrier.wait) for _ in range(3)]
+    assert sorted(future.result() for future in futures) == [0, 1, 2]
@@ -1,22 +1,227 @@
-"""Utility functions for ocw-data-parser"""
+"""Utility functions for ocw-data-parser"""  # pylint: disable=too-many-lines
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
 import re
-import tempfile
 from base64 import b64decode, b64encode
 from pathlib import Path
 from datetime import datetime
 import uuid
 
+import codecs
+import io
 import os
 import shutil
 import json
 import logging
-import requests
 import webvtt
+from webvtt.parsers import SRTParser
 
 import pytz
+import requests
+
+from ocw_data_parser import http_client, json_backend
+from ocw_data_parser.media_cache import (
+    DEFAULT_MAX_SIZE,
+    get_media_cache,
+    use_media_cache,
+)
+from ocw_data_parser.projection import decode_projected
 
 log = logging.getLogger(__name__)
 
+DATAFIELD_KEYS = ["_datafield_image", "_datafield_file"]
+
+# How much binary data to decode or copy at a time
+BINARY_CHUNK_SIZE = 1024 * 1024
+# How many times to try a download which is interrupted partway through
+DOWNLOAD_ATTEMPTS = 3
+_NOT_BASE64 = bytes(
+    char
+    for char in range(256)
+    if chr(char)
+    not in "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
+)
+
+
+class LazyPayload:
+    """
+    Stands in for the base64 data of a _datafield_image or _datafield_file until it is needed.
+    Only a way to re-read the raw JSON record is kept, not the data itself.
+    """
+
+    def __init__(self, read_record, key):
+        """
+        Args:
+            read_record (callable): Returns the bytes of the raw JSON record holding the payload
+            key (str): Either _datafield_image or _datafield_file
+        """
+        self.read_record = read_record
+        self.key = key
+
+    def load(self):
+        """
+        Read the base64 data from the raw JSON record
+
+        Returns:
+            str: The base64 encoded data
+        """
+        return json_backend.loads(self.read_record())[self.key]["data"]
+
+    def __repr__(self):
+        return f"LazyPayload({self.read_record!r}, {self.key!r})"
+
+
+def defer_payloads(loaded_json, read_record):
+    """
+    Replace base64 data in a raw JSON record with LazyPayload references
+
+    Args:
+        loaded_json (dict): A raw JSON record
+        read_record (callable): Returns the bytes of the raw JSON record
+
+    Returns:
+        dict: The same record, modified in place
+    """
+    for key in DATAFIELD_KEYS:
+        datafield = loaded_json.get(key)
+        if isinstance(datafield, dict) and "data" in datafield:
+            datafield["data"] = LazyPayload(read_record, key)
+    return loaded_json
+
+
+def list_raw_json_files(course_dir):
+    """
+    Find the raw JSON files in each subdirectory of a course directory
+
+    Args:
+        course_dir (str or Path): Course directory path
+
+    Returns:
+        list of tuple(Path, int): The path of each file and the integer in its file name,
+            sorted by that integer within each subdirectory
+    """
+    course_dir = Path(course_dir)
+    dict_of_all_course_dirs = dict()
+    for dir_in_question in course_dir.iterdir():
+        if dir_in_question.is_dir():
+            dict_of_all_course_dirs[dir_in_question.name] = []
+            for file in dir_in_question.iterdir():
+                if file.suffix == ".json":
+                    # Turn file name to int to enforce sequential json loading later
+                    dict_of_all_course_dirs[dir_in_question.name].append(int(file.stem))
+            dict_of_all_course_dirs[dir_in_question.name] = sorted(
+                dict_of_all_course_dirs[dir_in_question.name]
+            )
+    return [
+        (course_dir / key / f"{json_index}.json", json_index)
+        for key, val in dict_of_all_course_dirs.items()
+        for json_index in val
+    ]
+
+
+def decode_raw_json(
+    data, json_index, read_record=None, lazy_payloads=False, projected=False
+):
+    """
+    Decode a raw JSON record and annotate it with its file name and order index
+
+    Args:
+        data (bytes or str): The raw JSON record
+        json_index (int): The integer in the record's file name
+        read_record (callable or None): Returns the bytes of the record again, for lazy payloads
+        lazy_payloads (bool): If true, replace base64 data with LazyPayload references
+        projected (bool):
+            If true, only decode the keys in projection.PROJECTED_KEYS. Base64 data is always
+            replaced with LazyPayload references in this mode.
+
+    Returns:
+        dict: The decoded record
+    """
+    if projected:
+        loaded_json = decode_projected(data, partial(LazyPayload, read_record))
+    else:
+        loaded_json = json_backend.loads(data)
+        if lazy_payloads:
+            defer_payloads(loaded_json, read_record)
+    # Add the json file name (used for error reporting)
+    loaded_json["actual_file_name"] = f"{json_index}.json"
+    # The only representation we have of ordering is the file name
+    loaded_json["order_index"] = int(json_index)
+    return loaded_json
+
+
+def map_with_workers(func, items, max_workers=None):
+    """
+    Apply a function to each item, using a thread pool if more than one worker is requested
+
+    Args:
+        func (callable): The function to apply
+        items (iterable): The arguments for func
+        max_workers (int or None): The maximum number of threads to use
+
+    Returns:
+        list: The results, in the same order as items
+    """
+    if max_workers and max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # map() yields results in submission order, and re-raises the first error
+            return list(executor.map(func, items))
+    return [func(item) for item in items]
+
+
+class CoursePageLookup:  # pylint: disable=too-few-public-methods
+    """
+    Find the first course page whose short_url is a substring of the end of a relative URL.
+
+    Pages are indexed by short_url, so a lookup only checks the substrings of the URL which have
+    the length of some short_url, instead of scanning every page.
+    """
+
+    def __init__(self, course_pages):
+        """
+        Args:
+            course_pages (list of dict): The parsed course pages from a course
+        """
+        self._pages = {}
+        for position, page in enumerate(course_pages):
+            short_url = page["short_url"]
+            if "index.htm" not in short_url:
+                self._pages.setdefault(short_url, (position, page))
+        self._lengths = sorted({len(short_url) for short_url in self._pages})
+        self._found = {}
+
+    def find(self, url):
+        """
+        Return the course page which matches a relative URL
+
+        Args:
+            url (str): A relative URL to match against a course page
+
+        Returns:
+            dict or None: The first matching course page in course_pages order
+        """
+        if not url:
+            return None
+        if url not in self._found:
+            self._found[url] = self._find(url)
+        return self._found[url]
+
+    def _find(self, url):
+        """Look up a URL which hasn't been looked up before"""
+        url_parts = url.split("/")
+        short_url = url
+        if len(url_parts) > 1:
+            short_url = url_parts[-2] + "/" + url_parts[-1]
+        match_position, match = None, None
+        for length in self._lengths:
+            if length > len(short_url):
+                break
+            for start in range(len(short_url) - length + 1):
+                candidate = self._pages.get(short_url[start : start + length])
+                if candidate and (match is None or candidate[0] < match_position):
+                    match_position, match = candidate
+        return match
+
 
 def course_page_from_relative_url(url, course_pages):
     """
@@ -26,20 +231,32 @@ def course_page_from_relative_url(url, course_pages):
         url (string): A relative URL to match against a course_page
         course_pages: An array of parsed course pages from a course
     """
-    if url:
-        for page in course_pages:
-            ocw_feature_url_parts = url.split("/")
-            ocw_feature_short_url = url
-            if len(ocw_feature_url_parts) > 1:
-                ocw_feature_short_url = (
-                    ocw_feature_url_parts[-2] + "/" + ocw_feature_url_parts[-1]
-                )
-            if (
-                page["short_url"] in ocw_feature_short_url
-                and "index.htm" not in page["short_url"]
-            ):
-                return page
-    return None
+    return CoursePageLookup(course_pages).find(url)
+
+
+def update_file_locations(parsed_json, uid_locations=None, filename_locations=None):
+    """
+    Update file_location for many objects in one pass over the parsed JSON
+
+    Args:
+        parsed_json (dict): The parsed JSON output to be modified with the updated file_location
+        uid_locations (dict of str: str):
+            New file_location values for course_pages and course_files, keyed by UID
+        filename_locations (dict of str: str):
+            New file_location values for course_foreign_files, keyed by the filename at the end
+            of their link
+    """
+    if uid_locations:
+        for section in ("course_pages", "course_files"):
+            for obj in parsed_json[section]:
+                new_file_location = uid_locations.get(obj["uid"])
+                if new_file_location is not None:
+                    obj["file_location"] = new_file_location
+    if filename_locations:
+        for media in parsed_json["course_foreign_files"]:
+            new_file_location = filename_locations.get(media["link"].split("/")[-1])
+            if new_file_location is not None:
+                media["file_location"] = new_file_location
 
 
 def update_file_location(parsed_json, new_file_location, obj_uid=""):
@@ -48,6 +265,7 @@ def update_file_location(parsed_json, new_file_location, obj_uid=""):
 
     If obj_uid is set, the function will look in course_pages and course_files for the content to update.
     Otherwise, the function will look in course_foreign_files and see if the filename matches new_file_location.
+    Use update_file_locations to update many objects at once.
 
     Args:
         parsed_json (dict): The parsed JSON output to be modified with the updated file_location
@@ -55,54 +273,320 @@ def update_file_location(parsed_json, new_file_location, obj_uid=""):
         obj_uid (str): UID of the file to be updated
     """
     if obj_uid:
-        for page in parsed_json["course_pages"]:
-            if page["uid"] == obj_uid:
-                page["file_location"] = new_file_location
-        for course_file in parsed_json["course_files"]:
-            if course_file["uid"] == obj_uid:
-                course_file["file_location"] = new_file_location
+        update_file_locations(parsed_json, uid_locations={obj_uid: new_file_location})
     else:
-        for media in parsed_json["course_foreign_files"]:
-            original_filename = media["link"].split("/")[-1]
-            passed_filename = new_file_location.split("/")[-1]
-            if original_filename == passed_filename:
-                media["file_location"] = new_file_location
+        update_file_locations(
+            parsed_json,
+            filename_locations={new_file_location.split("/")[-1]: new_file_location},
+        )
 
 
-def get_binary_data(json_obj):
+class Base64Reader(io.RawIOBase):
     """
-    Look in _datafield_image or _datafield_file for base64 encoded binary data. If it's not present,
-    try to download it.
+    A readable file object which decodes base64 data a chunk at a time, so that the decoded
+    file never has to be held in memory all at once
+    """
+
+    def __init__(self, b64_data, chunk_size=BINARY_CHUNK_SIZE):
+        """
+        Args:
+            b64_data (str or bytes): Base64 encoded data
+            chunk_size (int): How many base64 characters to decode at a time
+        """
+        super().__init__()
+        self.b64_data = b64_data
+        self.chunk_size = chunk_size
+        self._position = 0
+        self._undecoded = b""
+        self._decoded = b""
+        self._decoded_position = 0
+
+    def readable(self):  # pylint: disable=no-self-use
+        """The data can be read"""
+        return True
+
+    def _decode_chunk(self):
+        """Decode the next chunk of base64 data"""
+        chunk = self.b64_data[self._position : self._position + self.chunk_size]
+        self._position += len(chunk)
+        if isinstance(chunk, str):
+            chunk = chunk.encode("ascii")
+        # Like b64decode, ignore anything which isn't part of the base64 alphabet
+        chunk = self._undecoded + bytes(chunk).translate(None, _NOT_BASE64)
+        if self._position < len(self.b64_data):
+            end = len(chunk) - len(chunk) % 4
+            chunk, self._undecoded = chunk[:end], chunk[end:]
+        else:
+            self._undecoded = b""
+        self._decoded = b64decode(chunk)
+        self._decoded_position = 0
+
+    def readinto(self, buffer):
+        """
+        Decode data into a buffer. The whole buffer is filled unless the data runs out,
+        since S3 uploads treat a short read as the end of a part.
+
+        Args:
+            buffer (bytearray or memoryview): The buffer to fill
+
+        Returns:
+            int: The number of bytes read
+        """
+        size = 0
+        with memoryview(buffer).cast("B") as view:
+            while size < len(view):
+                if self._decoded_position == len(self._decoded):
+                    if self._position >= len(self.b64_data):
+                        break
+                    self._decode_chunk()
+                    continue
+                count = min(
+                    len(view) - size, len(self._decoded) - self._decoded_position
+                )
+                view[size : size + count] = self._decoded[
+                    self._decoded_position : self._decoded_position + count
+                ]
+                self._decoded_position += count
+                size += count
+        return size
+
+
+def _find_binary_data(json_obj):
+    """
+    Find the base64 encoded data for a file, or failing that a URL to download it from
 
     Args:
         json_obj (dict): JSON from one of the input course files
 
     Returns:
-        bytes or None: Binary data for a file, or None if it couldn't be found
+        tuple(str or bytes, str): The base64 data, or None if there isn't any, and the URL, or None
     """
-    key = ""
-    if "_datafield_image" in json_obj:
-        key = "_datafield_image"
-    elif "_datafield_file" in json_obj:
-        key = "_datafield_file"
-    if key:
-        b64_data = json_obj[key]["data"]
-        return b64decode(b64_data)
+    for key in DATAFIELD_KEYS:
+        if key in json_obj:
+            b64_data = json_obj[key]["data"]
+            if isinstance(b64_data, LazyPayload):
+                b64_data = b64_data.load()
+            return b64_data, None
 
     url = None
     if "unique_identifier" in json_obj:
         url = json_obj["unique_identifier"]
     elif "technical_location" in json_obj:
         url = json_obj["technical_location"]
-
     if url:
         url = url.replace("://ocw.mit.edu/", "://old.ocw.mit.edu/")
-        resp = requests.get(url)
+    return None, url
+
+
+def get_binary_data(json_obj):
+    """
+    Look in _datafield_image or _datafield_file for base64 encoded binary data. If it's not present,
+    try to download it. LazyPayload data is read from the raw JSON at this point.
+
+    Args:
+        json_obj (dict): JSON from one of the input course files
+
+    Returns:
+        bytes or None: Binary data for a file, or None if it couldn't be found
+    """
+    b64_data, url = _find_binary_data(json_obj)
+    if b64_data is not None:
+        return b64decode(b64_data)
+    if url:
+        if get_media_cache() is not None:
+            try:
+                with open_url(url) as binary_data:
+                    return binary_data.read()
+            except requests.exceptions.HTTPError:
+                return None
+        resp = http_client.get(url)
         if resp.ok:
             return resp.content
     return None
 
 
+class ResponseReader(io.RawIOBase):
+    """
+    A readable file object for the body of a streamed response. Closing it closes the response,
+    which gives its connection back to the pool even if the body wasn't read to the end.
+    """
+
+    def __init__(self, response):
+        """
+        Args:
+            response (requests.Response): A response to a request made with stream=True
+        """
+        super().__init__()
+        self.response = response
+        self.response.raw.decode_content = True
+
+    def readable(self):  # pylint: disable=no-self-use
+        """The body can be read"""
+        return True
+
+    def read(self, size=-1):
+        """Read up to size bytes of the body, or all of it if size is negative"""
+        return self.response.raw.read(None if size is None or size < 0 else size)
+
+    def readinto(self, buffer):
+        """Read bytes of the body into a buffer"""
+        return self.response.raw.readinto(buffer)
+
+    def close(self):
+        """Close the response, releasing its connection"""
+        if not self.closed:
+            self.response.close()
+        super().close()
+
+
+def open_url(url):
+    """
+    Open a URL, or the file downloaded from it if there is a media cache
+
+    Args:
+        url (str): The URL of a file
+
+    Returns:
+        file object: The content of the file
+
+    Raises:
+        requests.exceptions.HTTPError: If the response has an error status
+    """
+    cache = get_media_cache()
+    if cache is not None:
+        return cache.open(url, _stream_to_file)
+    resp = http_client.get(url, stream=True)
+    try:
+        resp.raise_for_status()
+    except requests.exceptions.HTTPError:
+        resp.close()
+        raise
+    return ResponseReader(resp)
+
+
+def open_binary_data(json_obj):
+    """
+    Like get_binary_data, but returns a file object which decodes or downloads the data as it's read
+
+    Args:
+        json_obj (dict): JSON from one of the input course files
+
+    Returns:
+        file object or None: Binary data for a file, or None if it couldn't be found
+    """
+    b64_data, url = _find_binary_data(json_obj)
+    if b64_data is not None:
+        return Base64Reader(b64_data)
+    if url:
+        if get_media_cache() is not None:
+            try:
+                return open_url(url)
+            except requests.exceptions.HTTPError:
+                return None
+        resp = http_client.get(url, stream=True)
+        if resp.ok:
+            return ResponseReader(resp)
+        resp.close()
+    return None
+
+
+def write_binary_data(binary_data, file):
+    """
+    Copy a file object from open_binary_data to another file object a chunk at a time
+
+    Args:
+        binary_data (file object): The binary data to copy, which is closed afterwards
+        file (file object): The file object to write to
+    """
+    with binary_data:
+        shutil.copyfileobj(binary_data, file, BINARY_CHUNK_SIZE)
+
+
+def _stream_to_file(url, path, attempts=DOWNLOAD_ATTEMPTS, validators=None):
+    """
+    Download a URL to path a chunk at a time, without using the media cache
+
+    Args:
+        url (str): The URL to download
+        path (Path): Where to write the file
+        attempts (int): How many times to try the download if it's interrupted
+        validators (dict or None):
+            The etag and last_modified of a copy of the file which has already been downloaded.
+            If set, the file is only downloaded if it has changed.
+
+    Returns:
+        dict or None: The validators of the downloaded file, or None if it hadn't changed
+    """
+    headers = http_client.conditional_headers(validators)
+    for attempt in range(1, attempts + 1):
+        response = http_client.get(url, stream=True, headers=headers)
+        try:
+            if headers and response.status_code == 304:
+                return None
+            response.raise_for_status()
+            with open(path, "wb") as file:
+                for chunk in response.iter_content(BINARY_CHUNK_SIZE):
+                    file.write(chunk)
+            return http_client.response_validators(response)
+        except (
+            requests.exceptions.ChunkedEncodingError,
+            requests.exceptions.ConnectionError,
+        ):
+            if attempt == attempts:
+                raise
+            log.warning("Retrying download of %s after it was interrupted", url)
+        finally:
+            response.close()
+    return None
+
+
+def download_file(url, path, attempts=DOWNLOAD_ATTEMPTS, validator_store=None):
+    """
+    Download a file to disk a chunk at a time, or copy it from the media cache if there is one.
+    The file is written to a temporary file next to path and moved there once it's complete,
+    so an interrupted download doesn't leave part of a file behind, and downloads to the same
+    path at once don't write to the same file.
+
+    Args:
+        url (str): The URL to download
+        path (Path): Where to save the file
+        attempts (int): How many times to try the download if the connection fails
+            partway through the response. Failed requests are already retried by the HTTP session.
+        validator_store (ValidatorStore or None):
+            If set, and path was downloaded before, only download the file again if it has
+            changed. Not used when there is a media cache, which keeps its own validators.
+
+    Raises:
+        requests.exceptions.HTTPError: If the response has an error status
+    """
+    part_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.part")
+    cache = get_media_cache()
+    try:
+        if cache is None:
+            validators = (
+                validator_store.get(url)
+                if validator_store is not None and path.exists()
+                else None
+            )
+            validators = _stream_to_file(
+                url, part_path, attempts=attempts, validators=validators
+            )
+            if validators is None:
+                # The file hasn't changed since it was downloaded to path
+                return
+            if validator_store is not None:
+                validator_store.set(url, validators)
+        else:
+            with cache.open(
+                url, partial(_stream_to_file, attempts=attempts)
+            ) as cached_file, open(part_path, "wb") as file:
+                shutil.copyfileobj(cached_file, file, BINARY_CHUNK_SIZE)
+        os.replace(part_path, path)
+    finally:
+        if part_path.exists():
+            os.unlink(part_path)
+
+
 def print_error(message):
     """Print an error"""
     print("\x1b[0;31;40m Error:\x1b[0m " + message)
@@ -137,6 +621,22 @@ def find_all_values_for_key(jsons, key="_content_type"):
     return result
 
 
+def build_children_index(jsons):
+    """
+    Index course JSON by parent_uid
+
+    Args:
+        jsons (list of dict): The input course JSON dicts
+
+    Returns:
+        dict: A map of parent_uid to the records with that parent in the same order as jsons
+    """
+    children_index = {}
+    for json_file in jsons:
+        children_index.setdefault(json_file.get("parent_uid"), []).append(json_file)
+    return children_index
+
+
 def htmlify(page):
     """
     Wrap contents of a page dict in basic HTML
@@ -155,6 +655,42 @@ def htmlify(page):
     return None, None
 
 
+@lru_cache(maxsize=None)
+def _timezone(timezone_piece):
+    """
+    Look up a timezone, mapping GMT offsets like GMT+5 to their Etc/ names
+
+    Args:
+        timezone_piece (str): The timezone name from a date string
+
+    Returns:
+        datetime.tzinfo: The pytz timezone
+    """
+    if "GMT" in timezone_piece:
+        return pytz.timezone("Etc/" + timezone_piece)
+    return pytz.timezone(timezone_piece)
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_str(date_str):
+    """
+    Parse a non-empty date string. The results are cached since many courses share dates.
+
+    Args:
+        date_str (str): Datetime object as string in the following format (2016/02/02 20:28:06 US/Eastern)
+    Returns:
+        datetime: Datetime object in UTC
+    """
+    date_pieces = date_str.split(" ")  # e.g. 2016/02/02 20:28:06 US/Eastern
+    date_pieces[0] = date_pieces[0].replace("/", "-")
+    # Discard milliseconds if exists
+    date_pieces[1] = date_pieces[1][:-4] if "." in date_pieces[1] else date_pieces[1]
+    timezone = _timezone(date_pieces.pop(2))
+    tz_stripped_date = datetime.strptime(" ".join(date_pieces), "%Y-%m-%d %H:%M:%S")
+    tz_aware_date = timezone.localize(tz_stripped_date)
+    return tz_aware_date.astimezone(pytz.utc)
+
+
 def parse_date(date_str):
     """
     Parse date string in a format like 2016/02/02 20:28:06 US/Eastern
@@ -165,22 +701,7 @@ def parse_date(date_str):
         datetime: Datetime object if passed date is valid, otherwise None
     """
     if date_str and date_str != "None":
-        date_pieces = date_str.split(" ")  # e.g. 2016/02/02 20:28:06 US/Eastern
-        date_pieces[0] = date_pieces[0].replace("/", "-")
-        # Discard milliseconds if exists
-        date_pieces[1] = (
-            date_pieces[1][:-4] if "." in date_pieces[1] else date_pieces[1]
-        )
-        timezone_piece = date_pieces.pop(2)
-        timezone = (
-            pytz.timezone(timezone_piece)
-            if "GMT" not in timezone_piece
-            else pytz.timezone("Etc/" + timezone_piece)
-        )
-        tz_stripped_date = datetime.strptime(" ".join(date_pieces), "%Y-%m-%d %H:%M:%S")
-        tz_aware_date = timezone.localize(tz_stripped_date)
-        tz_aware_date = tz_aware_date.astimezone(pytz.utc)
-        return tz_aware_date
+        return _parse_date_str(date_str)
     return None
 
 
@@ -194,16 +715,30 @@ def is_course_published(source_path):
     Returns:
         boolean: True if published, False if not
     """
+    # pylint: disable=import-outside-toplevel
+    from ocw_data_parser.course_archive import is_course_archive, load_archive_json
+    from ocw_data_parser.course_bundle import CourseBundle, is_course_bundle
+
     source_path = Path(source_path) if source_path else None
 
     # Collect last modified timestamps for all course files of the course
     is_published = True
-    matches = list(source_path.rglob("1.json"))
-    if not matches:
-        raise Exception(f"Could not find 1.json for {source_path}")
+    if is_course_bundle(source_path) or is_course_archive(source_path):
+        try:
+            if is_course_archive(source_path):
+                first_json = load_archive_json(source_path, 1)
+            else:
+                with CourseBundle(source_path) as bundle:
+                    first_json = bundle.load_json(1)
+        except KeyError as ex:
+            raise Exception(f"Could not find 1.json for {source_path}") from ex
+    else:
+        matches = list(source_path.rglob("1.json"))
+        if not matches:
+            raise Exception(f"Could not find 1.json for {source_path}")
 
-    with open(matches[0], "r") as infile:
-        first_json = json.load(infile)
+        with open(matches[0], "r") as infile:
+            first_json = json.load(infile)
 
     last_published_to_production = parse_date(
         first_json.get("last_published_to_production", None)
@@ -218,6 +753,39 @@ def is_course_published(source_path):
     return is_published
 
 
+def find_course_sources(courses_dir):
+    """
+    Find the raw JSON of each course in a directory, as a course directory, a bundle or an archive
+
+    Args:
+        courses_dir (str or Path): The directory containing JSON from Plone for each course
+
+    Returns:
+        list of tuple(Path, str): The source path to pass to OCWParser and the course directory name
+    """
+    # pylint: disable=import-outside-toplevel
+    from ocw_data_parser.course_archive import archive_course_name
+    from ocw_data_parser.course_bundle import BUNDLE_SUFFIX
+
+    course_dirs = []
+    bundles = []
+    archives = []
+    # Walk the tree once, sorting the files into each kind of source
+    for dir_path, _, file_names in os.walk(courses_dir):
+        dir_path = Path(dir_path)
+        for file_name in file_names:
+            path = dir_path / file_name
+            if file_name == "1.json":
+                course_dirs.append((dir_path.parent, dir_path.parent.name))
+            elif file_name.endswith(BUNDLE_SUFFIX):
+                bundles.append((path, file_name[: -len(BUNDLE_SUFFIX)]))
+            else:
+                course_name = archive_course_name(path)
+                if course_name is not None:
+                    archives.append((path, course_name))
+    return course_dirs + bundles + archives
+
+
 def parse_all(  # pylint: disable=too-many-arguments, too-many-locals
     courses_dir,
     destination_dir,
@@ -228,12 +796,21 @@ def parse_all(  # pylint: disable=too-many-arguments, too-many-locals
     beautify_parsed_json=False,
     courses_json_path=None,
     create_vtt_files=False,
+    load_workers=None,
+    lazy_payloads=False,
+    projected=False,
+    media_cache_dir=None,
+    media_cache_size=DEFAULT_MAX_SIZE,
+    vtt_workers=None,
+    vtt_cache_dir=None,
 ):
     """
     Convert multiple courses in a directory to the parsed JSON format in destination_dir
 
     Args:
-        courses_dir (str or Path or None): The directory containing JSON from Plone for each course
+        courses_dir (str or Path or None):
+            The directory containing JSON from Plone for each course, as directories, bundles,
+            or .tar, .tar.gz and .zip archives
         destination_dir (str or Path or None): The directory to write courses to with the parsed JSON
         upload_parsed_json (bool): Upload the parsed JSON to S3
         s3_bucket (str): The S3 bucket to upload to
@@ -242,6 +819,18 @@ def parse_all(  # pylint: disable=too-many-arguments, too-many-locals
         beautify_parsed_json (bool): Pretty print JSON files which are created
         courses_json_path (str or Path or None): If set, only convert courses listed in this file
         create_vtt_files (bool): If true, convert all srt caption files to vtt
+        load_workers (int or None): If set, load each course's raw JSON with this many threads
+        lazy_payloads (bool): If true, read base64 file data from the raw JSON only when needed
+        projected (bool): If true, only decode the raw JSON keys which the parser reads
+        media_cache_dir (str or Path or None):
+            If set, keep downloaded media in this directory so that files linked from several
+            courses are only downloaded once. The shared cache is put back once the courses
+            have been parsed.
+        media_cache_size (int): How many bytes of media to keep in the cache
+        vtt_workers (int or None): If set, convert each course's srt captions in this many processes
+        vtt_cache_dir (str or Path or None):
+            If set, keep converted vtt captions in this directory, so that captions which haven't
+            changed aren't converted again
     """
     import ocw_data_parser.ocw_data_parser  # pylint: disable=import-outside-toplevel
 
@@ -253,41 +842,79 @@ def parse_all(  # pylint: disable=too-many-arguments, too-many-locals
         with open(courses_json_path) as file:
             course_list = json.load(file)["courses"]
 
-    for first_json_path in courses_dir.rglob("1.json"):
-        source_path = first_json_path.parent.parent
-        course_dir = source_path.name
-
-        if course_list is not None and course_dir not in course_list:
-            continue
+    with use_media_cache(media_cache_dir, max_size=media_cache_size):
+        for source_path, course_dir in find_course_sources(courses_dir):
+            if course_list is not None and course_dir not in course_list:
+                continue
 
-        dest_path = destination_dir / course_dir
-        if dest_path.exists() and overwrite:
-            shutil.rmtree(dest_path)
-        if not dest_path.exists():
-            os.makedirs(dest_path)
-            parser = ocw_data_parser.OCWParser(
-                course_dir=source_path,
-                destination_dir=destination_dir,
-                s3_bucket_name=s3_bucket,
-                s3_target_folder=course_dir,
-                beautify_parsed_json=beautify_parsed_json,
-                create_vtt_files=create_vtt_files,
-            )
-            perform_upload = (
-                s3_links and upload_parsed_json and is_course_published(source_path)
-            )
-            if perform_upload:
-                parser.setup_s3_uploading(
-                    s3_bucket,
-                    os.environ["AWS_ACCESS_KEY_ID"],
-                    os.environ["AWS_SECRET_ACCESS_KEY"],
-                    course_dir,
+            dest_path = destination_dir / course_dir
+            if dest_path.exists() and overwrite:
+                shutil.rmtree(dest_path)
+            if not dest_path.exists():
+                os.makedirs(dest_path)
+                parser = ocw_data_parser.OCWParser(
+                    course_dir=source_path,
+                    destination_dir=destination_dir,
+                    s3_bucket_name=s3_bucket,
+                    s3_target_folder=course_dir,
+                    beautify_parsed_json=beautify_parsed_json,
+                    create_vtt_files=create_vtt_files,
+                    vtt_workers=vtt_workers,
+                    vtt_cache_dir=vtt_cache_dir,
+                    load_workers=load_workers,
+                    lazy_payloads=lazy_payloads,
+                    projected=projected,
+                )
+                perform_upload = (
+                    s3_links and upload_parsed_json and is_course_published(source_path)
+                )
+                if perform_upload:
+                    parser.setup_s3_uploading(
+                        s3_bucket,
+                        os.environ["AWS_ACCESS_KEY_ID"],
+                        os.environ["AWS_SECRET_ACCESS_KEY"],
+                        course_dir,
+                    )
+                    # just upload parsed json, and update media links.
+                    parser.upload_to_s3 = False
+                parser.export_parsed_json(
+                    s3_links=s3_links, upload_parsed_json=perform_upload
                 )
-                # just upload parsed json, and update media links.
-                parser.upload_to_s3 = False
-            parser.export_parsed_json(
-                s3_links=s3_links, upload_parsed_json=perform_upload
-            )
+
+
+def _vtt_json(loaded_json, vtt_data):
+    """Make the JSON for the vtt file converted from a srt caption file"""
+    new_json = dict(loaded_json)
+    new_json["id"] = update_srt_to_vtt(loaded_json["id"])
+    new_json["technical_location"] = update_srt_to_vtt(
+        loaded_json["technical_location"]
+    )
+    new_json["_uid"] = uuid.uuid5(uuid.UUID(loaded_json["_uid"]), "vtt").hex
+    new_json["_datafield_file"] = {
+        "encoding": "base64",
+        "data": b64encode(vtt_data).decode(),
+    }
+    return new_json
+
+
+def _convert_or_log(loaded_json, convert):
+    """
+    Call convert to get the vtt data for a srt caption file
+
+    Returns:
+        bytes or None: The vtt data, or None if convert raised an error, which is logged
+    """
+    try:
+        return convert()
+    except webvtt.errors.MalformedFileError as msg:
+        log.exception(
+            "This file is malformed and cannot be converted to vtt %s. %s",
+            loaded_json["id"],
+            msg,
+        )
+    except:  # pylint: disable=bare-except
+        log.exception("Unknown error when converting vtt %s", loaded_json["id"])
+    return None
 
 
 def convert_to_vtt(loaded_json):
@@ -300,43 +927,90 @@ def convert_to_vtt(loaded_json):
     Returns:
         dict: copy of the json file with the _datafield_file converted to vtt format
     """
-    if loaded_json["id"].endswith(".vtt"):
-        return None
-    new_json = dict(loaded_json)
+    new_jsons = convert_many_to_vtt([loaded_json])
+    return new_jsons[0] if new_jsons else None
 
-    new_json["id"] = update_srt_to_vtt(loaded_json["id"])
-    new_json["technical_location"] = update_srt_to_vtt(
-        loaded_json["technical_location"]
-    )
-    new_json["_uid"] = uuid.uuid5(uuid.UUID(loaded_json["_uid"]), "vtt").hex
-    binary_data = get_binary_data(loaded_json)
-    if binary_data is not None:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            with open(Path(temp_dir) / "data", "wb") as file:
-                file.write(binary_data)
-                file.flush()
-                try:
-                    webvtt.from_srt(Path(temp_dir) / "data").save()
-                except webvtt.errors.MalformedFileError as msg:
-                    log.exception(
-                        "This file is malformed and cannot be converted to vtt %s. %s",
-                        loaded_json["id"],
-                        msg,
-                    )
-                    return None
-                except:  # pylint: disable=bare-except
-                    log.exception(
-                        "Unknown error when converting vtt %s", loaded_json["id"]
-                    )
-                    return None
-            with open(Path(temp_dir) / "data.vtt", "rb") as file:
-                data = file.read()
-            new_json["_datafield_file"] = {
-                "encoding": "base64",
-                "data": b64encode(data).decode(),
-            }
-            return new_json
-    return None
+
+def _read_srt_files(loaded_jsons, cache):
+    """
+    Read the srt data of each caption file
+
+    Returns:
+        list of tuple(dict, bytes, bytes): Each JSON file with srt data, its srt data, and the
+            vtt data cached for it or None
+    """
+    srt_files = []
+    for loaded_json in loaded_jsons:
+        if loaded_json["id"].endswith(".vtt"):
+            continue
+        srt_data = get_binary_data(loaded_json)
+        if srt_data is not None:
+            vtt_data = cache.get(srt_data) if cache is not None else None
+            srt_files.append((loaded_json, srt_data, vtt_data))
+    return srt_files
+
+
+def convert_many_to_vtt(loaded_jsons, max_workers=None, cache=None):
+    """
+    Convert json files with srt captions data to vtt format, like convert_to_vtt
+
+    Args:
+        loaded_jsons (list of dict): The content of the JSON files
+        max_workers (int or None): If more than one, convert captions in this many processes
+        cache (VttCache or None): If set, reuse captions which were converted before
+
+    Returns:
+        list of dict: copies of the json files which could be converted, in the same order,
+            with the _datafield_file converted to vtt format
+    """
+    srt_files = _read_srt_files(loaded_jsons, cache)
+    converts = {}
+    to_convert = [srt_data for _, srt_data, vtt_data in srt_files if vtt_data is None]
+    executor = None
+    if max_workers and max_workers > 1 and len(to_convert) > 1:
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+        for srt_data in to_convert:
+            # The same captions are only converted once
+            if srt_data not in converts:
+                converts[srt_data] = executor.submit(srt_to_vtt, srt_data).result
+    try:
+        new_jsons = []
+        for loaded_json, srt_data, vtt_data in srt_files:
+            if vtt_data is None:
+                vtt_data = _convert_or_log(
+                    loaded_json, converts.get(srt_data, partial(srt_to_vtt, srt_data))
+                )
+                if vtt_data is None:
+                    continue
+                if cache is not None:
+                    cache.put(srt_data, vtt_data)
+            new_jsons.append(_vtt_json(loaded_json, vtt_data))
+        return new_jsons
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def srt_to_vtt(srt_data):
+    """
+    Convert SRT captions to WebVTT in memory. The result is the same as writing the captions to a
+    file and converting it with webvtt.from_srt(path).save().
+
+    Args:
+        srt_data (bytes): The SRT captions
+
+    Returns:
+        bytes: The WebVTT captions, encoded as UTF-8
+
+    Raises:
+        webvtt.errors.MalformedFileError: If the captions aren't valid SRT
+        webvtt.errors.MalformedCaptionError: If a caption isn't valid
+    """
+    encoding = "utf-8-sig" if srt_data.startswith(codecs.BOM_UTF8) else "utf-8"
+    # TextIOWrapper decodes the data and translates newlines the same way opening the file would
+    with io.TextIOWrapper(io.BytesIO(srt_data), encoding=encoding) as srt_file:
+        captions = SRTParser().read_from_buffer(srt_file).captions
+    return webvtt.WebVTT(captions=captions).content.encode("utf-8")
 
 
 def update_srt_to_vtt(field):
@@ -344,23 +1018,30 @@ def update_srt_to_vtt(field):
     return re.sub(r".srt$", ".vtt", field)
 
 
+def contributor_positions(contributor_list):
+    """
+    Index a contributor list by md_contributor_uid
+
+    Args:
+        contributor_list (list of dict): The metadata_contributor_list of a course
+
+    Returns:
+        dict: The position of the first contributor with each md_contributor_uid
+    """
+    positions = {}
+    for idx, contributor in enumerate(contributor_list):
+        positions.setdefault(contributor.get("md_contributor_uid"), idx)
+    return positions
+
+
 def ordered_instructors(original_list, contributor_list):
     """Reorder an instructor list based on position in contributor list"""
     if not original_list:
         return None
     if not contributor_list:
         return original_list
-    idx_list = []
-    for instructor in original_list:
-        instructor_idx = None
-        for idx, contributor in enumerate(contributor_list):
-            if contributor.get("md_contributor_uid") == instructor["uid"]:
-                instructor_idx = idx
-                break
-        # Assign the idx of the matching contributor as the order value, or 9999 if no match found
-        idx_list.append(instructor_idx if instructor_idx is not None else 9999)
-    zipped_list = zip(idx_list, original_list)
-    ordered = [
-        instructor for (_, instructor) in sorted(zipped_list, key=lambda x: x[0])
-    ]
-    return ordered
+    positions = contributor_positions(contributor_list)
+    # Order by the idx of the matching contributor, or 9999 if no match found
+    return sorted(
+        original_list, key=lambda instructor: positions.get(instructor["uid"], 9999)
+    )
@@ -1,24 +1,53 @@
 """Tests for utility functions"""
-from base64 import b64encode
+from base64 import b64encode, encodebytes
+from copy import deepcopy
+from datetime import datetime
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+import json
 import os
+from pathlib import Path
 from tempfile import TemporaryDirectory
-from unittest.mock import patch
+import threading
+import time
+from unittest.mock import MagicMock, patch
 
 import pytest
+import pytz
+import requests
+import webvtt
 
+from ocw_data_parser import http_client
 import ocw_data_parser.test_constants as constants
+from ocw_data_parser.media_cache import configure_media_cache, get_media_cache
+from ocw_data_parser.validator_store import ValidatorStore
 from ocw_data_parser.utils import (
+    BINARY_CHUNK_SIZE,
+    CoursePageLookup,
+    build_children_index,
+    course_page_from_relative_url,
     update_file_location,
+    update_file_locations,
     get_binary_data,
+    open_binary_data,
+    open_url,
+    write_binary_data,
+    download_file,
+    Base64Reader,
+    LazyPayload,
     print_error,
     print_success,
+    srt_to_vtt,
     htmlify,
+    ordered_instructors,
     parse_all,
+    parse_date,
     is_course_published,
 )
 
 
-# pylint: disable=unused-argument
+# pylint: disable=unused-argument, redefined-outer-name
 def test_update_local_file_location(ocw_parser):
     """
     Extract local course media, update the location of one of the files
@@ -59,6 +88,53 @@ def test_update_foreign_file_location(ocw_parser):
     ), "failed to update foreign file location"
 
 
+def test_update_file_locations():
+    """
+    Updating many locations at once should give the same result as updating them one at a time
+    """
+    parsed_json = {
+        "course_pages": [{"uid": "a"}, {"uid": "b"}, {"uid": "c"}],
+        "course_files": [{"uid": "d"}, {"uid": "a"}],
+        "course_foreign_files": [
+            {"link": "http://example.com/x/1.mp4"},
+            {"link": "http://example.com/y/1.mp4"},
+            {"link": "http://example.com/2.mp4"},
+        ],
+    }
+    expected = deepcopy(parsed_json)
+    uid_locations = {"a": "s3/a", "d": "s3/d", "missing": "s3/missing"}
+    filename_locations = {"1.mp4": "s3/1.mp4", "3.mp4": "s3/3.mp4"}
+    for uid, location in uid_locations.items():
+        update_file_location(expected, location, uid)
+    for location in filename_locations.values():
+        update_file_location(expected, location)
+
+    update_file_locations(
+        parsed_json,
+        uid_locations=uid_locations,
+        filename_locations=filename_locations,
+    )
+    assert parsed_json == expected
+    assert parsed_json["course_pages"][0]["file_location"] == "s3/a"
+    assert parsed_json["course_files"][1]["file_location"] == "s3/a"
+    assert "file_location" not in parsed_json["course_pages"][1]
+    assert [
+        media.get("file_location") for media in parsed_json["course_foreign_files"]
+    ] == [
+        "s3/1.mp4",
+        "s3/1.mp4",
+        None,
+    ]
+
+
+def test_update_file_locations_empty():
+    """Sections should not be read if there are no updates for them"""
+    parsed_json = {}
+    update_file_locations(parsed_json)
+    update_file_locations(parsed_json, uid_locations={}, filename_locations={})
+    assert parsed_json == {}
+
+
 @pytest.mark.parametrize("base64_key", ["_datafield_image", "_datafield_file", None])
 @pytest.mark.parametrize("url_key", ["unique_identifier", "technical_location", None])
 @pytest.mark.parametrize("is_valid_request", [True, False])
@@ -81,7 +157,7 @@ def test_get_binary_data(
     get_binary_data should look up base64 encoded values from certain addresses
     """
     data = b"abcde"
-    get_mock = mocker.patch("requests.get")
+    get_mock = mocker.patch("ocw_data_parser.http_client.get")
     get_mock.return_value.ok = is_valid_request
     get_mock.return_value.content = data
 
@@ -107,6 +183,300 @@ def test_get_binary_data(
         get_mock.assert_called_once_with(expected_url)
 
 
+@pytest.mark.parametrize("base64_key", ["_datafield_image", "_datafield_file"])
+def test_get_binary_data_lazy_payload(base64_key):
+    """get_binary_data should read LazyPayload data from the raw JSON record"""
+    data = b"abcde"
+    record = f'{{"{base64_key}": {{"data": "{b64encode(data).decode()}"}}}}'.encode()
+    read_count = 0
+
+    def _read_record():
+        """Return the raw record, counting how often it is read"""
+        nonlocal read_count
+        read_count += 1
+        return record
+
+    media = {base64_key: {"data": LazyPayload(_read_record, base64_key)}}
+    assert read_count == 0
+    assert get_binary_data(media) == data
+    assert read_count == 1
+
+
+@pytest.mark.parametrize("encode", [b64encode, encodebytes])
+def test_base64_reader(encode):
+    """Base64Reader should decode the same data as b64decode, whatever the chunk size"""
+    for data_length in [0, 1, 2, 3, 100, 1001]:
+        data = os.urandom(data_length)
+        for b64_data in [encode(data), encode(data).decode()]:
+            for chunk_size in [1, 3, 4, 7, 1000]:
+                reader = Base64Reader(b64_data, chunk_size=chunk_size)
+                assert reader.read(5) == data[:5]
+                assert reader.read() == data[5:]
+                assert reader.read() == b""
+
+                sink = BytesIO()
+                write_binary_data(Base64Reader(b64_data, chunk_size=chunk_size), sink)
+                assert sink.getvalue() == data
+
+
+def test_base64_reader_invalid():
+    """Invalid base64 data should raise an error when it's read"""
+    with pytest.raises(ValueError):
+        Base64Reader("abcde", chunk_size=2).read()
+
+
+@pytest.mark.parametrize("base64_key", ["_datafield_image", "_datafield_file"])
+@pytest.mark.parametrize("lazy", [True, False])
+def test_open_binary_data(base64_key, lazy):
+    """open_binary_data should decode base64 data as it's read"""
+    data = b"abcde"
+    b64_data = b64encode(data).decode()
+    if lazy:
+        record = json.dumps({base64_key: {"data": b64_data}}).encode()
+        b64_data = LazyPayload(lambda: record, base64_key)
+    with open_binary_data({base64_key: {"data": b64_data}}) as binary_data:
+        assert binary_data.read() == data
+
+
+@pytest.mark.parametrize("is_valid_request", [True, False])
+def test_open_binary_data_url(mocker, is_valid_request):
+    """open_binary_data should stream data from a URL if there is no base64 data"""
+    get_mock = mocker.patch("ocw_data_parser.http_client.get")
+    get_mock.return_value.ok = is_valid_request
+    binary_data = open_binary_data({"technical_location": "http://ocw.mit.edu/a/url"})
+    get_mock.assert_called_once_with("http://old.ocw.mit.edu/a/url", stream=True)
+    if is_valid_request:
+        assert binary_data.response is get_mock.return_value
+        assert get_mock.return_value.raw.decode_content is True
+        binary_data.close()
+        get_mock.return_value.close.assert_called_once_with()
+    else:
+        assert binary_data is None
+        get_mock.return_value.close.assert_called_once_with()
+    assert open_binary_data({}) is None
+
+
+def test_download_file(mocker):
+    """download_file should stream a file to disk, retrying if it's interrupted"""
+
+    def _interrupted(_chunk_size):
+        """Fail partway through the response"""
+        yield b"some"
+        raise requests.exceptions.ChunkedEncodingError()
+
+    get_mock = mocker.patch("ocw_data_parser.http_client.get")
+    get_mock.return_value.headers = {}
+    get_mock.return_value.iter_content.side_effect = [
+        _interrupted(1),
+        iter([b"some", b"bytes"]),
+    ]
+    with TemporaryDirectory() as tempdir:
+        path = Path(tempdir) / "file.mp4"
+        download_file("http://example.com/file.mp4", path)
+        assert path.read_bytes() == b"somebytes"
+        assert os.listdir(tempdir) == ["file.mp4"]
+    get_mock.assert_called_with("http://example.com/file.mp4", stream=True, headers={})
+    assert get_mock.call_count == 2
+    assert get_mock.return_value.close.call_count == 2
+    get_mock.return_value.iter_content.assert_called_with(BINARY_CHUNK_SIZE)
+
+
+def test_download_file_same_path(mocker):
+    """Downloads to the same path at the same time should each write their own temporary file"""
+
+    def _slow(_chunk_size):
+        """Send the response in a few chunks, giving the other download time to start"""
+        for chunk in [b"some", b"bytes"]:
+            time.sleep(0.1)
+            yield chunk
+
+    get_mock = mocker.patch("ocw_data_parser.http_client.get")
+    get_mock.return_value.headers = {}
+    get_mock.return_value.iter_content.side_effect = _slow
+    errors = []
+
+    def _download(path):
+        """Download the file, recording any error"""
+        try:
+            download_file("http://a.com/file.mp4", path)
+        except Exception as ex:  # pylint: disable=broad-except
+            errors.append(ex)
+
+    with TemporaryDirectory() as tempdir:
+        path = Path(tempdir) / "file.mp4"
+        threads = [threading.Thread(target=_download, args=(path,)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert path.read_bytes() == b"somebytes"
+        assert os.listdir(tempdir) == ["file.mp4"]
+    assert errors == []
+    assert get_mock.call_count == 4
+
+
+@pytest.mark.parametrize(
+    "error", [requests.exceptions.HTTPError(), requests.exceptions.ConnectionError()]
+)
+def test_download_file_error(mocker, error):
+    """download_file should raise errors, and only retry interrupted downloads"""
+    get_mock = mocker.patch("ocw_data_parser.http_client.get")
+    get_mock.return_value.headers = {}
+    get_mock.return_value.raise_for_status.side_effect = error
+    with TemporaryDirectory() as tempdir:
+        path = Path(tempdir) / "file.mp4"
+        with pytest.raises(type(error)):
+            download_file("http://example.com/file.mp4", path, attempts=2)
+        assert os.listdir(tempdir) == []
+    assert get_mock.call_count == (
+        2 if isinstance(error, requests.exceptions.ConnectionError) else 1
+    )
+
+
+def test_media_cache(mocker):
+    """Downloads should read from the media cache once it's configured"""
+    get_mock = mocker.patch("ocw_data_parser.http_client.get")
+    get_mock.return_value.headers = {}
+    get_mock.return_value.iter_content.side_effect = lambda _chunk_size: iter(
+        [b"some", b"bytes"]
+    )
+    with TemporaryDirectory() as cache_dir, TemporaryDirectory() as tempdir:
+        configure_media_cache(cache_dir)
+        try:
+            for name in ["first.mp4", "second.mp4"]:
+                download_file("http://ocw.mit.edu/file.mp4", Path(tempdir) / name)
+                assert (Path(tempdir) / name).read_bytes() == b"somebytes"
+            json_obj = {"technical_location": "http://ocw.mit.edu/file.mp4"}
+            assert get_binary_data(json_obj) == b"somebytes"
+            with open_binary_data(json_obj) as binary_data:
+                assert binary_data.read() == b"somebytes"
+        finally:
+            configure_media_cache(None)
+    get_mock.assert_called_once_with(
+        "http://ocw.mit.edu/file.mp4", stream=True, headers={}
+    )
+
+
+class ConditionalHandler(BaseHTTPRequestHandler):
+    """Serve server.files, with 304 Not Modified for conditional requests which match"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Send the file or 304"""
+        body, etag = self.server.files[self.path]
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.server.bodies_sent += 1
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", "Wed, 21 Oct 2015 07:28:00 GMT")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Don't log requests"""
+
+
+@pytest.fixture
+def conditional_server():
+    """A local HTTP server which supports conditional requests"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ConditionalHandler)
+    server.daemon_threads = True
+    server.files = {"/video.mp4": (b"first", '"1"')}
+    server.bodies_sent = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    server.url = f"http://{host}:{port}/video.mp4"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_open_streams_without_reading(conditional_server):
+    """
+    Streams which are closed before being read to the end should give their connections back
+    """
+    http_client.configure_session(max_connections_per_host=2)
+    opened = []
+
+    def open_and_close():
+        for _ in range(5):
+            with open_binary_data({"unique_identifier": conditional_server.url}):
+                pass
+            with open_url(conditional_server.url) as binary_data:
+                binary_data.read(1)
+            opened.append(True)
+
+    try:
+        thread = threading.Thread(target=open_and_close, daemon=True)
+        thread.start()
+        thread.join(timeout=10)
+    finally:
+        http_client.configure_session()
+    assert len(opened) == 5
+    assert conditional_server.bodies_sent == 10
+
+
+def test_download_file_conditional(conditional_server):
+    """A file which was downloaded before should only be downloaded again if it has changed"""
+    with TemporaryDirectory() as tempdir:
+        path = Path(tempdir) / "video.mp4"
+        store_path = Path(tempdir) / "validators.json"
+        for _ in range(2):
+            validator_store = ValidatorStore(store_path)
+            download_file(conditional_server.url, path, validator_store=validator_store)
+            validator_store.save()
+            assert path.read_bytes() == b"first"
+        assert conditional_server.bodies_sent == 1
+        assert ValidatorStore(store_path).get(conditional_server.url) == {
+            "etag": '"1"',
+            "last_modified": "Wed, 21 Oct 2015 07:28:00 GMT",
+        }
+
+        conditional_server.files["/video.mp4"] = (b"second", '"2"')
+        download_file(conditional_server.url, path, validator_store=validator_store)
+        assert path.read_bytes() == b"second"
+        assert conditional_server.bodies_sent == 2
+        assert validator_store.get(conditional_server.url)["etag"] == '"2"'
+
+        # A file which isn't there any more is downloaded in full
+        os.unlink(path)
+        download_file(conditional_server.url, path, validator_store=validator_store)
+        assert path.read_bytes() == b"second"
+        assert conditional_server.bodies_sent == 3
+        assert sorted(os.listdir(tempdir)) == ["validators.json", "video.mp4"]
+
+
+def test_media_cache_conditional(conditional_server):
+    """The media cache should check whether files have changed once per run"""
+    with TemporaryDirectory() as cache_dir, TemporaryDirectory() as tempdir:
+        path = Path(tempdir) / "video.mp4"
+        try:
+            for _ in range(2):
+                # Each configure_media_cache is like a new run
+                configure_media_cache(cache_dir)
+                for _ in range(2):
+                    download_file(conditional_server.url, path)
+                    assert path.read_bytes() == b"first"
+            assert conditional_server.bodies_sent == 1
+
+            conditional_server.files["/video.mp4"] = (b"second", '"2"')
+            download_file(conditional_server.url, path)
+            assert path.read_bytes() == b"first"
+            configure_media_cache(cache_dir)
+            download_file(conditional_server.url, path)
+            assert path.read_bytes() == b"second"
+            assert conditional_server.bodies_sent == 2
+        finally:
+            configure_media_cache(None)
+
+
 def test_get_binary_data_url(ocw_parser):
     """
     Find the first file without a datafield property and attempt to get the binary data from it
@@ -125,6 +495,109 @@ def test_get_binary_data_url(ocw_parser):
     assert found, "test course has no file without a datafield property"
 
 
+@pytest.mark.parametrize(
+    "srt_data",
+    [
+        b"1\n00:00:01,000 --> 00:00:02,500\nHello\n<i>there</i>\n\n2\n00:01:03,000 --> 00:01:04,000\nCaf\xc3\xa9",
+        b"\xef\xbb\xbf1\r\n00:00:01,000 --> 00:00:02,000\r\nWith a BOM\r\n\r\n",
+        b"",
+        b"not captions",
+        b"1\n00:00:01,000 --> 00:00:02,000\n\xff\n",
+    ],
+)
+def test_srt_to_vtt(srt_data):
+    """srt_to_vtt should give the same result as converting a file with webvtt"""
+
+    def _convert(convert):
+        """Return the converted data or the error"""
+        try:
+            return convert()
+        except Exception as ex:  # pylint: disable=broad-except
+            return type(ex), str(ex)
+
+    with TemporaryDirectory() as tempdir:
+        srt_path = Path(tempdir) / "captions.srt"
+        srt_path.write_bytes(srt_data)
+
+        def _convert_file():
+            """Convert the file like convert_to_vtt used to"""
+            webvtt.from_srt(srt_path).save()
+            return srt_path.with_suffix(".vtt").read_bytes()
+
+        assert _convert(partial(srt_to_vtt, srt_data)) == _convert(_convert_file)
+
+
+def test_build_children_index():
+    """build_children_index should map parent uids to children in order"""
+    jsons = [
+        {"_uid": "parent", "parent_uid": "root"},
+        {"_uid": "child-1", "parent_uid": "parent"},
+        {"_uid": "other", "parent_uid": "root"},
+        {"_uid": "child-2", "parent_uid": "parent"},
+    ]
+    assert build_children_index(jsons) == {
+        "root": [jsons[0], jsons[2]],
+        "parent": [jsons[1], jsons[3]],
+    }
+
+
+def _scan_course_pages(url, course_pages):
+    """Find a course page for a relative URL by checking every page"""
+    if url:
+        url_parts = url.split("/")
+        short_url = url_parts[-2] + "/" + url_parts[-1] if len(url_parts) > 1 else url
+        for page in course_pages:
+            if page["short_url"] in short_url and "index.htm" not in page["short_url"]:
+                return page
+    return None
+
+
+def test_course_page_lookup(ocw_parser):
+    """CoursePageLookup should find the same page as checking each page in order"""
+    course_pages = ocw_parser.parsed_json["course_pages"]
+    lookup = CoursePageLookup(course_pages)
+    urls = [None, "", "/", "index.htm", "courses/missing/nothing-here"]
+    for feature in ocw_parser.jsons[0]["feature_requirements"]:
+        urls.append(feature["ocw_feature_url"])
+    for page in course_pages:
+        urls.extend(
+            [
+                page["short_url"],
+                page["url"],
+                page["url"] + "/index.htm",
+                "prefix-" + page["short_url"][1:],
+            ]
+        )
+    for url in urls:
+        expected = _scan_course_pages(url, course_pages)
+        assert lookup.find(url) is expected
+        assert lookup.find(url) is expected
+        assert course_page_from_relative_url(url, course_pages) is expected
+
+
+@pytest.mark.parametrize(
+    "url, expected_uid",
+    [
+        ["a/b/syllabus", "syllabus"],
+        ["a/lecture-notes/index.htm", "notes"],
+        ["lecture-notes/calendar", "notes"],
+        ["x/calendar", "calendar"],
+        ["unknown", None],
+    ],
+)
+def test_course_page_lookup_order(url, expected_uid):
+    """The first matching page should win, and index.htm pages should never match"""
+    course_pages = [
+        {"uid": "index", "short_url": "index.htm"},
+        {"uid": "syllabus", "short_url": "syllabus"},
+        {"uid": "notes", "short_url": "notes"},
+        {"uid": "calendar", "short_url": "calendar"},
+        {"uid": "duplicate", "short_url": "syllabus"},
+    ]
+    page = CoursePageLookup(course_pages).find(url)
+    assert (page["uid"] if page else None) == expected_uid
+
+
 def test_print_error(ocw_parser):
     """
     Test printing an error doesn't throw an exception
@@ -172,6 +645,7 @@ def test_parse_all(upload_parsed_json, s3_links, is_published):
                     upload_parsed_json=upload_parsed_json,
                 )
                 assert mock_parser.return_value.export_parsed_json.call_count == 2
+                assert get_media_cache() is None
                 mock_parser.return_value.export_parsed_json.assert_any_call(
                     s3_links=s3_links,
                     upload_parsed_json=(
@@ -180,6 +654,32 @@ def test_parse_all(upload_parsed_json, s3_links, is_published):
                 )
 
 
+def test_parse_all_media_cache():
+    """parse_all should use a media cache while parsing if there is a media_cache_dir"""
+    caches = []
+
+    def _parser(**kwargs):  # pylint: disable=unused-argument
+        """Record the shared media cache when each course is parsed"""
+        caches.append(get_media_cache())
+        return MagicMock()
+
+    with patch(
+        "ocw_data_parser.OCWParser", side_effect=_parser
+    ), TemporaryDirectory() as destination_dir:
+        parse_all(
+            constants.COURSE_DIR,
+            destination_dir,
+            upload_parsed_json=False,
+            media_cache_dir=Path(destination_dir) / "cache",
+            media_cache_size=100,
+        )
+        assert caches
+        assert all(cache is caches[0] for cache in caches)
+        assert caches[0].max_size == 100
+        assert (Path(destination_dir) / "cache" / "objects").is_dir()
+    assert get_media_cache() is None
+
+
 @pytest.mark.parametrize(
     "last_published,last_unpublished,is_published",
     [
@@ -216,3 +716,62 @@ def test_is_course_published_not_found():
     with pytest.raises(Exception) as ex:
         is_course_published(invalid_path)
     assert ex.value.args[0] == (f"Could not find 1.json for {invalid_path}")
+
+
+@pytest.mark.parametrize(
+    "date_str, expected",
+    [
+        [None, None],
+        ["", None],
+        ["None", None],
+        ["2016/02/02 20:28:06 US/Eastern", datetime(2016, 2, 3, 1, 28, 6)],
+        ["2016/07/02 20:28:06 US/Eastern", datetime(2016, 7, 3, 0, 28, 6)],
+        ["2016/02/02 20:28:06.123 US/Eastern", datetime(2016, 2, 3, 1, 28, 6)],
+        ["2016/02/02 20:28:06 GMT+5", datetime(2016, 2, 3, 1, 28, 6)],
+        ["2016/02/02 20:28:06 GMT", datetime(2016, 2, 2, 20, 28, 6)],
+        ["2016/02/02 20:28:06 UTC", datetime(2016, 2, 2, 20, 28, 6)],
+    ],
+)
+def test_parse_date(date_str, expected):
+    """parse_date should convert dates to UTC"""
+    if expected is not None:
+        expected = pytz.utc.localize(expected)
+    for _ in range(2):
+        assert parse_date(date_str) == expected
+
+
+@pytest.mark.parametrize(
+    "date_str, error",
+    [["2016/02/02 20:28 US/Eastern", ValueError], ["2016", IndexError]],
+)
+def test_parse_date_invalid(date_str, error):
+    """Invalid dates should raise an error every time"""
+    for _ in range(2):
+        with pytest.raises(error):
+            parse_date(date_str)
+
+
+def test_parse_date_unknown_timezone():
+    """An unknown timezone should raise an error every time"""
+    for _ in range(2):
+        with pytest.raises(pytz.UnknownTimeZoneError):
+            parse_date("2016/02/02 20:28:06 Nowhere/Else")
+
+
+def test_ordered_instructors():
+    """Instructors should be ordered by the first position of their uid in the contributor list"""
+    instructors = [{"uid": uid} for uid in ["a", "b", "c", "d", "e"]]
+    contributor_list = [
+        {"md_contributor_uid": "c"},
+        {"md_contributor_uid": "x"},
+        {},
+        {"md_contributor_uid": "a"},
+        {"md_contributor_uid": "c"},
+        {"md_contributor_uid": "e"},
+    ]
+    assert [
+        instructor["uid"]
+        for instructor in ordered_instructors(instructors, contributor_list)
+    ] == ["c", "a", "e", "b", "d"]
+    assert ordered_instructors(instructors, []) is instructors
+    assert ordered_instructors([], contributor_list) is None
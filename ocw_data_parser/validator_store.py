@@ -0,0 +1,69 @@
+"""
+A JSON file of the ETag and Last-Modified headers of downloaded files, by URL
+
+Later downloads send these back in a conditional request, and keep the file they already have if
+the server responds with 304 Not Modified.
+"""
+
+import json
+import os
+from pathlib import Path
+import tempfile
+import threading
+
+from ocw_data_parser.media_cache import url_key
+
+
+class ValidatorStore:
+    """The validators of downloaded files, kept in a JSON file"""
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str or Path): The JSON file, which is read now if it exists
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        try:
+            with open(self.path) as file:
+                self._validators = json.load(file)
+        except FileNotFoundError:
+            self._validators = {}
+
+    def get(self, url):
+        """
+        Get the validators for a URL
+
+        Args:
+            url (str): The URL of a file
+
+        Returns:
+            dict or None: The etag and last_modified of the file, or None if there are none
+        """
+        with self._lock:
+            return self._validators.get(url_key(url))
+
+    def set(self, url, validators):
+        """
+        Set the validators for a URL
+
+        Args:
+            url (str): The URL of a file
+            validators (dict or None):
+                The etag and last_modified of the downloaded file, or None to forget them
+        """
+        with self._lock:
+            if validators:
+                self._validators[url_key(url)] = validators
+            else:
+                self._validators.pop(url_key(url), None)
+
+    def save(self):
+        """Write the validators to the JSON file"""
+        os.makedirs(self.path.parent, exist_ok=True)
+        with self._lock:
+            with tempfile.NamedTemporaryFile(
+                "w", dir=self.path.parent, delete=False
+            ) as file:
+                json.dump(self._validators, file, sort_keys=True)
+        os.replace(file.name, self.path)
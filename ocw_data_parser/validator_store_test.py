@@ -0,0 +1,31 @@
+"""Tests for the validator store"""
+
+import json
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from ocw_data_parser.validator_store import ValidatorStore
+
+
+def test_validator_store():
+    """Validators should be kept by URL and saved to the JSON file"""
+    with TemporaryDirectory() as tempdir:
+        path = Path(tempdir) / "output" / "validators.json"
+        store = ValidatorStore(path)
+        assert store.get("http://ocw.mit.edu/a.mp4") is None
+        store.set("http://ocw.mit.edu/a.mp4", {"etag": '"1"'})
+        store.set("http://ocw.mit.edu/b.mp4", {"last_modified": "yesterday"})
+        store.set("http://ocw.mit.edu/c.mp4", {})
+        assert store.get("https://old.ocw.mit.edu/a.mp4") == {"etag": '"1"'}
+        assert not path.exists()
+
+        store.save()
+        with open(path) as file:
+            assert json.load(file) == {
+                "ocw.mit.edu/a.mp4": {"etag": '"1"'},
+                "ocw.mit.edu/b.mp4": {"last_modified": "yesterday"},
+            }
+        store = ValidatorStore(path)
+        assert store.get("http://ocw.mit.edu/b.mp4") == {"last_modified": "yesterday"}
+        store.set("http://ocw.mit.edu/b.mp4", None)
+        assert store.get("http://ocw.mit.edu/b.mp4") is None
@@ -0,0 +1,59 @@
+"""
+An on-disk cache of WebVTT captions converted from SRT, keyed by the hash of the SRT data
+
+Unchanged captions are read from the cache instead of being converted again on the next run.
+Entries are kept per webvtt-py version, since the output depends on it.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+import tempfile
+
+import webvtt
+
+
+class VttCache:
+    """Converted WebVTT captions, stored by the SHA-256 hash of their SRT data"""
+
+    def __init__(self, directory):
+        """
+        Args:
+            directory (str or Path): Where to keep the converted captions
+        """
+        self.directory = Path(directory) / f"webvtt-{webvtt.__version__}"
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, srt_data):
+        """Where the WebVTT captions for some SRT data are stored"""
+        content_hash = hashlib.sha256(srt_data).hexdigest()
+        return self.directory / content_hash[:2] / f"{content_hash}.vtt"
+
+    def get(self, srt_data):
+        """
+        Get the converted captions for some SRT data
+
+        Args:
+            srt_data (bytes): The SRT captions
+
+        Returns:
+            bytes or None: The WebVTT captions, or None if they aren't cached
+        """
+        try:
+            return self._path(srt_data).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, srt_data, vtt_data):
+        """
+        Store the converted captions for some SRT data
+
+        Args:
+            srt_data (bytes): The SRT captions
+            vtt_data (bytes): The WebVTT captions converted from them
+        """
+        path = self._path(srt_data)
+        os.makedirs(path.parent, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as file:
+            file.write(vtt_data)
+        os.replace(file.name, path)
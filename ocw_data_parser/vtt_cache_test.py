@@ -0,0 +1,24 @@
+"""Tests for the vtt cache"""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import webvtt
+
+from ocw_data_parser.vtt_cache import VttCache
+
+
+def test_vtt_cache():
+    """Converted captions should be stored by the SRT data, for each webvtt-py version"""
+    with TemporaryDirectory() as tempdir:
+        cache = VttCache(tempdir)
+        assert cache.get(b"srt") is None
+        cache.put(b"srt", b"vtt")
+        cache.put(b"other srt", b"other vtt")
+        assert VttCache(tempdir).get(b"srt") == b"vtt"
+        assert cache.get(b"other srt") == b"other vtt"
+        cache.put(b"srt", b"new vtt")
+        assert cache.get(b"srt") == b"new vtt"
+        files = list(Path(tempdir).glob("**/*.vtt"))
+        assert len(files) == 2
+        assert {file.parts[-3] for file in files} == {f"webvtt-{webvtt.__version__}"}
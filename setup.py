@@ -13,9 +13,9 @@ setup(
     install_requires=[
         "boto3>=1.9.62",
         "requests>=2.21.0",
-        "smart-open>=1.8.0",
         "webvtt-py==0.4.6",
     ],
+    extras_require={"fast": ["orjson>=3.0.0"]},
     license="To be determined",
     author="Zagaran, Inc.",
     url="https://github.com/zagaran/ocw-data-parser",